@@ -0,0 +1,291 @@
+"""Headless batch mode: process many society ZIP files without the GUI
+
+Usage:
+    python audit_batch.py ZIP_OR_DIR [ZIP_OR_DIR ...] --metadata societies.csv --output-dir reports
+
+The metadata CSV needs the columns zip, society_name and society_number. The
+zip column is matched against the ZIP file name (or its full path).
+"""
+import argparse
+import csv
+import hashlib
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from file_processor import FileProcessor
+
+
+def find_archives(paths: List[str]) -> List[str]:
+    """Expand directories into the ZIP files they contain"""
+    archives = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith('.zip'):
+                    archives.append(os.path.join(path, name))
+        else:
+            archives.append(path)
+    return archives
+
+
+def load_metadata(csv_path: str) -> Dict[str, Dict[str, str]]:
+    """Read society name and number for each ZIP from a CSV file"""
+    metadata = {}
+    with open(csv_path, newline='', encoding='utf-8-sig') as file:
+        for row in csv.DictReader(file):
+            zip_name = (row.get('zip') or '').strip()
+            if not zip_name:
+                continue
+            metadata[zip_name] = {
+                'society_name': (row.get('society_name') or '').strip(),
+                'society_number': (row.get('society_number') or '').strip()
+            }
+    return metadata
+
+
+def path_digest(zip_path: str) -> str:
+    """Short hash of a ZIP's absolute path, telling apart same-named ZIPs from different directories"""
+    return hashlib.sha1(os.path.abspath(zip_path).encode('utf-8')).hexdigest()[:8]
+
+
+def report_filename(zip_path: str, society_number: str) -> str:
+    """Build a unique Audit_Index report name for one society
+
+    The timestamp only has seconds, so the path digest keeps parallel jobs of
+    same-named ZIPs (or the same society) from writing the same report.
+    """
+    label = society_number or os.path.splitext(os.path.basename(zip_path))[0]
+    label = re.sub(r'[^\w\-]+', '_', label).strip('_')
+    return f"Audit_Index_{label}_{path_digest(zip_path)}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+
+
+def manifest_filename(zip_path: str, society_number: str) -> str:
+    """Build the delta re-run manifest name for one society"""
+    label = society_number or os.path.splitext(os.path.basename(zip_path))[0]
+    return re.sub(r'[^\w\-]+', '_', label).strip('_') + '.json'
+
+
+def journal_filename(zip_path: str) -> str:
+    """Build the checkpoint journal name for one ZIP (the same for every run of that path)"""
+    label = re.sub(r'[^\w\-]+', '_', os.path.splitext(os.path.basename(zip_path))[0]).strip('_')
+    return f"{label}_{path_digest(zip_path)}.journal.jsonl"
+
+
+def process_archive(zip_path: str, society_name: str, society_number: str,
+                    output_dir: str, settings: Dict, manifest_dir: Optional[str] = None,
+                    export_formats: Optional[List[str]] = None, results_db: Optional[str] = None,
+                    journal_path: Optional[str] = None) -> Dict:
+    """Run the FileProcessor pipeline on one ZIP and write its report
+
+    With export_formats (an empty list means every available format) the totals
+    are also exported next to the report (see totals_export.py); with results_db
+    the run is recorded in that SQLite results database (see results_db.py).
+    With journal_path finished files are checkpointed there, a run interrupted
+    before its report was done resumes from it, and it is removed at the end.
+    """
+    processor = FileProcessor(**settings, journal_path=journal_path)
+    if manifest_dir:
+        processor.manifest_path = os.path.join(manifest_dir, manifest_filename(zip_path, society_number))
+    try:
+        processor.upload_zip_file(zip_path)
+        processor.extract_zip(zip_path)
+        processor.verify_schedules_annexures()
+
+        # Rows are written to the report as each file finishes
+        report_path = os.path.join(output_dir, report_filename(zip_path, society_number))
+        processor.start_streaming_report(report_path, society_name, society_number)
+        exports = []
+        if export_formats is not None:
+            exports = processor.start_exports(os.path.splitext(report_path)[0], society_name, society_number,
+                                              export_formats)
+        processor.process_all_files()
+        processor.finish_exports()
+        processor.finish_streaming_report()
+        if processor.diagnostics_sheet:
+            processor.diagnostics.export_json(os.path.splitext(report_path)[0] + '.diagnostics.json')
+        if results_db:
+            processor.store_results(results_db, society_name, society_number, report_path)
+        processor.remove_journal()
+
+        return {
+            'zip': zip_path,
+            'report': report_path,
+            'exports': exports,
+            'files': len(processor.file_data),
+            'file_errors': [f['filename'] for f in processor.file_data if 'error' in f],
+            'prescreen_misses': list(processor.prescreen_misses),
+            'located': dict(processor.locator_stats),
+            'page_stats_error': processor.page_stats_error,
+            'sharded': dict(processor.shard_stats),
+            'resumed': dict(processor.journal_stats),
+            'mismatches': len(processor.mismatches),
+            'changes': len(processor.changes) if processor.previous_run is not None else None,
+            'missing': list(processor.missing_files)
+        }
+    finally:
+        processor.finish_exports()
+        processor.cleanup()
+        if processor.cache is not None:
+            processor.cache.close()
+
+
+def add_limit_arguments(parser: argparse.ArgumentParser):
+    """Per-PDF time and memory limit options shared with the job service"""
+    parser.add_argument('--file-timeout', type=float, default=600,
+                        help="Seconds one PDF may take before it is stopped and reported (0 = no limit)")
+    parser.add_argument('--page-timeout', type=float, default=120,
+                        help="Seconds one page may take before its PDF is stopped (0 = no limit)")
+    parser.add_argument('--memory-limit', type=int, default=0, metavar='MB',
+                        help="Address-space limit of each extraction process in MB (0 = no limit; POSIX only)")
+
+
+def limit_settings(args: argparse.Namespace) -> Dict:
+    """FileProcessor limit arguments from parsed command-line options"""
+    return {
+        'file_timeout': args.file_timeout or None,
+        'page_timeout': args.page_timeout or None,
+        'memory_limit_mb': args.memory_limit or None
+    }
+
+
+def run_batch(archives: List[str], metadata: Dict[str, Dict[str, str]], output_dir: str,
+              jobs: int, settings: Dict, manifest_dir: Optional[str] = None,
+              export_formats: Optional[List[str]] = None, results_db: Optional[str] = None,
+              journal_dir: Optional[str] = None) -> int:
+    """Process all archives on a process pool and return the number of failures"""
+    os.makedirs(output_dir, exist_ok=True)
+    failures = 0
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {}
+        for zip_path in archives:
+            info = metadata.get(os.path.basename(zip_path)) or metadata.get(zip_path)
+            if info is None:
+                info = {'society_name': '', 'society_number': ''}
+                if metadata:
+                    print(f"⚠ No society metadata for {zip_path}", file=sys.stderr)
+            journal_path = os.path.join(journal_dir, journal_filename(zip_path)) if journal_dir else None
+            future = executor.submit(process_archive, zip_path, info['society_name'],
+                                     info['society_number'], output_dir, settings, manifest_dir,
+                                     export_formats, results_db, journal_path)
+            futures[future] = zip_path
+
+        for future in as_completed(futures):
+            zip_path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"✗ {zip_path}: {e}", file=sys.stderr)
+                continue
+
+            print(f"✓ {zip_path} -> {result['report']} ({result['files']} files)")
+            if result['resumed']['files_resumed'] or result['resumed']['ranges_resumed']:
+                print(f"  Resumed from the journal: {result['resumed']['files_resumed']} files, "
+                      f"{result['resumed']['ranges_resumed']} page ranges")
+            if result['exports']:
+                print(f"  Exported: {', '.join(result['exports'])}")
+            if result['changes'] is not None:
+                print(f"  Changed since last run: {result['changes']} files")
+            if result['located']['files_located']:
+                print(f"  Likely pages only: {result['located']['files_located']} files, "
+                      f"{result['located']['pages_skipped']} pages skipped")
+            if result['page_stats_error']:
+                print(f"⚠ {zip_path}: {result['page_stats_error']}", file=sys.stderr)
+            if result['sharded']['files_sharded']:
+                print(f"  Split into page ranges: {result['sharded']['files_sharded']} files, "
+                      f"{result['sharded']['shards']} ranges")
+            if result['mismatches']:
+                print(f"  Totals not reconciling: {result['mismatches']}")
+            if result['missing']:
+                print(f"  Missing: {', '.join(result['missing'])}")
+            for miss in result['prescreen_misses']:
+                print(f"✗ {zip_path}: pre-screen skipped page {miss['page']} of {miss['filename']} "
+                      f"which has totals", file=sys.stderr)
+            if result['file_errors']:
+                print(f"✗ {zip_path}: could not read {', '.join(result['file_errors'])}",
+                      file=sys.stderr)
+            # Each archive counts once, however many of its pages or files failed
+            if result['prescreen_misses'] or result['file_errors']:
+                failures += 1
+
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Generate Audit Index reports for many society ZIP files")
+    parser.add_argument('paths', nargs='+', help="ZIP files or directories containing ZIP files")
+    parser.add_argument('--metadata', help="CSV with zip, society_name and society_number columns")
+    parser.add_argument('--output-dir', default='.', help="Directory for the Audit_Index reports")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help="Number of archives processed in parallel")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="PDF extraction worker processes per archive")
+    parser.add_argument('--cache-dir', help="Directory for the persistent extraction cache")
+    parser.add_argument('--no-prescreen', action='store_true',
+                        help="Run full text extraction on every page")
+    parser.add_argument('--verify-prescreen', action='store_true',
+                        help="Also extract pages skipped by the pre-screen and fail if any had totals")
+    parser.add_argument('--manifest-dir',
+                        help="Keep per-society manifests here and only reprocess changed files on re-runs")
+    parser.add_argument('--diagnostics', action='store_true',
+                        help="Add a Diagnostics sheet and write timings next to each report as JSON")
+    parser.add_argument('--profile', metavar='FILENAME',
+                        help="Run the extraction of this PDF (file name) under cProfile")
+    parser.add_argument('--backend', default='auto',
+                        help="PDF text-extraction backend (see pdf_backends.py --list; default: fastest installed)")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="Parse PDFs in worker processes while this process decompresses the next members "
+                             "and writes the report (see pipeline_stages.py)")
+    parser.add_argument('--page-stats', metavar='FILE',
+                        help="Learn which pages hold totals per schedule/annexure number in FILE and "
+                             "only extract the likely pages of files with enough history")
+    parser.add_argument('--shard-pages', type=int, metavar='PAGES',
+                        help="Split PDFs of more than PAGES pages into ranges of PAGES pages that "
+                             "separate workers extract (needs --workers 2 or more)")
+    parser.add_argument('--export', nargs='*', choices=['csv', 'jsonl', 'parquet'], metavar='FORMAT',
+                        help="Also export the totals as csv, jsonl and/or parquet next to each report "
+                             "(no FORMAT: every available format)")
+    parser.add_argument('--results-db', metavar='FILE',
+                        help="Record every run in this SQLite results database (query it with results_db.py)")
+    parser.add_argument('--journal-dir', metavar='DIR',
+                        help="Checkpoint finished files of each archive here; an interrupted batch run "
+                             "again with the same options resumes where it stopped")
+    add_limit_arguments(parser)
+    args = parser.parse_args(argv)
+
+    archives = find_archives(args.paths)
+    if not archives:
+        print("No ZIP files found", file=sys.stderr)
+        return 1
+
+    metadata = load_metadata(args.metadata) if args.metadata else {}
+    settings = {
+        'workers': args.workers,
+        'in_archive': True,
+        'use_mmap': True,
+        'cache_dir': args.cache_dir,
+        'prescreen': not args.no_prescreen,
+        'verify_prescreen': args.verify_prescreen,
+        'diagnostics_sheet': args.diagnostics,
+        'profile_file': args.profile,
+        'backend': args.backend,
+        'pipeline': args.pipeline,
+        'page_stats_path': args.page_stats,
+        'shard_pages': args.shard_pages,
+        **limit_settings(args)
+    }
+
+    failures = run_batch(archives, metadata, args.output_dir, max(1, args.jobs), settings,
+                         args.manifest_dir, args.export, args.results_db, args.journal_dir)
+    print(f"\nProcessed {len(archives)} archives, {failures} with failures")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
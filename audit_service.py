@@ -0,0 +1,348 @@
+"""Service mode: a small HTTP job server that runs the pipeline for uploaded ZIP files
+
+Usage:
+    python audit_service.py [--host 127.0.0.1] [--port 8765] [--jobs 2] [--max-queue 8]
+
+Endpoints:
+    POST   /jobs?society_name=...&society_number=...   body: the ZIP file
+           -> 202 {"id": ..., "status": "queued", ...}
+           -> 503 when the queue is full (retry after the Retry-After seconds)
+    GET    /jobs/<id>          job status as JSON
+    GET    /jobs/<id>/report   the Audit_Index .xlsx once the job is done
+    DELETE /jobs/<id>          remove a finished job and its files
+    GET    /health             queue and worker counts
+
+Example:
+    curl --data-binary @society.zip "http://localhost:8765/jobs?society_name=ABC&society_number=123"
+
+Uploads are written straight to disk and each job runs audit_batch.process_archive
+(its own FileProcessor and directory) on a bounded process pool, so jobs never
+share processor state. Only the standard library is used.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from audit_batch import add_limit_arguments, limit_settings, process_archive
+
+CHUNK_SIZE = 1024 * 1024
+STATUS_TEXT = {
+    200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    409: 'Conflict', 411: 'Length Required', 413: 'Payload Too Large', 500: 'Internal Server Error',
+    503: 'Service Unavailable'
+}
+XLSX_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class HTTPError(Exception):
+    """Ends a request with an HTTP error status"""
+
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class Job:
+    """One submitted ZIP file and what became of it"""
+
+    def __init__(self, society_name: str, society_number: str, directory: str):
+        self.id = uuid.uuid4().hex
+        self.society_name = society_name
+        self.society_number = society_number
+        # Upload, extraction output and report of this job only
+        self.directory = directory
+        self.zip_path = os.path.join(directory, 'upload.zip')
+        self.status = 'queued'
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+
+    def to_dict(self) -> Dict:
+        data = {
+            'id': self.id,
+            'status': self.status,
+            'society_name': self.society_name,
+            'society_number': self.society_number,
+            'submitted': self.submitted,
+            'started': self.started,
+            'finished': self.finished
+        }
+        if self.result is not None:
+            data.update({
+                'report_url': f"/jobs/{self.id}/report",
+                'files': self.result['files'],
+                'missing': self.result['missing'],
+                'file_errors': self.result['file_errors'],
+                'mismatches': self.result['mismatches']
+            })
+        if self.error is not None:
+            data['error'] = self.error
+        return data
+
+
+class JobService:
+    """Queue of audit jobs processed by a bounded process pool"""
+
+    def __init__(self, jobs: int = 2, max_queue: int = 8, max_upload_bytes: int = 1024 * 1024 * 1024,
+                 max_finished: int = 100, settings: Optional[Dict] = None, work_dir: Optional[str] = None):
+        self.jobs = jobs
+        self.max_upload_bytes = max_upload_bytes
+        self.max_finished = max_finished
+        self.settings = settings or {'in_archive': True, 'use_mmap': True, 'prescreen': True}
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix='audit_service_')
+        self.registry: Dict[str, Job] = {}
+        # Waiting jobs; a full queue turns new uploads away with 503
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.executor = None
+        self._runners: List[asyncio.Task] = []
+
+    async def start(self, host: str, port: int):
+        """Start the process pool, the job runners and the HTTP server"""
+        self.executor = ProcessPoolExecutor(max_workers=self.jobs)
+        self._runners = [asyncio.ensure_future(self._run_jobs()) for _ in range(self.jobs)]
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    def close(self):
+        """Stop the job runners and process pool and remove all job files"""
+        for runner in self._runners:
+            runner.cancel()
+        self._runners = []
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    async def _run_jobs(self):
+        """Take jobs off the queue and run them on the process pool"""
+        loop = asyncio.get_event_loop()
+        while True:
+            job = await self.queue.get()
+            job.status = 'running'
+            job.started = time.time()
+            try:
+                job.result = await loop.run_in_executor(
+                    self.executor, process_archive, job.zip_path, job.society_name,
+                    job.society_number, job.directory, self.settings)
+                job.status = 'done'
+            except Exception as e:
+                job.status = 'failed'
+                job.error = str(e)
+            finally:
+                job.finished = time.time()
+                # The report is all that is needed from here on
+                if os.path.exists(job.zip_path):
+                    os.remove(job.zip_path)
+                self.queue.task_done()
+                self._forget_old_jobs()
+
+    def _forget_old_jobs(self):
+        """Remove the oldest finished jobs beyond max_finished"""
+        finished = sorted((job for job in self.registry.values() if job.finished is not None),
+                          key=lambda job: job.finished)
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            self._remove_job(job)
+
+    def _remove_job(self, job: Job):
+        del self.registry[job.id]
+        shutil.rmtree(job.directory, ignore_errors=True)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve one HTTP request per connection"""
+        try:
+            try:
+                method, target, headers = await self._read_request_head(reader)
+                await self._route(method, target, headers, reader, writer)
+            except HTTPError as e:
+                await self._send_json(writer, e.status, {'error': str(e)}, e.headers)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            except Exception as e:
+                await self._send_json(writer, 500, {'error': str(e)})
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request_head(reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str]]:
+        """Read the request line and headers"""
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) != 3:
+            raise HTTPError(400, "Malformed request line")
+        method, target, _ = request_line
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return method.upper(), target, headers
+
+    async def _route(self, method: str, target: str, headers: Dict[str, str],
+                     reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        url = urlsplit(target)
+        parts = [part for part in url.path.split('/') if part]
+
+        if parts == ['health']:
+            await self._send_json(writer, 200, {
+                'queued': self.queue.qsize(),
+                'running': sum(1 for job in self.registry.values() if job.status == 'running'),
+                'jobs': self.jobs,
+                'max_queue': self.queue.maxsize
+            })
+        elif parts == ['jobs'] and method == 'POST':
+            job = await self._submit(parse_qs(url.query), headers, reader)
+            await self._send_json(writer, 202, job.to_dict(), {'Location': f"/jobs/{job.id}"})
+        elif len(parts) == 2 and parts[0] == 'jobs' and method == 'GET':
+            await self._send_json(writer, 200, self._job(parts[1]).to_dict())
+        elif len(parts) == 2 and parts[0] == 'jobs' and method == 'DELETE':
+            job = self._job(parts[1])
+            if job.finished is None:
+                raise HTTPError(409, "Job has not finished yet")
+            self._remove_job(job)
+            await self._send_json(writer, 200, {'id': job.id, 'status': 'deleted'})
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'report' and method == 'GET':
+            await self._send_report(writer, self._job(parts[1]))
+        elif parts and parts[0] in ('jobs', 'health'):
+            raise HTTPError(405, "Method not allowed")
+        else:
+            raise HTTPError(404, "Not found")
+
+    def _job(self, job_id: str) -> Job:
+        job = self.registry.get(job_id)
+        if job is None:
+            raise HTTPError(404, "Unknown job")
+        return job
+
+    async def _submit(self, query: Dict[str, List[str]], headers: Dict[str, str],
+                      reader: asyncio.StreamReader) -> Job:
+        """Store an uploaded ZIP in a new job directory and queue the job"""
+        if 'content-length' not in headers:
+            raise HTTPError(411, "Content-Length is required")
+        try:
+            length = int(headers['content-length'])
+        except ValueError:
+            raise HTTPError(400, "Content-Length must be a number")
+        if length < 0:
+            raise HTTPError(400, "Content-Length must not be negative")
+        if length > self.max_upload_bytes:
+            raise HTTPError(413, f"Upload is larger than {self.max_upload_bytes} bytes")
+        if self.queue.full():
+            # Backpressure: refuse before reading the upload
+            raise HTTPError(503, "Job queue is full", {'Retry-After': '30'})
+
+        job = Job(query.get('society_name', [''])[0].strip(), query.get('society_number', [''])[0].strip(),
+                  tempfile.mkdtemp(prefix='job_', dir=self.work_dir))
+        try:
+            with open(job.zip_path, 'wb') as file:
+                remaining = length
+                while remaining:
+                    chunk = await reader.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise HTTPError(400, "Upload ended early")
+                    file.write(chunk)
+                    remaining -= len(chunk)
+            # Other uploads may have filled the queue while this one was read
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            shutil.rmtree(job.directory, ignore_errors=True)
+            raise HTTPError(503, "Job queue is full", {'Retry-After': '30'})
+        except BaseException:
+            shutil.rmtree(job.directory, ignore_errors=True)
+            raise
+        self.registry[job.id] = job
+        return job
+
+    async def _send_report(self, writer: asyncio.StreamWriter, job: Job):
+        """Send the report of a finished job"""
+        if job.status != 'done':
+            raise HTTPError(409, f"Job is {job.status}")
+        path = job.result['report']
+        await self._send_head(writer, 200, XLSX_TYPE, os.path.getsize(path), {
+            'Content-Disposition': f'attachment; filename="{os.path.basename(path)}"'
+        })
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+                writer.write(chunk)
+                await writer.drain()
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, data: Dict,
+                         headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(data).encode('utf-8')
+        await self._send_head(writer, status, 'application/json', len(body), headers)
+        writer.write(body)
+        await writer.drain()
+
+    @staticmethod
+    async def _send_head(writer: asyncio.StreamWriter, status: int, content_type: str, length: int,
+                         headers: Optional[Dict[str, str]] = None):
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                 f"Content-Type: {content_type}",
+                 f"Content-Length: {length}",
+                 "Connection: close"]
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+        await writer.drain()
+
+
+async def serve(host: str, port: int, service: JobService):
+    """Run the service until cancelled"""
+    server = await service.start(host, port)
+    print(f"Audit Index service listening on http://{host}:{port} ({service.jobs} parallel jobs)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Run the Audit Index job service")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on (0.0.0.0 for the LAN)")
+    parser.add_argument('--port', type=int, default=8765, help="Port to listen on")
+    parser.add_argument('--jobs', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Number of archives processed in parallel")
+    parser.add_argument('--max-queue', type=int, default=8, help="Jobs that may wait before uploads are refused")
+    parser.add_argument('--max-upload-mb', type=int, default=1024, help="Largest accepted ZIP in MB")
+    parser.add_argument('--max-finished', type=int, default=100,
+                        help="Finished jobs kept for download before the oldest are removed")
+    parser.add_argument('--cache-dir', help="Directory for the persistent extraction cache")
+    add_limit_arguments(parser)
+    args = parser.parse_args(argv)
+
+    settings = {'in_archive': True, 'use_mmap': True, 'prescreen': True, 'cache_dir': args.cache_dir,
+                **limit_settings(args)}
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    service = JobService(max(1, args.jobs), max(1, args.max_queue), args.max_upload_mb * 1024 * 1024,
+                         args.max_finished, settings)
+    try:
+        loop.run_until_complete(serve(args.host, args.port, service))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Let the server and job runners finish cancelling before the loop closes
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        service.close()
+        loop.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,487 @@
+"""Watch mode: process society ZIP files as they are dropped into an inbox folder
+
+Usage:
+    python audit_watch.py INBOX --outbox reports --errors failed [--metadata societies.csv] [--jobs 2]
+
+The inbox is scanned every --poll seconds. A ZIP is taken once its size and
+modification time have not changed for --settle seconds and it opens as a ZIP
+file, so archives that are still being copied are left alone (a partial copy
+has no ZIP directory yet). A file that stays unreadable as a ZIP for
+--reject-after seconds is moved to the errors folder. Taken archives
+are moved out of the inbox into a spool directory and queued smallest first,
+which keeps the mean turnaround low when a large archive arrives together with
+small ones; at most --jobs archives run at a time (audit_batch.process_archive
+on a process pool).
+
+    outbox   Audit_Index reports (and exports) of finished archives; files
+             appear there complete, never half written
+    errors   archives that could not be processed, each with a
+             <name>.error.txt note; also invalid ZIPs and duplicates
+
+Archives are deduplicated by SHA-256 of their content: a ZIP identical to one
+that is queued, running or already processed is moved to the errors folder
+with a note naming the earlier archive and report. Processed hashes are kept in
+<state-dir>/processed.json, so this holds across restarts.
+
+Every job runs in its own work directory under the state directory, which is
+removed when the job ends; work directories left by a killed daemon are removed
+at start-up and spooled archives that had not finished are queued again. Each
+job checkpoints its finished files in <state-dir>/journals (see
+run_journal.py), so a requeued archive resumes where it stopped.
+SIGINT/SIGTERM stop taking new archives and let running ones finish.
+"""
+import argparse
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from audit_batch import add_limit_arguments, limit_settings, load_metadata, process_archive
+
+HASH_CHUNK = 1024 * 1024
+# Attempts per archive when its worker process dies (e.g. another job's worker was killed)
+MAX_ATTEMPTS = 2
+
+
+def content_hash(path: str) -> str:
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _unique_path(directory: str, name: str) -> str:
+    """A path for name in directory that does not overwrite an existing file"""
+    stem, extension = os.path.splitext(name)
+    path = os.path.join(directory, name)
+    for number in itertools.count(2):
+        if not os.path.exists(path):
+            return path
+        path = os.path.join(directory, f"{stem} ({number}){extension}")
+
+
+def _publish(path: str, directory: str) -> str:
+    """Move a file into directory so it only ever appears there complete"""
+    target = _unique_path(directory, os.path.basename(path))
+    try:
+        os.replace(path, target)
+    except OSError:
+        # Another file system: copy under a hidden name first, then rename
+        partial = os.path.join(directory, '.' + os.path.basename(target) + '.part')
+        shutil.copy2(path, partial)
+        os.replace(partial, target)
+        os.remove(path)
+    return target
+
+
+def _ignore_stop_signals():
+    """Pool worker initializer: stop signals sent to the whole process group (Ctrl+C, service
+    managers) are handled by the daemon, which lets running jobs finish"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+
+class SpooledArchive:
+    """One ZIP taken from the inbox, waiting or running"""
+
+    def __init__(self, name: str, path: str, digest: str):
+        self.name = name
+        # Copy in the spool directory; <spool>/<unique>/<name>
+        self.path = path
+        self.digest = digest
+        self.size = os.path.getsize(path)
+        self.attempts = 0
+        self.work_dir = None
+
+
+class HotFolder:
+    """Take complete ZIPs from an inbox and process them smallest first on a process pool"""
+
+    def __init__(self, inbox: str, outbox: str, errors: str, state_dir: str, jobs: int = 2,
+                 settings: Optional[Dict] = None, metadata_path: Optional[str] = None,
+                 export_formats: Optional[List[str]] = None, archive_dir: Optional[str] = None,
+                 results_db: Optional[str] = None,
+                 settle_seconds: float = 10.0, poll_seconds: float = 2.0, reject_seconds: float = 300.0,
+                 log: Callable[[str], None] = print):
+        self.inbox = inbox
+        self.outbox = outbox
+        self.errors = errors
+        # Processed ZIPs are moved here; without it they are deleted once their report is out
+        self.archive_dir = archive_dir
+        self.jobs = max(1, jobs)
+        self.settings = settings or {'in_archive': True, 'use_mmap': True, 'prescreen': True}
+        self.export_formats = export_formats
+        # SQLite results database every finished run is recorded in (see results_db.py)
+        self.results_db = results_db
+        self.settle_seconds = settle_seconds
+        self.poll_seconds = poll_seconds
+        # A copy can stall for a while, so invalid ZIPs get longer than settle_seconds
+        self.reject_seconds = reject_seconds
+        self.log = log
+        self.spool_dir = os.path.join(state_dir, 'spool')
+        self.work_root = os.path.join(state_dir, 'work')
+        # Checkpoint journal of each running archive, by content hash
+        self.journal_dir = os.path.join(state_dir, 'journals')
+        self.index_path = os.path.join(state_dir, 'processed.json')
+        self.metadata_path = metadata_path
+        self._metadata: Dict[str, Dict[str, str]] = {}
+        self._metadata_mtime = None
+        # Content hash -> zip, report and time of every processed archive
+        self.processed: Dict[str, Dict] = {}
+        # Inbox path -> ((size, mtime), monotonic time the signature was first seen)
+        self._candidates: Dict[str, tuple] = {}
+        # (size, arrival, archive) heap of waiting archives
+        self._queue: List[tuple] = []
+        self._arrivals = itertools.count()
+        # Hashes of waiting and running archives
+        self._active: Dict[str, SpooledArchive] = {}
+        self._running: Dict[Future, SpooledArchive] = {}
+        self._executor = None
+        # Set (e.g. from a signal handler) to stop taking archives; running jobs finish
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        """Stop taking new archives; run() returns when the running ones are done"""
+        self.stop_event.set()
+
+    def run(self, once: bool = False):
+        """Watch the inbox until stop() is called (or, with once, until it is empty and idle)"""
+        for directory in (self.inbox, self.outbox, self.errors, self.spool_dir, self.work_root, self.journal_dir):
+            os.makedirs(directory, exist_ok=True)
+        if self.archive_dir:
+            os.makedirs(self.archive_dir, exist_ok=True)
+        self.processed = self._load_index()
+        self._recover()
+
+        try:
+            while not self.stop_event.is_set() or self._running:
+                if not self.stop_event.is_set():
+                    self.scan()
+                    self._dispatch()
+                    if once and not (self._queue or self._running or self._candidates):
+                        break
+                self._collect()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def _recover(self):
+        """Clear work directories and queue archives spooled before an unclean stop"""
+        for name in os.listdir(self.work_root):
+            shutil.rmtree(os.path.join(self.work_root, name), ignore_errors=True)
+        for name in sorted(os.listdir(self.spool_dir)):
+            directory = os.path.join(self.spool_dir, name)
+            archives = os.listdir(directory) if os.path.isdir(directory) else []
+            if len(archives) != 1:
+                shutil.rmtree(directory, ignore_errors=True)
+                continue
+            path = os.path.join(directory, archives[0])
+            digest = content_hash(path)
+            if digest in self.processed or digest in self._active:
+                # Finished (or spooled twice) just before the stop
+                shutil.rmtree(directory, ignore_errors=True)
+                continue
+            self.log(f"Resuming {archives[0]}")
+            self._enqueue(SpooledArchive(archives[0], path, digest))
+        # Journals of archives that finished or failed just before the stop
+        for name in os.listdir(self.journal_dir):
+            if name.split('.')[0] not in self._active:
+                os.remove(os.path.join(self.journal_dir, name))
+
+    def scan(self):
+        """Take every inbox ZIP whose size and time have settled"""
+        now = time.monotonic()
+        present = set()
+        for entry in sorted(os.scandir(self.inbox), key=lambda entry: entry.name):
+            # Skip hidden and Office lock files as well as partial copies under another name
+            if entry.name.startswith(('.', '~')) or not entry.name.lower().endswith('.zip'):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+            except OSError:
+                continue
+            present.add(entry.path)
+            signature = (stat.st_size, stat.st_mtime_ns)
+            candidate = self._candidates.get(entry.path)
+            if candidate is None or candidate[0] != signature:
+                self._candidates[entry.path] = (signature, now)
+            elif now - candidate[1] >= self.settle_seconds and self._complete(entry.path):
+                del self._candidates[entry.path]
+                self._take(entry.path)
+            elif now - candidate[1] >= self.reject_seconds:
+                del self._candidates[entry.path]
+                self._reject(entry.path, "Not a valid ZIP file (or the copy did not complete)")
+
+        for path in list(self._candidates):
+            if path not in present:
+                del self._candidates[path]
+
+    @staticmethod
+    def _complete(path: str) -> bool:
+        """Whether a settled file can be opened and has a ZIP directory"""
+        try:
+            # Fails while another program still holds the file open exclusively (Windows)
+            with open(path, 'rb'):
+                pass
+        except OSError:
+            return False
+        return zipfile.is_zipfile(path)
+
+    def _take(self, path: str):
+        """Move a complete ZIP into the spool and queue it, unless it is a duplicate"""
+        name = os.path.basename(path)
+        directory = tempfile.mkdtemp(prefix='zip_', dir=self.spool_dir)
+        spooled = os.path.join(directory, name)
+        try:
+            shutil.move(path, spooled)
+        except OSError:
+            # Removed or locked again in the meantime; the next scan sees it anew
+            shutil.rmtree(directory, ignore_errors=True)
+            return
+
+        digest = content_hash(spooled)
+        duplicate = self._duplicate_message(digest)
+        if duplicate is not None:
+            self._reject(spooled, duplicate)
+            shutil.rmtree(directory, ignore_errors=True)
+            return
+        self._enqueue(SpooledArchive(name, spooled, digest))
+
+    def _duplicate_message(self, digest: str) -> Optional[str]:
+        if digest in self._active:
+            return f"Duplicate of {self._active[digest].name}, which is already queued"
+        previous = self.processed.get(digest)
+        if previous is not None:
+            return (f"Duplicate of {previous['zip']}, processed {previous['finished']} "
+                    f"into {previous['report']}")
+        return None
+
+    def _enqueue(self, archive: SpooledArchive):
+        self._active[archive.digest] = archive
+        heapq.heappush(self._queue, (archive.size, next(self._arrivals), archive))
+        self.log(f"Queued {archive.name} ({archive.size / (1024 * 1024):.1f} MB, "
+                 f"{len(self._queue)} waiting)")
+
+    def _dispatch(self):
+        """Start the smallest waiting archives on free workers"""
+        while self._queue and len(self._running) < self.jobs:
+            _, _, archive = heapq.heappop(self._queue)
+            info = self._society(archive.name)
+            archive.attempts += 1
+            archive.work_dir = tempfile.mkdtemp(prefix='job_', dir=self.work_root)
+            args = (process_archive, archive.path, info['society_name'], info['society_number'],
+                    archive.work_dir, self.settings, None, self.export_formats, self.results_db,
+                    self._journal_path(archive))
+            try:
+                future = self._pool().submit(*args)
+            except BrokenProcessPool:
+                # A worker died since the last job finished; start a fresh pool
+                self._executor = None
+                future = self._pool().submit(*args)
+            self._running[future] = archive
+            self.log(f"Started {archive.name}")
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.jobs, initializer=_ignore_stop_signals)
+        return self._executor
+
+    def _society(self, zip_name: str) -> Dict[str, str]:
+        """Society name and number from the metadata CSV, which is re-read when it changes"""
+        if self.metadata_path:
+            try:
+                mtime = os.path.getmtime(self.metadata_path)
+                if mtime != self._metadata_mtime:
+                    self._metadata = load_metadata(self.metadata_path)
+                    self._metadata_mtime = mtime
+            except (OSError, ValueError) as e:
+                self.log(f"⚠ Could not read {self.metadata_path}: {e}")
+        info = self._metadata.get(zip_name)
+        if info is None:
+            if self.metadata_path:
+                self.log(f"⚠ No society metadata for {zip_name}")
+            info = {'society_name': '', 'society_number': ''}
+        return info
+
+    def _collect(self):
+        """Wait up to one poll interval and finish the jobs that are done"""
+        if not self._running:
+            self.stop_event.wait(self.poll_seconds)
+            return
+        done, _ = wait(list(self._running), timeout=self.poll_seconds, return_when=FIRST_COMPLETED)
+        for future in done:
+            self._finish(future, self._running.pop(future))
+
+    def _finish(self, future: Future, archive: SpooledArchive):
+        """Publish the report of a finished job, or move its archive to the errors folder"""
+        try:
+            result = future.result()
+        except BrokenProcessPool:
+            self._executor = None
+            shutil.rmtree(archive.work_dir, ignore_errors=True)
+            if self.stop_event.is_set():
+                # Queued again at the next start
+                del self._active[archive.digest]
+            elif archive.attempts < MAX_ATTEMPTS:
+                heapq.heappush(self._queue, (archive.size, next(self._arrivals), archive))
+                self.log(f"⚠ Worker process of {archive.name} stopped; queued again")
+            else:
+                self._fail(archive, "The worker process stopped unexpectedly")
+            return
+        except Exception as e:
+            self._fail(archive, str(e))
+            return
+
+        try:
+            published = [_publish(path, self.outbox) for path in [result['report'], *result['exports']]]
+            self.processed[archive.digest] = {
+                'zip': archive.name,
+                'report': os.path.basename(published[0]),
+                'finished': datetime.now().isoformat(timespec='seconds')
+            }
+            self._save_index()
+            if self.archive_dir:
+                _publish(archive.path, self.archive_dir)
+        except OSError as e:
+            self._fail(archive, f"Could not publish the report: {e}")
+            return
+        self._release(archive)
+
+        self.log(f"✓ {archive.name} -> {published[0]} ({result['files']} files)")
+        if result['resumed']['files_resumed'] or result['resumed']['ranges_resumed']:
+            self.log(f"  Resumed from the journal: {result['resumed']['files_resumed']} files, "
+                     f"{result['resumed']['ranges_resumed']} page ranges")
+        if result['page_stats_error']:
+            self.log(f"  ⚠ {result['page_stats_error']}")
+        if result['missing']:
+            self.log(f"  Missing: {', '.join(result['missing'])}")
+        if result['file_errors']:
+            self.log(f"  ✗ Could not read {', '.join(result['file_errors'])}")
+
+    def _fail(self, archive: SpooledArchive, message: str):
+        self._reject(archive.path, message)
+        self._release(archive)
+
+    def _release(self, archive: SpooledArchive):
+        """Remove the job's work and spool directories and its journal"""
+        shutil.rmtree(archive.work_dir, ignore_errors=True)
+        shutil.rmtree(os.path.dirname(archive.path), ignore_errors=True)
+        try:
+            os.remove(self._journal_path(archive))
+        except FileNotFoundError:
+            pass
+        del self._active[archive.digest]
+
+    def _journal_path(self, archive: SpooledArchive) -> str:
+        return os.path.join(self.journal_dir, f"{archive.digest}.jsonl")
+
+    def _reject(self, path: str, message: str):
+        """Move a ZIP to the errors folder next to a note saying why"""
+        target = _publish(path, self.errors)
+        with open(target + '.error.txt', 'w', encoding='utf-8') as file:
+            file.write(f"{datetime.now().isoformat(timespec='seconds')}\n{message}\n")
+        self.log(f"✗ {os.path.basename(path)}: {message}")
+
+    def _load_index(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.processed, file, indent=1)
+        os.replace(temp_path, self.index_path)
+
+
+def _log(message: str):
+    print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {message}", flush=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Generate Audit Index reports for ZIP files dropped into a folder")
+    parser.add_argument('inbox', help="Folder to watch for society ZIP files")
+    parser.add_argument('--outbox', required=True, help="Folder for the finished Audit_Index reports")
+    parser.add_argument('--errors', required=True, help="Folder for archives that could not be processed")
+    parser.add_argument('--archive-dir', help="Move processed ZIP files here (default: delete them)")
+    parser.add_argument('--state-dir', default=os.path.join(os.path.expanduser('~'), '.audit_index_processor', 'watch'),
+                        help="Spool, work directories and the index of processed archives")
+    parser.add_argument('--metadata', help="CSV with zip, society_name and society_number columns (re-read when changed)")
+    parser.add_argument('--jobs', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Number of archives processed in parallel")
+    parser.add_argument('--workers', type=int, default=1, help="PDF extraction worker processes per archive")
+    parser.add_argument('--settle', type=float, default=10.0,
+                        help="Seconds a ZIP must stay unchanged before it is taken")
+    parser.add_argument('--reject-after', type=float, default=300.0,
+                        help="Seconds an unchanged file must stay unreadable as a ZIP before it is moved to errors")
+    parser.add_argument('--poll', type=float, default=2.0, help="Seconds between inbox scans")
+    parser.add_argument('--once', action='store_true', help="Exit when the inbox is empty and all jobs are done")
+    parser.add_argument('--cache-dir', help="Directory for the persistent extraction cache")
+    parser.add_argument('--backend', default='auto',
+                        help="PDF text-extraction backend (see pdf_backends.py --list; default: fastest installed)")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="Parse PDFs in worker processes while this process decompresses the next members "
+                             "and writes the report (see pipeline_stages.py)")
+    parser.add_argument('--page-stats', metavar='FILE',
+                        help="Learn which pages hold totals per schedule/annexure number (see audit_batch.py)")
+    parser.add_argument('--shard-pages', type=int, metavar='PAGES',
+                        help="Split PDFs of more than PAGES pages into page ranges for separate workers "
+                             "(see audit_batch.py)")
+    parser.add_argument('--export', nargs='*', choices=['csv', 'jsonl', 'parquet'], metavar='FORMAT',
+                        help="Also export the totals as csv, jsonl and/or parquet next to each report")
+    parser.add_argument('--results-db', metavar='FILE',
+                        help="Record every run in this SQLite results database (query it with results_db.py)")
+    add_limit_arguments(parser)
+    args = parser.parse_args(argv)
+
+    settings = {
+        'workers': args.workers,
+        'in_archive': True,
+        'use_mmap': True,
+        'cache_dir': args.cache_dir,
+        'prescreen': True,
+        'backend': args.backend,
+        'pipeline': args.pipeline,
+        'page_stats_path': args.page_stats,
+        'shard_pages': args.shard_pages,
+        **limit_settings(args)
+    }
+    folder = HotFolder(args.inbox, args.outbox, args.errors, args.state_dir, args.jobs, settings,
+                       args.metadata, args.export, args.archive_dir, args.results_db, args.settle, args.poll,
+                       args.reject_after, _log)
+
+    def stop(signum, frame):
+        _log("Stopping after the running archives")
+        folder.stop()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    _log(f"Watching {os.path.abspath(args.inbox)} ({folder.jobs} parallel jobs)")
+    folder.run(once=args.once)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
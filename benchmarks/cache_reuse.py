@@ -0,0 +1,99 @@
+"""Check that a second run of the same archive is served from the result cache
+
+Usage:
+    python benchmarks/cache_reuse.py [--pages 50] [--no-prescreen] [--verify-prescreen] [--backend auto]
+
+A synthetic archive (see synthetic_archive.py for the options) is processed
+twice with the same cache directory, each run in a fresh interpreter, with the
+pre-screen on as in the GUI, batch, watch and service modes. The time and cache
+counters of both runs are printed as JSON. The exit code is 1 when the second
+run extracts any PDF again (a cache miss) or its totals differ from the first.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from synthetic_archive import add_arguments, archive_options, make_audit_zip
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_once(zip_path: str, settings: dict) -> dict:
+    """Process the archive once in this process"""
+    sys.path.insert(0, REPO_DIR)
+    from file_processor import FileProcessor
+
+    processor = FileProcessor(**settings)
+    try:
+        start = time.perf_counter()
+        processor.extract_zip(zip_path)
+        processor.verify_schedules_annexures()
+        processor.process_all_files()
+        seconds = time.perf_counter() - start
+        totals = {f["filename"]: f["page_totals"] for f in processor.file_data}
+        errors = [f["filename"] for f in processor.file_data if "error" in f]
+        return {"seconds": seconds, "cache": processor.cache.counters(), "totals": totals, "errors": errors}
+    finally:
+        processor.cleanup()
+        processor.cache.close()
+
+
+def measure_once(zip_path: str, settings: dict) -> dict:
+    """Run once in a fresh interpreter, so nothing but the cache is shared between runs"""
+    command = [sys.executable, os.path.abspath(__file__), "--run-once", zip_path,
+               "--settings", json.dumps(settings)]
+    completed = subprocess.run(command, cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check that unchanged PDFs are served from the result cache")
+    add_arguments(parser)
+    parser.add_argument("--no-prescreen", action="store_true", help="Read every page (no content-stream pre-screen)")
+    parser.add_argument("--verify-prescreen", action="store_true",
+                        help="Extract the pages the pre-screen skips too and report any with totals")
+    parser.add_argument("--backend", default="auto", help="PDF text-extraction backend (pdf_backends.py)")
+    parser.add_argument("--run-once", metavar="ZIP", help=argparse.SUPPRESS)
+    parser.add_argument("--settings", default="{}", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_once:
+        print(json.dumps(run_once(args.run_once, json.loads(args.settings))))
+        return 0
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        zip_path = os.path.join(work_dir, "synthetic_audit.zip")
+        make_audit_zip(zip_path, **archive_options(args))
+        settings = {"in_archive": True, "cache_dir": os.path.join(work_dir, "cache"),
+                    "prescreen": not args.no_prescreen, "verify_prescreen": args.verify_prescreen,
+                    "backend": args.backend}
+        first = measure_once(zip_path, settings)
+        second = measure_once(zip_path, settings)
+
+    print(json.dumps({
+        "options": dict(archive_options(args), **settings),
+        "first": {"seconds": first["seconds"], "cache": first["cache"]},
+        "second": {"seconds": second["seconds"], "cache": second["cache"]},
+    }, indent=2))
+
+    problems = []
+    if first["errors"] or second["errors"]:
+        problems.append(f"could not process {', '.join(sorted(set(first['errors'] + second['errors'])))}")
+    if second["cache"]["misses"] or not second["cache"]["hits"]:
+        problems.append(f"second run missed the cache {second['cache']['misses']} times "
+                        f"({second['cache']['hits']} hits)")
+    if second["totals"] != first["totals"]:
+        problems.append("second run found different totals")
+    for problem in problems:
+        print(f"✗ {problem}", file=sys.stderr)
+    if not problems:
+        print("✓ Second run was served from the cache")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
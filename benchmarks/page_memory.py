@@ -0,0 +1,110 @@
+"""Check that walking a long PDF page by page does not keep each page's parsed content
+
+Usage:
+    python benchmarks/page_memory.py [--pages 100 400] [--backend PyPDF2 pypdf] [--tolerance 0.5]
+
+For each backend, a ledger PDF (see synthetic_archive.py) is generated at each
+page count and FileProcessor.iter_page_totals walks it while tracemalloc
+records the peak of Python allocations. The peak of only opening the PDF and
+counting its pages is measured too: PyPDF2 and pypdf build an index of every
+page when the page count is read (a few KB per page), so that part grows with
+the page count by design. What the walk adds on top of it (the extraction
+overhead) must stay about the same from the smallest to the largest page
+count; the exit code is 1 when it grows by more than --tolerance (and by more
+than --min-mb). Memory allocated outside Python (e.g. by pypdfium2) is not seen.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+
+from synthetic_archive import build_pdf, ledger_pages
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def traced_peak_mb(function) -> float:
+    """Peak of Python allocations while function runs, in MB"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def measure(pdf_path: str, backend: str) -> dict:
+    """Peak memory of opening the PDF and of walking all of its pages"""
+    sys.path.insert(0, REPO_DIR)
+    from file_processor import FileProcessor
+
+    processor = FileProcessor(backend=backend)
+    extraction_backend = processor.extraction_backend()
+
+    def open_only():
+        with open(pdf_path, 'rb') as file, extraction_backend.open(file) as document:
+            document.page_count
+
+    def walk():
+        for _ in processor.iter_page_totals(pdf_path):
+            pass
+
+    open_mb = traced_peak_mb(open_only)
+    walk_mb = traced_peak_mb(walk)
+    return {"open_mb": open_mb, "walk_mb": walk_mb, "overhead_mb": walk_mb - open_mb}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check that page-by-page extraction releases each page")
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 400], help="Page counts to compare")
+    parser.add_argument("--backend", nargs="+", default=["PyPDF2", "pypdf"],
+                        help="PDF text-extraction backends (pdf_backends.py); missing ones are skipped")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed relative growth of the extraction overhead (0.5 = 50%%)")
+    parser.add_argument("--min-mb", type=float, default=0.25,
+                        help="Growth below this many MB is never a regression")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, REPO_DIR)
+    from pdf_backends import BACKENDS
+
+    results, regressions = {}, []
+    with tempfile.TemporaryDirectory() as work_dir:
+        paths = {}
+        for pages in sorted({10, *args.pages}):
+            # Schedule naming, so the file is parsed like a real one
+            paths[pages] = os.path.join(work_dir, f"Schedule 5 ({pages} pages).pdf")
+            with open(paths[pages], "wb") as file:
+                file.write(build_pdf(ledger_pages(random.Random(args.seed), pages, 0.3)))
+
+        for backend in args.backend:
+            if backend not in BACKENDS or not BACKENDS[backend].available():
+                print(f"Skipping {backend}: not installed", file=sys.stderr)
+                continue
+            # Warm up imports and the library's caches (e.g. font tables) first
+            measure(paths[10], backend)
+            runs = {pages: measure(paths[pages], backend) for pages in sorted(args.pages)}
+            results[backend] = runs
+
+            smallest, largest = runs[min(runs)], runs[max(runs)]
+            growth = largest["overhead_mb"] - smallest["overhead_mb"]
+            if growth > args.min_mb and growth > smallest["overhead_mb"] * args.tolerance:
+                regressions.append(f"{backend}: extraction overhead {largest['overhead_mb']:.2f} MB at "
+                                   f"{max(runs)} pages vs {smallest['overhead_mb']:.2f} MB at {min(runs)} pages")
+
+    print(json.dumps(results, indent=2))
+    for regression in regressions:
+        print(f"✗ Memory grows with the page count: {regression}", file=sys.stderr)
+    if not regressions:
+        print("✓ Extraction overhead does not grow with the page count")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""Time each processing stage on a synthetic audit ZIP and compare against a baseline
+
+Usage:
+    python benchmarks/pipeline.py [--repeat 3] [--pages 50] [--workers 1] [--in-archive] [--backend auto]
+        [--pipeline] [--baseline benchmarks/baseline.json] [--update-baseline]
+
+A synthetic archive (see synthetic_archive.py for the options) is generated in
+a temporary directory, then every repeat runs the pipeline in a fresh
+interpreter: extract_zip, verify_schedules_annexures, process_all_files and
+generate_excel_report. The median time of each stage, pages per second,
+megabytes per second and peak memory (max RSS, where the platform reports it)
+are printed as JSON. With --pipeline the streaming report is opened before
+process_all_files (as batch mode does), so report rows are written while files
+are parsed and generate_excel_report only times finishing the report.
+
+With a baseline file, a stage slower than the baseline by more than --tolerance
+(and by more than --min-seconds), or peak memory above it by more than
+--memory-tolerance, is a regression and the exit code is 1. The baseline is
+only compared when it was recorded with the same archive and processor options;
+--update-baseline writes the current results to it instead. Baselines are
+machine specific, so record one on the machine that runs the comparison.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from synthetic_archive import add_arguments, archive_options, make_audit_zip
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+STAGES = ["extract_zip", "verify_schedules_annexures", "process_all_files", "generate_excel_report"]
+
+
+def peak_memory_mb():
+    """Peak resident set size of this process in MB, or None if unavailable"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_once(zip_path: str, settings: dict, streaming: bool) -> dict:
+    """Run the pipeline once in this process and time each stage"""
+    sys.path.insert(0, REPO_DIR)
+    from file_processor import FileProcessor
+
+    processor = FileProcessor(**settings)
+    seconds = {}
+    output_dir = tempfile.mkdtemp()
+    try:
+        processor.upload_zip_file(zip_path)
+
+        start = time.perf_counter()
+        processor.extract_zip(zip_path)
+        seconds["extract_zip"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        processor.verify_schedules_annexures()
+        seconds["verify_schedules_annexures"] = time.perf_counter() - start
+
+        report_path = os.path.join(output_dir, "report.xlsx")
+        start = time.perf_counter()
+        if settings.get("pipeline"):
+            processor.start_streaming_report(report_path, "Benchmark Society", "B-1")
+        processor.process_all_files()
+        seconds["process_all_files"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if settings.get("pipeline"):
+            processor.finish_streaming_report()
+        else:
+            processor.generate_excel_report(report_path, "Benchmark Society", "B-1", streaming=streaming)
+        seconds["generate_excel_report"] = time.perf_counter() - start
+
+        pages = sum(f["total_pages"] for f in processor.file_data if isinstance(f["total_pages"], int))
+        errors = [f["filename"] for f in processor.file_data if "error" in f]
+    finally:
+        processor.cleanup()
+        for name in os.listdir(output_dir):
+            os.remove(os.path.join(output_dir, name))
+        os.rmdir(output_dir)
+
+    return {"seconds": seconds, "pages": pages, "errors": errors, "peak_memory_mb": peak_memory_mb()}
+
+
+def measure_once(zip_path: str, settings: dict, streaming: bool) -> dict:
+    """Run one repeat in a fresh interpreter so peak memory and imports are per run"""
+    command = [sys.executable, os.path.abspath(__file__), "--run-once", zip_path,
+               "--settings", json.dumps(settings)]
+    if streaming:
+        command.append("--streaming")
+    completed = subprocess.run(command, cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def summarize(runs: list, zip_path: str, options: dict) -> dict:
+    """Median stage times, throughput and peak memory over all repeats"""
+    seconds = {stage: statistics.median(run["seconds"][stage] for run in runs) for stage in STAGES}
+    pages = runs[0]["pages"]
+    zip_mb = os.path.getsize(zip_path) / (1024 * 1024)
+    memory = [run["peak_memory_mb"] for run in runs if run["peak_memory_mb"] is not None]
+    return {
+        "options": options,
+        "repeat": len(runs),
+        "seconds": seconds,
+        "total_seconds": sum(seconds.values()),
+        "pages": pages,
+        "pages_per_second": pages / seconds["process_all_files"] if seconds["process_all_files"] else None,
+        "extract_mb_per_second": zip_mb / seconds["extract_zip"] if seconds["extract_zip"] else None,
+        "peak_memory_mb": max(memory) if memory else None,
+        "errors": sorted({name for run in runs for name in run["errors"]}),
+    }
+
+
+def find_regressions(summary: dict, baseline: dict, tolerance: float, min_seconds: float,
+                     memory_tolerance: float) -> list:
+    """Describe every stage time or peak memory that regressed against the baseline"""
+    regressions = []
+    for stage in STAGES:
+        current = summary["seconds"][stage]
+        previous = baseline["seconds"][stage]
+        if current > previous * (1 + tolerance) and current - previous > min_seconds:
+            regressions.append(f"{stage}: {current:.3f}s vs baseline {previous:.3f}s")
+
+    current = summary["peak_memory_mb"]
+    previous = baseline.get("peak_memory_mb")
+    if current is not None and previous is not None and current > previous * (1 + memory_tolerance):
+        regressions.append(f"peak memory: {current:.1f} MB vs baseline {previous:.1f} MB")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the processing pipeline on a synthetic archive")
+    add_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs")
+    parser.add_argument("--workers", type=int, default=1, help="PDF extraction worker processes")
+    parser.add_argument("--in-archive", action="store_true", help="Read PDFs straight from the ZIP")
+    parser.add_argument("--prescreen", action="store_true", help="Enable the content-stream pre-screen")
+    parser.add_argument("--streaming", action="store_true", help="Use the streaming Excel report")
+    parser.add_argument("--backend", default="auto", help="PDF text-extraction backend (pdf_backends.py)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Overlap reading, parsing and report writing (implies --in-archive and a streaming report)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative slowdown per stage (0.25 = 25%%)")
+    parser.add_argument("--min-seconds", type=float, default=0.05,
+                        help="Slowdowns below this many seconds are never regressions")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25,
+                        help="Allowed relative increase of peak memory")
+    parser.add_argument("--run-once", metavar="ZIP", help=argparse.SUPPRESS)
+    parser.add_argument("--settings", default="{}", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_once:
+        print(json.dumps(run_once(args.run_once, json.loads(args.settings), args.streaming)))
+        return 0
+
+    settings = {"workers": args.workers, "in_archive": args.in_archive, "prescreen": args.prescreen,
+                "backend": args.backend}
+    if args.pipeline:
+        # Only recorded when set, so existing baselines keep matching
+        settings["pipeline"] = True
+    options = dict(archive_options(args), **settings, streaming=args.streaming)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        zip_path = os.path.join(work_dir, "synthetic_audit.zip")
+        make_audit_zip(zip_path, **archive_options(args))
+        runs = [measure_once(zip_path, settings, args.streaming) for _ in range(args.repeat)]
+        summary = summarize(runs, zip_path, options)
+    print(json.dumps(summary, indent=2))
+
+    if summary["errors"]:
+        print(f"✗ Could not process: {', '.join(summary['errors'])}", file=sys.stderr)
+        return 1
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(summary, file, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one")
+        return 0
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    if baseline.get("options") != options:
+        print("✗ Baseline was recorded with different options; record a new one with --update-baseline",
+              file=sys.stderr)
+        return 1
+
+    regressions = find_regressions(summary, baseline, args.tolerance, args.min_seconds,
+                                   args.memory_tolerance)
+    for regression in regressions:
+        print(f"✗ Regression in {regression}", file=sys.stderr)
+    if not regressions:
+        print("✓ No regressions against the baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
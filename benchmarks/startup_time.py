@@ -0,0 +1,65 @@
+"""Measure application cold-start time so it can be tracked between releases
+
+Usage:
+    python benchmarks/startup_time.py [--repeat 5] [--headless]
+
+By default the GUI is started with --startup-check, which draws the window once
+and exits, so the measured time is process start until the window is shown.
+--headless only times `import file_processor` (no display needed, e.g. in CI).
+Both modes also report whether PyPDF2/openpyxl (or tkinter for --headless)
+were loaded, which should never be the case.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEADLESS_SCRIPT = (
+    "import json, sys, file_processor; "
+    "print(json.dumps({'heavy_modules_loaded': "
+    "[m for m in ('PyPDF2', 'openpyxl', 'tkinter') if m in sys.modules]}))"
+)
+
+
+def measure_once(headless: bool) -> dict:
+    """Start a fresh interpreter and time it until startup completes"""
+    if headless:
+        command = [sys.executable, "-c", HEADLESS_SCRIPT]
+    else:
+        command = [sys.executable, os.path.join(REPO_DIR, "file_processor.py"), "--startup-check"]
+
+    start = time.perf_counter()
+    completed = subprocess.run(command, cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    elapsed = time.perf_counter() - start
+
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["seconds"] = elapsed
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure application startup time")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of cold starts to time")
+    parser.add_argument("--headless", action="store_true", help="Only time importing file_processor")
+    args = parser.parse_args(argv)
+
+    runs = [measure_once(args.headless) for _ in range(args.repeat)]
+    heavy_modules = sorted({name for run in runs for name in run["heavy_modules_loaded"]})
+    summary = {
+        "mode": "headless" if args.headless else "gui",
+        "repeat": args.repeat,
+        "median_seconds": statistics.median(run["seconds"] for run in runs),
+        "min_seconds": min(run["seconds"] for run in runs),
+        "heavy_modules_loaded": heavy_modules,
+    }
+    print(json.dumps(summary, indent=2))
+    return 1 if heavy_modules else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""Generate synthetic audit ZIP files for benchmarks (no external dependencies)
+
+Usage:
+    python benchmarks/synthetic_archive.py OUTPUT.zip [--schedules 20] [--annexures 11]
+        [--pages 50] [--total-share 0.3] [--no-omitted] [--non-pdf 3] [--seed 1]
+
+Every PDF is a ledger whose pages carry filler lines; a share of the pages also
+has a "Total" row with opening balance, debit, credit and closing balance that
+reconcile, and the last page of each file has a "Grand Total" row. Noise can be
+added: the omitted files (Schedule 1, Schedule 22, Annexure 1) and non-PDF
+members. The same arguments and seed always produce the same archive.
+"""
+import argparse
+import io
+import random
+import sys
+import zipfile
+import zlib
+from typing import Dict, List
+
+# Schedules 2-21 and Annexures 2-12 are expected; more files reuse the numbers
+SCHEDULE_NUMBERS = list(range(2, 22))
+ANNEXURE_NUMBERS = list(range(2, 13))
+OMITTED_FILES = ["Schedule 1.pdf", "Schedule 22.pdf", "Annexure 1.pdf"]
+NON_PDF_MEMBERS = [
+    ("readme.txt", b"Audit documents\r\n"),
+    ("Schedule 5 working.xlsx", b"PK\x03\x04 not really a workbook"),
+    ("scans/Thumbs.db", b"\x00" * 512),
+]
+LINES_PER_PAGE = 40
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(pages: List[List[str]]) -> bytes:
+    """Build a minimal PDF with one Helvetica text line per entry of each page"""
+    objects: List[bytes] = []
+
+    def add(data: bytes) -> int:
+        objects.append(data)
+        return len(objects)
+
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = add(b"")
+    kids = []
+    for lines in pages:
+        text = "BT /F1 9 Tf 40 800 Td 11 TL " + \
+            " ".join(f"({_escape(line)}) Tj T*" for line in lines) + " ET"
+        stream = zlib.compress(text.encode("latin-1"))
+        content_id = add(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) +
+                         stream + b"\nendstream")
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font_id, content_id)
+        ))
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids))
+    catalog_id = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, data in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + data + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" %
+              (len(objects) + 1, catalog_id, xref))
+    return out.getvalue()
+
+
+def _amount(value: float) -> str:
+    return f"{value:,.2f}"
+
+
+def ledger_pages(rng: random.Random, pages: int, total_share: float) -> List[List[str]]:
+    """Text lines of a ledger; balances carry forward between the pages with totals"""
+    balance = round(rng.uniform(1000, 100000), 2)
+    result = []
+    for page in range(pages):
+        lines = [f"Ledger entry {page + 1}.{line + 1}  Voucher {rng.randint(1000, 99999)}  "
+                 f"{_amount(rng.uniform(1, 50000))}" for line in range(LINES_PER_PAGE)]
+        last_page = page == pages - 1
+        if last_page or rng.random() < total_share:
+            debit = round(rng.uniform(0, 50000), 2)
+            # The parser reads unsigned amounts, so balances never go negative
+            credit = round(rng.uniform(0, min(50000, balance + debit)), 2)
+            closing = round(balance + debit - credit, 2)
+            label = "Grand Total" if last_page else "Total"
+            lines.append(f"{label} {_amount(balance)} {_amount(debit)} {_amount(credit)} {_amount(closing)}")
+            balance = closing
+        result.append(lines)
+    return result
+
+
+def make_audit_zip(path: str, schedules: int = 20, annexures: int = 11, pages: int = 50,
+                   total_share: float = 0.3, omitted: bool = True, non_pdf: int = 3,
+                   seed: int = 1) -> Dict[str, int]:
+    """Write a synthetic audit ZIP and return what it contains"""
+    rng = random.Random(seed)
+    names = []
+    for index in range(schedules):
+        number = SCHEDULE_NUMBERS[index % len(SCHEDULE_NUMBERS)]
+        part = index // len(SCHEDULE_NUMBERS)
+        names.append(f"Schedules/Schedule {number}" + (f" part {part + 1}" if part else "") + ".pdf")
+    for index in range(annexures):
+        number = ANNEXURE_NUMBERS[index % len(ANNEXURE_NUMBERS)]
+        part = index // len(ANNEXURE_NUMBERS)
+        names.append(f"Annexures/Annexure-{number}" + (f" part {part + 1}" if part else "") + ".pdf")
+    if omitted:
+        names.extend(OMITTED_FILES)
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name in names:
+            archive.writestr(name, build_pdf(ledger_pages(rng, pages, total_share)))
+        for name, data in NON_PDF_MEMBERS[:non_pdf]:
+            archive.writestr(name, data)
+
+    return {
+        "pdf_files": len(names),
+        "processed_files": schedules + annexures,
+        "pages": len(names) * pages,
+        "processed_pages": (schedules + annexures) * pages,
+    }
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Archive options shared with the pipeline benchmark"""
+    parser.add_argument("--schedules", type=int, default=20, help="Number of schedule PDFs")
+    parser.add_argument("--annexures", type=int, default=11, help="Number of annexure PDFs")
+    parser.add_argument("--pages", type=int, default=50, help="Pages per PDF")
+    parser.add_argument("--total-share", type=float, default=0.3,
+                        help="Share of pages with a TOTAL row (the last page always has one)")
+    parser.add_argument("--no-omitted", dest="omitted", action="store_false",
+                        help="Leave out Schedule 1, Schedule 22 and Annexure 1")
+    parser.add_argument("--non-pdf", type=int, default=3, choices=range(len(NON_PDF_MEMBERS) + 1),
+                        help="Number of non-PDF members")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+
+
+def archive_options(args: argparse.Namespace) -> Dict:
+    """make_audit_zip keyword arguments from parsed command-line options"""
+    return {
+        "schedules": args.schedules,
+        "annexures": args.annexures,
+        "pages": args.pages,
+        "total_share": args.total_share,
+        "omitted": args.omitted,
+        "non_pdf": args.non_pdf,
+        "seed": args.seed,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic audit ZIP file")
+    parser.add_argument("output", help="Path of the ZIP file to write")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    contents = make_audit_zip(args.output, **archive_options(args))
+    print(f"Wrote {args.output}: {contents['pdf_files']} PDFs, {contents['pages']} pages")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
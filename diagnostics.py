@@ -0,0 +1,130 @@
+"""Timing and profiling data collected while FileProcessor runs
+
+Diagnostics records wall and CPU time per stage (extract_zip,
+verify_schedules_annexures, process_all_files, report generation) and per PDF
+file, together with pages, bytes read and pages per second. One file can also
+be run under cProfile. Everything can be exported as JSON, written to a
+"Diagnostics" report sheet or summarized in the GUI log.
+
+CPU times are those of the process that did the work, so with worker
+processes the per-file CPU times are the workers' and the process_all_files
+stage only counts the main process.
+"""
+import io
+import json
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+# Lines of cProfile output kept per profiled file
+PROFILE_LINES = 30
+
+
+class Diagnostics:
+    """Per-stage and per-file timings of one archive"""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict] = {}
+        self.files: List[Dict] = []
+        self.profiles: Dict[str, str] = {}
+
+    def reset(self):
+        """Forget everything recorded so far"""
+        self.stages = {}
+        self.files = []
+        self.profiles = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a processing stage; repeated stages add up"""
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(name, {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'calls': 0})
+            entry['wall_seconds'] += time.perf_counter() - wall
+            entry['cpu_seconds'] += time.process_time() - cpu
+            entry['calls'] += 1
+
+    @contextmanager
+    def measure_file(self, filename: str) -> Iterator[Dict]:
+        """Time the extraction of one PDF; the caller fills in pages, bytes_read and cached"""
+        entry = {'filename': filename, 'pages': 0, 'bytes_read': 0, 'cached': False}
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield entry
+        finally:
+            entry['wall_seconds'] = time.perf_counter() - wall
+            entry['cpu_seconds'] = time.process_time() - cpu
+            entry['pages_per_second'] = entry['pages'] / entry['wall_seconds'] if entry['wall_seconds'] else None
+            self.files.append(entry)
+
+    def add_profile(self, filename: str, profiler):
+        """Keep the top functions by cumulative time of a cProfile run"""
+        import pstats
+
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(PROFILE_LINES)
+        self.profiles[filename] = output.getvalue()
+
+    def worker_data(self) -> Dict:
+        """File timings and profiles to send back from a worker process"""
+        return {'files': self.files, 'profiles': self.profiles}
+
+    def merge(self, data: Dict):
+        """Add the file timings and profiles collected by a worker process"""
+        self.files.extend(data['files'])
+        self.profiles.update(data['profiles'])
+
+    def totals(self) -> Dict:
+        """Pages, bytes and throughput over all extracted files"""
+        extracted = [entry for entry in self.files if not entry['cached']]
+        pages = sum(entry['pages'] for entry in self.files)
+        processing = self.stages.get('process_all_files', {}).get('wall_seconds')
+        return {
+            'files': len(self.files),
+            'cached_files': len(self.files) - len(extracted),
+            'pages': pages,
+            'bytes_read': sum(entry['bytes_read'] for entry in self.files),
+            'file_wall_seconds': sum(entry['wall_seconds'] for entry in self.files),
+            'file_cpu_seconds': sum(entry['cpu_seconds'] for entry in self.files),
+            'pages_per_second': pages / processing if processing else None
+        }
+
+    def slowest_files(self, count: int = 5) -> List[Dict]:
+        """The files that took the longest wall time"""
+        return sorted(self.files, key=lambda entry: entry['wall_seconds'], reverse=True)[:count]
+
+    def to_dict(self) -> Dict:
+        """All diagnostics as plain data"""
+        return {
+            'stages': self.stages,
+            'totals': self.totals(),
+            'files': sorted(self.files, key=lambda entry: entry['filename']),
+            'profiles': self.profiles
+        }
+
+    def export_json(self, path: str):
+        """Write the diagnostics to a JSON file"""
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    def summary_lines(self) -> List[str]:
+        """Short human-readable summary (e.g. for the GUI log)"""
+        lines = []
+        for name, entry in self.stages.items():
+            lines.append(f"{name}: {entry['wall_seconds']:.2f}s wall, {entry['cpu_seconds']:.2f}s CPU")
+
+        totals = self.totals()
+        throughput = totals['pages_per_second']
+        lines.append(f"{totals['files']} files ({totals['cached_files']} from cache), {totals['pages']} pages, "
+                     f"{totals['bytes_read'] / (1024 * 1024):.1f} MB read" +
+                     (f", {throughput:.1f} pages/s" if throughput else ""))
+        for entry in self.slowest_files(3):
+            lines.append(f"Slowest: {entry['filename']} {entry['wall_seconds']:.2f}s "
+                         f"({entry['pages']} pages)")
+        for filename in self.profiles:
+            lines.append(f"Profile recorded for {filename}")
+        return lines
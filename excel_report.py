@@ -0,0 +1,297 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
+
+
+REPORT_COLUMNS = 6
+REPORT_LAST_COLUMN = 'F'
+TABLE_HEADERS = ['Page', 'Total Row', 'Opening Balance', 'Debit', 'Credit', 'Closing Balance']
+COLUMN_WIDTHS = {'A': 10, 'B': 14, 'C': 18, 'D': 15, 'E': 15, 'F': 18}
+CHANGES_HEADERS = ['File', 'Page', 'Change', 'Previous', 'Current']
+CHANGES_COLUMN_WIDTHS = {'A': 40, 'B': 10, 'C': 18, 'D': 18, 'E': 18}
+CHANGE_LABELS = {'added': 'File added', 'removed': 'File removed'}
+RECONCILIATION_HEADERS = ['File', 'Page', 'Check', 'Expected', 'Found', 'Difference']
+RECONCILIATION_COLUMN_WIDTHS = {'A': 40, 'B': 10, 'C': 18, 'D': 18, 'E': 18, 'F': 15}
+STAGE_HEADERS = ['Stage', 'Wall (s)', 'CPU (s)', 'Calls']
+DIAGNOSTICS_FILE_HEADERS = ['File', 'Pages', 'Bytes Read', 'Wall (s)', 'CPU (s)', 'Pages/s', 'Cached']
+DIAGNOSTICS_COLUMN_WIDTHS = {'A': 40, 'B': 12, 'C': 14, 'D': 12, 'E': 12, 'F': 12, 'G': 10}
+
+
+def _report_styles() -> List[NamedStyle]:
+    """Named styles shared by every cell of the streaming report"""
+    center_align = Alignment(horizontal='center', vertical='center', wrap_text=True)
+    left_align = Alignment(horizontal='left', vertical='center', wrap_text=True)
+    thin_border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    normal_font = Font(name='Arial', size=10)
+    title_font = Font(name='Arial', size=12, bold=True)
+
+    return [
+        NamedStyle(name='audit_heading', font=Font(name='Arial', size=16, bold=True),
+                   alignment=center_align),
+        NamedStyle(name='audit_title', font=title_font, alignment=center_align),
+        NamedStyle(name='audit_missing_title', font=title_font, alignment=center_align,
+                   fill=PatternFill(start_color='FF6B6B', end_color='FF6B6B', fill_type='solid')),
+        NamedStyle(name='audit_missing_item', font=normal_font, alignment=center_align,
+                   border=thin_border),
+        NamedStyle(name='audit_file_header', font=Font(name='Arial', size=10, bold=True),
+                   alignment=left_align),
+        NamedStyle(name='audit_table_header', font=Font(name='Arial', size=10, bold=True, color='FFFFFF'),
+                   alignment=center_align, border=thin_border,
+                   fill=PatternFill(start_color='4A90E2', end_color='4A90E2', fill_type='solid')),
+        NamedStyle(name='audit_cell', font=normal_font, alignment=center_align, border=thin_border),
+        NamedStyle(name='audit_cell_alt', font=normal_font, alignment=center_align, border=thin_border,
+                   fill=PatternFill(start_color='F0F0F0', end_color='F0F0F0', fill_type='solid')),
+    ]
+
+
+def register_report_styles(wb: Workbook):
+    """Add the report's named styles to a workbook (once)"""
+    for style in _report_styles():
+        if style.name not in wb.named_styles:
+            wb.add_named_style(style)
+
+
+def _append_styled(ws, values: List, style: str):
+    """Append one row to a (possibly write-only) sheet with a named style on every cell"""
+    cells = []
+    for value in values:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        cells.append(cell)
+    ws.append(cells)
+
+
+def write_reconciliation_sheet(wb: Workbook, mismatches: List[Dict]):
+    """Add a 'Reconciliation' sheet listing pages and schedules whose totals do not add up
+
+    Works for both normal and write-only workbooks.
+    """
+    register_report_styles(wb)
+    ws = wb.create_sheet("Reconciliation")
+    for column, width in RECONCILIATION_COLUMN_WIDTHS.items():
+        ws.column_dimensions[column].width = width
+    last_column = chr(ord('A') + len(RECONCILIATION_HEADERS) - 1)
+
+    _append_styled(ws, ["Balance Reconciliation"] + [None] * (len(RECONCILIATION_HEADERS) - 1),
+                   'audit_title')
+    ws.merged_cells.add(f"A1:{last_column}1")
+    ws.append([])
+
+    if not mismatches:
+        _append_styled(ws, ["✓ All balances, carry-forwards and schedule totals reconcile"] +
+                       [None] * (len(RECONCILIATION_HEADERS) - 1), 'audit_title')
+        ws.merged_cells.add(f"A3:{last_column}3")
+        return
+
+    _append_styled(ws, RECONCILIATION_HEADERS, 'audit_table_header')
+    for idx, mismatch in enumerate(mismatches):
+        check = mismatch['check']
+        if mismatch.get('label', 'Total') != 'Total':
+            check = f"{check} ({mismatch['label']})"
+        row = [mismatch['filename'], mismatch['page'], check,
+               mismatch['expected'], mismatch['actual'], mismatch['difference']]
+        # Alternate row colors
+        _append_styled(ws, row, 'audit_cell_alt' if idx % 2 == 1 else 'audit_cell')
+
+
+def write_diagnostics_sheet(wb: Workbook, diagnostics: Dict, note: Optional[str] = None):
+    """Add a 'Diagnostics' sheet with stage and per-file timings (Diagnostics.to_dict())
+
+    note is shown under the stage table. Works for both normal and write-only workbooks.
+    """
+    register_report_styles(wb)
+    ws = wb.create_sheet("Diagnostics")
+    for column, width in DIAGNOSTICS_COLUMN_WIDTHS.items():
+        ws.column_dimensions[column].width = width
+    width = len(DIAGNOSTICS_FILE_HEADERS)
+    last_column = chr(ord('A') + width - 1)
+    row = 0
+
+    def append(values: List, style: str, merged: bool = False):
+        nonlocal row
+        _append_styled(ws, values + [None] * (width - len(values)) if merged else values, style)
+        row += 1
+        if merged:
+            ws.merged_cells.add(f"A{row}:{last_column}{row}")
+
+    def blank():
+        nonlocal row
+        ws.append([])
+        row += 1
+
+    append(["Diagnostics"], 'audit_title', merged=True)
+    blank()
+
+    append(STAGE_HEADERS, 'audit_table_header')
+    for idx, (name, stage) in enumerate(diagnostics['stages'].items()):
+        append([name, round(stage['wall_seconds'], 3), round(stage['cpu_seconds'], 3), stage['calls']],
+               'audit_cell_alt' if idx % 2 == 1 else 'audit_cell')
+    if note:
+        append([note], 'audit_cell', merged=True)
+    blank()
+
+    totals = diagnostics['totals']
+    throughput = totals['pages_per_second']
+    append([f"{totals['files']} files ({totals['cached_files']} from cache) | {totals['pages']} pages | "
+            f"{totals['bytes_read']} bytes read" +
+            (f" | {throughput:.1f} pages/s" if throughput else "")], 'audit_file_header', merged=True)
+    append(DIAGNOSTICS_FILE_HEADERS, 'audit_table_header')
+    for idx, entry in enumerate(diagnostics['files']):
+        pages_per_second = entry['pages_per_second']
+        append([entry['filename'], entry['pages'], entry['bytes_read'], round(entry['wall_seconds'], 3),
+                round(entry['cpu_seconds'], 3),
+                round(pages_per_second, 1) if pages_per_second is not None else None,
+                'Yes' if entry['cached'] else 'No'],
+               'audit_cell_alt' if idx % 2 == 1 else 'audit_cell')
+
+    for filename, profile in diagnostics['profiles'].items():
+        blank()
+        append([f"cProfile: {filename}"], 'audit_file_header', merged=True)
+        for line in profile.splitlines():
+            ws.append([line])
+            row += 1
+
+
+def write_changes_sheet(wb: Workbook, changes: List[Dict], previous_run: Optional[str] = None):
+    """Add a 'Changes Since Last Run' sheet listing files, pages and totals that moved
+
+    Works for both normal and write-only workbooks.
+    """
+    register_report_styles(wb)
+    ws = wb.create_sheet("Changes Since Last Run")
+    for column, width in CHANGES_COLUMN_WIDTHS.items():
+        ws.column_dimensions[column].width = width
+
+    title = "Changes Since Last Run"
+    if previous_run:
+        title += f" (previous run: {previous_run})"
+    _append_styled(ws, [title] + [None] * (len(CHANGES_HEADERS) - 1), 'audit_title')
+    ws.merged_cells.add("A1:E1")
+    ws.append([])
+
+    if not changes:
+        _append_styled(ws, ["No changes since the last run"] + [None] * (len(CHANGES_HEADERS) - 1),
+                       'audit_title')
+        ws.merged_cells.add("A3:E3")
+        return
+
+    _append_styled(ws, CHANGES_HEADERS, 'audit_table_header')
+    idx = 0
+    for change in changes:
+        if change['change'] in CHANGE_LABELS:
+            rows = [[change['filename'], None, CHANGE_LABELS[change['change']], None, None]]
+        else:
+            rows = [[change['filename'], page['page'], page['field'], page['previous'], page['current']]
+                    for page in change['pages']]
+        for row in rows:
+            # Alternate row colors
+            _append_styled(ws, row, 'audit_cell_alt' if idx % 2 == 1 else 'audit_cell')
+            idx += 1
+
+
+class StreamingExcelReport:
+    """Write-only 'Audit Index' workbook that streams each file's rows as soon as they are known
+
+    The layout matches FileProcessor.generate_excel_report, but cells share named
+    styles and rows are flushed to disk as they are appended, so memory use does not
+    grow with the number of pages.
+    """
+
+    def __init__(self, output_path: str, society_name: str = "",
+                 missing_files: Optional[List[str]] = None):
+        self.output_path = output_path
+        self.wb = Workbook(write_only=True)
+        register_report_styles(self.wb)
+
+        self.ws = self.wb.create_sheet("Audit Index")
+        # Column widths must be set before the first row is written
+        for column, width in COLUMN_WIDTHS.items():
+            self.ws.column_dimensions[column].width = width
+
+        self._row = 0
+        self._write_heading(society_name, missing_files or [])
+
+    def _append(self, values: List, style: Optional[str] = None):
+        """Append one row, applying a named style to every cell"""
+        cells = []
+        for value in values:
+            cell = WriteOnlyCell(self.ws, value=value)
+            if style:
+                cell.style = style
+            cells.append(cell)
+        self.ws.append(cells)
+        self._row += 1
+
+    def _append_merged(self, value: str, style: str):
+        """Append a row with one value spread over all report columns"""
+        # Write every cell of the merged range so borders and fills cover it completely
+        self._append([value] + [None] * (REPORT_COLUMNS - 1), style)
+        self.ws.merged_cells.add(f"A{self._row}:{REPORT_LAST_COLUMN}{self._row}")
+
+    def _append_blank(self):
+        self.ws.append([])
+        self._row += 1
+
+    def _write_heading(self, society_name: str, missing_files: List[str]):
+        """Write the society heading, report title and missing files section"""
+        # Top Heading - Society Name
+        if society_name:
+            self._append_merged(society_name.upper(), 'audit_heading')
+            self._append_blank()
+
+        # Title and Date
+        self._append_merged(f"File Processing Report - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+                            'audit_title')
+        self._append_blank()
+
+        # Missing Files Section
+        if missing_files:
+            self._append_merged("Missing Files", 'audit_missing_title')
+            for missing in missing_files:
+                self._append_merged(missing, 'audit_missing_item')
+            self._append_blank()
+        else:
+            self._append_merged("✓ All required files are present", 'audit_title')
+            self._append_blank()
+
+        # File Details Section
+        self._append_merged("File Details with Page-by-Page Totals", 'audit_title')
+        self._append_blank()
+
+    def write_file(self, file_info: Dict):
+        """Write the page-by-page totals table of one file"""
+        page_totals = file_info.get('page_totals')
+        if not page_totals:
+            return
+
+        self._append_merged(
+            f"File: {file_info['filename']} | Total Pages: {file_info['total_pages']} | "
+            f"Pages with Totals: {len({page_total['page'] for page_total in page_totals})}",
+            'audit_file_header'
+        )
+        self._append(TABLE_HEADERS, 'audit_table_header')
+
+        for idx, page_total in enumerate(page_totals):
+            row_data = [
+                page_total['page'],
+                page_total.get('label', 'Total'),
+                page_total['opening_balance'],
+                page_total['debit'],
+                page_total['credit'],
+                page_total['closing_balance']
+            ]
+            # Alternate row colors
+            self._append(row_data, 'audit_cell_alt' if idx % 2 == 1 else 'audit_cell')
+
+        self._append_blank()
+
+    def close(self):
+        """Finish the workbook and write it to output_path"""
+        self.wb.save(self.output_path)
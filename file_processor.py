@@ -1,25 +1,190 @@
 import os
+import collections
+import copy
+import functools
+import hashlib
+import io
+import itertools
+import json
+import mmap
+import multiprocessing
 import re
 import zipfile
 import tempfile
 import shutil
-from pathlib import Path
-from typing import List, Dict, Tuple, Optional
-import PyPDF2
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
-import tkinter as tk
-from tkinter import filedialog, messagebox, ttk
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Tuple, Optional, IO, Iterator, Iterable, NamedTuple
 from datetime import datetime
+from result_cache import ResultCache, hash_stream
+from diagnostics import Diagnostics
+
+# The PDF library, openpyxl and the GUI (tkinter) are imported by the steps that use them,
+# so the window opens quickly and batch consumers never load tkinter
+
+
+# Bump whenever _parse_totals or the result layout changes so cached results are not reused
+PARSER_VERSION = 2
+# Smallest plausible size of one PDF page (page object and content stream); files smaller
+# than shard_pages times this cannot need sharding, so their pages are not counted
+MIN_PAGE_BYTES = 100
+
+
+# Precompiled filename patterns, tried in order; the first number in range wins
+_SCHEDULE_PATTERNS = [
+    re.compile(r'SCHEDULE[\s\-_]*(\d+)'),
+    re.compile(r'SCH[\s\-_]*(\d+)'),
+    re.compile(r'SCHED[\s\-_]*(\d+)')
+]
+_ANNEXURE_PATTERNS = [
+    re.compile(r'ANNEXURE[\s\-_]*(\d+)'),
+    re.compile(r'ANNEX[\s\-_]*(\d+)'),
+    re.compile(r'ANX[\s\-_]*(\d+)')
+]
+# Amounts on a total row and the fields they fill, by how many the row has
+_AMOUNT = re.compile(r'[\d,]+\.?\d*')
+_AMOUNT_COLUMNS = {
+    1: ('closing_balance',),
+    2: ('debit', 'credit'),
+    3: ('debit', 'credit', 'closing_balance'),
+    4: ('opening_balance', 'debit', 'credit', 'closing_balance')
+}
+
+# Schedule 1, Schedule 22 and Annexure 1 are omitted from processing
+_OMIT_PATTERN = re.compile(r'(?:SCHEDULE[\s\-_]*(?:1|22)|(?:ANNEX(?:URE)?|ANX)[\s\-_]*1)(?!\d)')
+
+
+class FileClassification(NamedTuple):
+    """What a filename refers to, as decided by classify_filename"""
+    filename: str
+    kind: Optional[str]               # 'schedule', 'annexure' or None
+    number: Optional[int]             # number of the schedule/annexure in `kind`
+    omitted: bool                     # Schedule 1, Schedule 22 or Annexure 1
+    expected: bool                    # one of the expected schedules/annexures
+    ambiguous: bool                   # names both a schedule and an annexure
+    schedule_number: Optional[int]
+    annexure_number: Optional[int]
+
+
+def _first_number(patterns: List['re.Pattern'], filename_upper: str, low: int, high: int) -> Optional[int]:
+    """Return the first number matched by the patterns that lies in [low, high]"""
+    for pattern in patterns:
+        match = pattern.search(filename_upper)
+        if match:
+            num = int(match.group(1))
+            if low <= num <= high:
+                return num
+    return None
+
+
+# Page total fields compared between runs, with their report labels
+TOTAL_FIELDS = [
+    ('opening_balance', 'Opening Balance'),
+    ('debit', 'Debit'),
+    ('credit', 'Credit'),
+    ('closing_balance', 'Closing Balance')
+]
+
+
+def _page_changes(old: Dict, new: Dict) -> List[Dict]:
+    """Compare the page totals of two results of the same file"""
+    pages = []
+    if old.get('total_pages') != new.get('total_pages'):
+        pages.append({'page': None, 'field': 'Total Pages',
+                      'previous': old.get('total_pages'), 'current': new.get('total_pages')})
+    
+    old_rows = _rows_by_key(old.get('page_totals', []))
+    new_rows = _rows_by_key(new.get('page_totals', []))
+    for key in sorted(set(old_rows) | set(new_rows)):
+        page, row_label, _ = key
+        # Rows other than a page's Total are named in the change, e.g. "Grand Total Debit"
+        prefix = '' if row_label == 'Total' else f"{row_label} "
+        if key not in new_rows:
+            field = 'Page removed' if not prefix else f"{prefix}removed"
+            pages.append({'page': page, 'field': field, 'previous': None, 'current': None})
+        elif key not in old_rows:
+            field = 'Page added' if not prefix else f"{prefix}added"
+            pages.append({'page': page, 'field': field, 'previous': None, 'current': None})
+        else:
+            for field, label in TOTAL_FIELDS:
+                if old_rows[key].get(field) != new_rows[key].get(field):
+                    pages.append({'page': page, 'field': prefix + label,
+                                  'previous': old_rows[key].get(field),
+                                  'current': new_rows[key].get(field)})
+    return pages
+
+
+def _rows_by_key(page_totals: List[Dict]) -> Dict[Tuple[int, str, int], Dict]:
+    """Total rows keyed by page, label and their position among the page's rows with that label"""
+    rows = {}
+    for page_total in page_totals:
+        label = page_total.get('label', 'Total')
+        occurrence = 0
+        while (page_total['page'], label, occurrence) in rows:
+            occurrence += 1
+        rows[(page_total['page'], label, occurrence)] = page_total
+    return rows
+
+
+def classify_filename(filename: str) -> FileClassification:
+    """Classify a PDF filename as schedule/annexure, omitted or unrecognised in one pass"""
+    filename_upper = filename.upper()
+    # Only accept Schedule 2 to 21 and Annexure 2 to 12
+    schedule_number = _first_number(_SCHEDULE_PATTERNS, filename_upper, 2, 21)
+    annexure_number = _first_number(_ANNEXURE_PATTERNS, filename_upper, 2, 12)
+    
+    if schedule_number:
+        kind, number = 'schedule', schedule_number
+    elif annexure_number:
+        kind, number = 'annexure', annexure_number
+    else:
+        kind, number = None, None
+    
+    return FileClassification(
+        filename=filename,
+        kind=kind,
+        number=number,
+        omitted=bool(_OMIT_PATTERN.search(filename_upper)),
+        expected=kind is not None,
+        ambiguous=bool(schedule_number and annexure_number),
+        schedule_number=schedule_number,
+        annexure_number=annexure_number
+    )
+
+
+def _timed_stage(method):
+    """Record the wall and CPU time of a FileProcessor stage in self.diagnostics"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.diagnostics.stage(method.__name__):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class ProcessingCancelled(Exception):
+    """Raised when processing is stopped through FileProcessor.cancel()"""
 
 
 class FileProcessor:
     """Main class for processing ZIP files containing schedules and annexures"""
     
-    def __init__(self):
+    def __init__(self, workers: int = 1, in_archive: bool = False,
+                 spool_threshold: int = 32 * 1024 * 1024, cache_dir: Optional[str] = None,
+                 cache_max_bytes: int = 512 * 1024 * 1024, prescreen: bool = False,
+                 verify_prescreen: bool = False, manifest_path: Optional[str] = None,
+                 use_mmap: bool = False, diagnostics_sheet: bool = False,
+                 profile_file: Optional[str] = None, backend: str = 'auto',
+                 file_timeout: Optional[float] = None, page_timeout: Optional[float] = None,
+                 memory_limit_mb: Optional[int] = None, page_stats_path: Optional[str] = None,
+                 pipeline: bool = False, pipeline_depth: int = 2, shard_pages: Optional[int] = None,
+                 journal_path: Optional[str] = None):
         self.temp_dir = None
+        # Source ZIP when PDFs are read in place instead of extracted to disk
+        self.archive_path = None
+        self._archive = None
         self.extracted_files = []
+        # Filename classification of each extracted file, built once per archive
+        self.file_index = {}
         # Schedule 2 to Schedule 21 (omitting Schedule 1 and Schedule 22)
         self.expected_schedules = [f"Schedule {i}" for i in range(2, 22)]
         # Annexure 2 to Annexure 12 (omitting Annexure 1)
@@ -30,7 +195,107 @@ class FileProcessor:
         self.missing_files = []
         self.society_name = ""
         self.society_number = ""
+        # Number of worker processes for PDF extraction (1 = sequential, 0 = one per CPU)
+        self.workers = workers
+        # Overlap reading, parsing and writing (see pipeline_stages.py): a reader thread
+        # decompresses up to pipeline_depth members ahead, worker processes parse them and
+        # this process writes report rows and exports meanwhile. Implies in_archive.
+        self.pipeline = pipeline
+        self.pipeline_depth = pipeline_depth
+        # Member bytes read ahead by the pipeline, by member name (used in worker processes)
+        self._prefetched = {}
+        # With more than one worker, files of more than shard_pages pages are split into
+        # page ranges of up to shard_pages pages (fewer, longer ones when there are fewer
+        # workers) that separate workers extract, each opening the PDF on its own, so one
+        # very long schedule does not set the run time
+        self.shard_pages = shard_pages
+        self.shard_stats = {'files_sharded': 0, 'shards': 0}
+        # Read PDFs straight out of the ZIP; members larger than spool_threshold
+        # bytes are buffered in a temporary file instead of memory
+        self.in_archive = in_archive or pipeline
+        self.spool_threshold = spool_threshold
+        # Read PDFs on disk (extracted files and spooled members) through mmap
+        self.use_mmap = use_mmap
+        # PDF text-extraction backend (see pdf_backends.py); 'auto' picks the fastest installed
+        self.backend = backend
+        self._extraction_backend = None
+        # Limits per PDF (seconds per file, seconds per page, MB of address space); with any
+        # of them set, files are extracted in worker processes that a watchdog kills and
+        # replaces when a limit is exceeded, and the file gets an error instead of totals
+        self.file_timeout = file_timeout
+        self.page_timeout = page_timeout
+        self.memory_limit_mb = memory_limit_mb
+        # Persistent cache of extraction results and page text, keyed by PDF content
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+        self.cache = None
+        if cache_dir:
+            self.cache = ResultCache(os.path.join(cache_dir, "extraction_cache.sqlite3"),
+                                     cache_max_bytes)
+        # Skip full text extraction on pages whose content stream has no TOTAL text;
+        # verify_prescreen still extracts those pages and records any that had totals
+        self.prescreen = prescreen
+        self.verify_prescreen = verify_prescreen
+        self.prescreen_stats = {'pages_screened': 0, 'pages_skipped': 0, 'pages_missed': 0}
+        self.prescreen_misses = []
+        # Learned totals pages per schedule/annexure number (JSON file kept between runs):
+        # files of a type with enough history only have their likely pages extracted
+        self.page_stats_path = page_stats_path
+        self.page_locator = None
+        if page_stats_path:
+            from page_locator import PageLocator
+            self.page_locator = PageLocator(page_stats_path)
+        # Why the statistics of the last run could not be saved (the run itself is not affected)
+        self.page_stats_error = None
+        self.locator_stats = {'files_located': 0, 'files_rescanned': 0, 'pages_skipped': 0}
+        self.page_observations = []
+        # Delta re-runs: JSON manifest of the previous run (member CRCs and results) so
+        # unchanged members are not processed again
+        self.manifest_path = manifest_path
+        self.zip_path = None
+        self.member_info = {}
+        self.changes = []
+        self.previous_run = None
+        # Checkpoint journal (see run_journal.py): finished files and page ranges are written
+        # to it as they come in, and a run interrupted before remove_journal() resumes from it
+        self.journal_path = journal_path
+        self.journal = None
+        self.journal_stats = {'files_resumed': 0, 'ranges_resumed': 0}
+        # Columnar per-page totals of the last run and the balance checks that failed
+        self.totals_store = None
+        self.mismatches = []
+        # Optional callback(kind, done, total, filename) reporting 'file' and 'page' progress
+        self.progress_callback = None
+        # Optional callback(file_info) receiving each file result in report order as soon as
+        # all files sorting before it are done (e.g. StreamingExcelReport.write_file)
+        self.result_callback = None
+        # Optional callback(page, total, filename) called before each page's text is extracted
+        self.page_callback = None
+        self._streaming_report = None
+        # CSV / JSON Lines / Parquet exports written while process_all_files runs
+        self._exports = None
+        # Per-stage and per-file timings; diagnostics_sheet adds them to the report and
+        # profile_file names one PDF whose extraction runs under cProfile
+        self.diagnostics = Diagnostics()
+        self.diagnostics_sheet = diagnostics_sheet
+        self.profile_file = profile_file
+        # Set (from any thread) to stop processing at the next file or page
+        self.cancel_event = threading.Event()
         
+    def cancel(self):
+        """Stop processing of the remaining files and pages"""
+        self.cancel_event.set()
+    
+    def _check_cancelled(self):
+        """Raise ProcessingCancelled if cancel() was called"""
+        if self.cancel_event.is_set():
+            raise ProcessingCancelled("Processing was cancelled")
+    
+    def _report_progress(self, kind: str, done: int, total: int, filename: str):
+        """Forward progress to the progress callback, if one is set"""
+        if self.progress_callback is not None:
+            self.progress_callback(kind, done, total, filename)
+    
     def upload_zip_file(self, zip_path: str) -> bool:
         """Upload and validate ZIP file"""
         if not os.path.exists(zip_path):
@@ -41,14 +306,27 @@ class FileProcessor:
         
         return True
     
+    @_timed_stage
     def extract_zip(self, zip_path: str) -> str:
         """Extract ZIP file to temporary directory"""
+        # Remove anything left over from a previous run
+        self.cleanup()
+        self.diagnostics.reset()
+        
+        if self.in_archive:
+            return self._list_archive(zip_path)
+        
         # Create temporary directory
         self.temp_dir = tempfile.mkdtemp(prefix="file_processor_")
         
-        # Extract ZIP file
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(self.temp_dir)
+        # Extract ZIP file; a failed extraction must not leave a partly filled directory behind
+        try:
+            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                self._record_members(zip_path, zip_ref)
+                zip_ref.extractall(self.temp_dir)
+        except BaseException:
+            self.cleanup()
+            raise
         
         # Get all extracted files
         self.extracted_files = []
@@ -57,8 +335,76 @@ class FileProcessor:
                 if file.lower().endswith('.pdf'):
                     self.extracted_files.append(os.path.join(root, file))
         
+        self._build_file_index()
         return self.temp_dir
     
+    def _list_archive(self, zip_path: str) -> str:
+        """List PDF members from the ZIP central directory without extracting them"""
+        self.archive_path = zip_path
+        self.extracted_files = []
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            self._record_members(zip_path, zip_ref)
+            for info in zip_ref.infolist():
+                if not info.is_dir() and info.filename.lower().endswith('.pdf'):
+                    self.extracted_files.append(info.filename)
+        
+        self._build_file_index()
+        return zip_path
+    
+    def _record_members(self, zip_path: str, zip_ref: zipfile.ZipFile):
+        """Remember size and CRC of every member from the central directory"""
+        self.zip_path = zip_path
+        self.member_info = {info.filename: {'size': info.file_size, 'crc': info.CRC}
+                            for info in zip_ref.infolist() if not info.is_dir()}
+    
+    def _member_name(self, file_path: str) -> str:
+        """ZIP member name of an extracted file"""
+        if self.archive_path is not None or self.temp_dir is None:
+            return file_path
+        return os.path.relpath(file_path, self.temp_dir).replace(os.sep, '/')
+    
+    @contextmanager
+    def _open_pdf(self, pdf_path: str) -> Iterator[IO[bytes]]:
+        """Open an extracted PDF file or archive member as a binary stream"""
+        if self.archive_path is None:
+            with open(pdf_path, 'rb') as file:
+                with self._map_file(file, os.fstat(file.fileno()).st_size) as stream:
+                    yield stream
+            return
+        
+        prefetched = self._prefetched.pop(pdf_path, None)
+        if prefetched is not None:
+            # Member read ahead by the pipeline (always below the spool threshold)
+            with prefetched:
+                yield prefetched
+            return
+        
+        if self._archive is None:
+            self._archive = zipfile.ZipFile(self.archive_path, 'r')
+        
+        # PyPDF2 needs a seekable stream, so buffer the member in memory and
+        # only spill to disk when it is larger than the spool threshold
+        size = self._archive.getinfo(pdf_path).file_size
+        with self._archive.open(pdf_path) as member, \
+                tempfile.SpooledTemporaryFile(max_size=self.spool_threshold) as file:
+            shutil.copyfileobj(member, file)
+            file.seek(0)
+            if size > self.spool_threshold:
+                # Spilled to disk, so there is a real file to map
+                with self._map_file(file, size) as stream:
+                    yield stream
+            else:
+                yield file
+    
+    @contextmanager
+    def _map_file(self, file: IO[bytes], size: int) -> Iterator[IO[bytes]]:
+        """Map a file on disk into memory when use_mmap is set, else use it as is"""
+        if not self.use_mmap or size == 0 or not self.extraction_backend().accepts_mmap:
+            yield file
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+    
     def identify_filenames(self) -> List[str]:
         """Identify all PDF filenames in extracted directory"""
         filenames = [os.path.basename(f) for f in self.extracted_files]
@@ -66,78 +412,47 @@ class FileProcessor:
     
     def _should_omit_file(self, filename: str) -> bool:
         """Check if file should be omitted (Schedule 1, Schedule 22, Annexure 1)"""
-        filename_upper = filename.upper()
-        
-        # Check for Schedule 1
-        if re.search(r'SCHEDULE[\s\-_]*1(?!\d)', filename_upper):
-            return True
-        
-        # Check for Schedule 22
-        if re.search(r'SCHEDULE[\s\-_]*22(?!\d)', filename_upper):
-            return True
-        
-        # Check for Annexure 1
-        if re.search(r'ANNEXURE[\s\-_]*1(?!\d)', filename_upper) or \
-           re.search(r'ANNEX[\s\-_]*1(?!\d)', filename_upper) or \
-           re.search(r'ANX[\s\-_]*1(?!\d)', filename_upper):
-            return True
-        
-        return False
+        return classify_filename(filename).omitted
     
     def _identify_schedule_number(self, filename_upper: str) -> Optional[int]:
         """Identify schedule number from filename (2-21, omitting 1 and 22)"""
-        # Try different patterns to extract schedule number
-        schedule_patterns = [
-            r'SCHEDULE[\s\-_]*(\d+)',
-            r'SCH[\s\-_]*(\d+)',
-            r'SCHED[\s\-_]*(\d+)'
-        ]
-        
-        for pattern in schedule_patterns:
-            match = re.search(pattern, filename_upper)
-            if match:
-                num = int(match.group(1))
-                # Only accept Schedule 2 to 21 (omit 1 and 22)
-                if 2 <= num <= 21:
-                    return num
-        return None
+        return _first_number(_SCHEDULE_PATTERNS, filename_upper, 2, 21)
     
     def _identify_annexure_number(self, filename_upper: str) -> Optional[int]:
         """Identify annexure number from filename (2-12, omitting 1)"""
-        # Try different patterns to extract annexure number
-        annexure_patterns = [
-            r'ANNEXURE[\s\-_]*(\d+)',
-            r'ANNEX[\s\-_]*(\d+)',
-            r'ANX[\s\-_]*(\d+)'
-        ]
-        
-        for pattern in annexure_patterns:
-            match = re.search(pattern, filename_upper)
-            if match:
-                num = int(match.group(1))
-                # Only accept Annexure 2 to 12 (omit 1)
-                if 2 <= num <= 12:
-                    return num
-        return None
+        return _first_number(_ANNEXURE_PATTERNS, filename_upper, 2, 12)
+    
+    def _build_file_index(self):
+        """Classify every extracted PDF once; later stages read the index"""
+        self.file_index = {}
+        for file_path in self.extracted_files:
+            self.file_index[file_path] = classify_filename(os.path.basename(file_path))
     
+    def classify_file(self, file_path: str) -> 'FileClassification':
+        """Return the classification of an extracted file from the index"""
+        record = self.file_index.get(file_path)
+        if record is None:
+            # extracted_files was changed without extract_zip
+            record = classify_filename(os.path.basename(file_path))
+            self.file_index[file_path] = record
+        return record
+    
+    def classified_files(self) -> List['FileClassification']:
+        """Classification records for all extracted files, in extraction order"""
+        return [self.classify_file(file_path) for file_path in self.extracted_files]
+    
+    @_timed_stage
     def verify_schedules_annexures(self) -> Tuple[List[str], List[str]]:
         """Verify presence of required schedules (1-22) and annexures (1-12)"""
         found_schedules = set()
         found_annexures = set()
         
-        for file_path in self.extracted_files:
-            filename = os.path.basename(file_path)
-            filename_upper = filename.upper()
-            
-            # Check for schedules (1 to 22)
-            schedule_num = self._identify_schedule_number(filename_upper)
-            if schedule_num:
-                found_schedules.add(f"Schedule {schedule_num}")
-            
-            # Check for annexures (1 to 12)
-            annexure_num = self._identify_annexure_number(filename_upper)
-            if annexure_num:
-                found_annexures.add(f"Annexure {annexure_num}")
+        for record in self.classified_files():
+            # A file naming both a schedule and an annexure counts for both
+            if record.schedule_number:
+                found_schedules.add(f"Schedule {record.schedule_number}")
+            if record.annexure_number:
+                found_annexures.add(f"Annexure {record.annexure_number}")
         
         # Find missing files
         missing_schedules = [s for s in self.expected_schedules if s not in found_schedules]
@@ -147,105 +462,957 @@ class FileProcessor:
         
         return missing_schedules, missing_annexures
     
-    def extract_totals_from_pdf(self, pdf_path: str) -> Dict:
-        """Extract Grand Total/Total values from each page of PDF"""
+    def extract_totals_from_pdf(self, pdf_path: str, pages: Optional[Tuple[int, int]] = None) -> Dict:
+        """Extract Grand Total/Total values from each page of PDF
+        
+        pages limits the extraction to the 0-based page range [start, stop), one
+        shard of a long file (see shard_pages): page_totals then only cover that
+        range while total_pages is still the page count of the whole file. Shards
+        bypass the result cache and the page locator; process_all_files merges them.
+        """
+        filename = os.path.basename(pdf_path)
+        cache_hits = self.cache.hits if self.cache is not None else 0
+        page_text_hits = self.cache.page_text_hits if self.cache is not None else 0
+        files_located = self.locator_stats['files_located']
+        label = filename if pages is None else f"{filename} (pages {pages[0] + 1}-{pages[1]})"
+        with self.diagnostics.measure_file(label) as stats, self._profiled(filename):
+            result = self._extract_totals(pdf_path, stats, pages)
+            if isinstance(result['total_pages'], int):
+                stats['pages'] = result['total_pages'] if pages is None else \
+                    min(pages[1], result['total_pages']) - pages[0]
+            stats['cached'] = self.cache is not None and self.cache.hits > cache_hits
+        
+        # The page locator learns from every file whose pages were all scanned by this
+        # run; a result from the cache (or its page text) was learned from when it was scanned
+        fresh = not stats['cached'] and (self.cache is None or self.cache.page_text_hits == page_text_hits)
+        if pages is None and fresh and self.locator_stats['files_located'] == files_located:
+            self._observe_pages(result)
+        return result
+    
+    def _observe_pages(self, result: Dict):
+        """Record which pages of a fully scanned file had totals, for the page locator"""
+        if self.page_locator is None or 'error' in result:
+            return
+        
+        from page_locator import document_key, observation
+        
+        classification = classify_filename(result['filename'])
+        key = document_key(classification.kind, classification.number)
+        if key is not None:
+            self.page_observations.append(observation(key, result))
+    
+    @contextmanager
+    def _profiled(self, filename: str) -> Iterator[None]:
+        """Run the block under cProfile if filename is the file chosen by profile_file"""
+        if filename != self.profile_file:
+            yield
+            return
+        
+        import cProfile
+        
+        profiler = cProfile.Profile()
+        profiler.enable()
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                num_pages = len(pdf_reader.pages)
-                
-                # Extract totals from each page
-                page_totals = []
-                for page_num in range(num_pages):
-                    page_text = pdf_reader.pages[page_num].extract_text()
-                    totals = self._parse_totals(page_text)
-                    
-                    if totals:  # Only add if totals were found
-                        page_totals.append({
-                            'page': page_num + 1,
-                            'opening_balance': totals.get('opening_balance', 'N/A'),
-                            'debit': totals.get('debit', 'N/A'),
-                            'credit': totals.get('credit', 'N/A'),
-                            'closing_balance': totals.get('closing_balance', 'N/A')
-                        })
+            yield
+        finally:
+            profiler.disable()
+            self.diagnostics.add_profile(filename, profiler)
+    
+    def _extract_totals(self, pdf_path: str, stats: Dict, pages: Optional[Tuple[int, int]] = None) -> Dict:
+        """Open one PDF and extract the totals of all pages or a page range, recording the bytes read in stats"""
+        try:
+            with self._open_pdf(pdf_path) as file:
+                file.seek(0, os.SEEK_END)
+                stats['bytes_read'] = file.tell()
+                file.seek(0)
+                if pages is not None:
+                    with self.extraction_backend().open(file) as document:
+                        page_texts = self._page_texts(document, os.path.basename(pdf_path), *pages)
+                        return self._build_result(pdf_path, document.page_count, page_texts, pages[0])
+                if self.cache is not None:
+                    return self._extract_totals_cached(pdf_path, file)
                 
-                return {
-                    'filename': os.path.basename(pdf_path),
-                    'total_pages': num_pages,
-                    'page_totals': page_totals
-                }
+                with self.extraction_backend().open(file) as document:
+                    result = self._locate_totals(document, pdf_path)
+                    if result is not None:
+                        return result
+                    page_texts = self._page_texts(document, os.path.basename(pdf_path))
+                    return self._build_result(pdf_path, document.page_count, page_texts)
+        except ProcessingCancelled:
+            raise
+        except MemoryError:
+            limit = f" of {self.memory_limit_mb} MB" if self.memory_limit_mb else ""
+            return self._error_result(pdf_path, MemoryError(f"Exceeded the memory limit{limit}"))
         except Exception as e:
-            return {
-                'filename': os.path.basename(pdf_path),
-                'total_pages': 'Error',
-                'page_totals': [],
-                'error': str(e)
-            }
-    
-    def _parse_totals(self, text: str) -> Dict[str, str]:
-        """Parse total values from text"""
-        totals = {}
-        
-        # Convert text to uppercase for case-insensitive matching
-        text_upper = text.upper()
-        lines = text.split('\n')
-        
-        # Look for Grand Total or Total lines
-        for i, line in enumerate(lines):
-            line_upper = line.upper()
+            return self._error_result(pdf_path, e)
+    
+    def _extract_totals_cached(self, pdf_path: str, file: IO[bytes]) -> Dict:
+        """Extract totals through the result cache, falling back to cached page text"""
+        filename = os.path.basename(pdf_path)
+        backend = self.extraction_backend().name
+        mode = self._cache_mode()
+        digest = hash_stream(file)
+        result = self.cache.get_result(digest, PARSER_VERSION, backend, mode)
+        if result is not None:
+            result['filename'] = filename
+            # A verified result keeps the pages the pre-screen missed, so they are reported again
+            for page in result.pop('prescreen_missed_pages', []):
+                self.prescreen_stats['pages_missed'] += 1
+                self.prescreen_misses.append({'filename': filename, 'page': page})
+            return result
+        
+        # Pages skipped by the pre-screen have no text, so that text is kept apart from
+        # complete text; verification has to screen the pages themselves and does not read it
+        text_mode = 'prescreen' if mode == 'prescreen' else ''
+        page_texts = None if mode == 'verify' else self.cache.get_page_text(digest, backend, text_mode)
+        misses = len(self.prescreen_misses)
+        if page_texts is None:
+            with self.extraction_backend().open(file) as document:
+                # Results from only the likely pages are not cached
+                result = self._locate_totals(document, pdf_path)
+                if result is not None:
+                    return result
+                page_texts = list(self._page_texts(document, filename))
+            self.cache.put_page_text(digest, page_texts, backend, text_mode)
+        
+        result = self._build_result(pdf_path, len(page_texts), page_texts)
+        entry = result
+        if mode == 'verify':
+            entry = dict(result, prescreen_missed_pages=[miss['page'] for miss in self.prescreen_misses[misses:]])
+        self.cache.put_result(digest, PARSER_VERSION, entry, backend, mode)
+        return result
+    
+    def _cache_mode(self) -> str:
+        """Result cache key part for the pre-screen: '' (every page read), 'prescreen' or 'verify'"""
+        if not self.prescreen:
+            return ''
+        return 'verify' if self.verify_prescreen else 'prescreen'
+    
+    def extraction_backend(self):
+        """The PDF text-extraction backend selected by self.backend"""
+        if self._extraction_backend is None:
+            from pdf_backends import select_backend
+            self._extraction_backend = select_backend(self.backend)
+        return self._extraction_backend
+    
+    def iter_page_totals(self, pdf_path: str) -> Iterator[Dict]:
+        """Yield the total rows of each page, one page at a time
+        
+        Unlike extract_totals_from_pdf no list of pages is built and each page's
+        parsed content is released once the page is done, so peak memory is
+        reduced but not bounded: PyPDF2 and pypdf still index every page when the
+        PDF is opened (a few KB per page, see benchmarks/page_memory.py). Errors
+        reading the PDF are raised to the caller.
+        """
+        filename = os.path.basename(pdf_path)
+        with self._open_pdf(pdf_path) as file, self.extraction_backend().open(file) as document:
+            page_texts = self._page_texts(document, filename)
+            yield from self._iter_totals(filename, document.page_count, page_texts)
+    
+    def _page_texts(self, document, filename: str, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+        """Yield the text of each page from start to stop; pages ruled out by the pre-screen yield ''"""
+        if not self.prescreen or not document.supports_prescreen:
+            for page_num, page in enumerate(document.pages(start, stop), start):
+                self._page_started(page_num, document.page_count, filename)
+                yield document.page_text(page)
+            return
+        
+        from page_prescreen import page_may_have_totals
+        
+        for page_num, page in enumerate(document.pages(start, stop), start):
+            self._page_started(page_num, document.page_count, filename)
+            self.prescreen_stats['pages_screened'] += 1
+            if page_may_have_totals(page):
+                yield document.page_text(page)
+                continue
             
-            # Check for Grand Total or Total (but not subtotal)
-            if ('GRAND TOTAL' in line_upper or 
-                (('TOTAL' in line_upper) and ('SUBTOTAL' not in line_upper))):
-                
-                # Extract numbers from this line and possibly next lines
-                numbers = re.findall(r'[\d,]+\.?\d*', line)
-                
-                # Clean numbers (remove commas)
-                numbers = [n.replace(',', '') for n in numbers]
-                
-                # Try to identify which number is which
-                if len(numbers) >= 4:
-                    totals['opening_balance'] = numbers[0]
-                    totals['debit'] = numbers[1]
-                    totals['credit'] = numbers[2]
-                    totals['closing_balance'] = numbers[3]
-                elif len(numbers) >= 3:
-                    # If we have 3 numbers, assume debit, credit, closing
-                    totals['debit'] = numbers[0]
-                    totals['credit'] = numbers[1]
-                    totals['closing_balance'] = numbers[2]
-                elif len(numbers) >= 2:
-                    # If we have at least 2 numbers, assume they are debit and credit
-                    totals['debit'] = numbers[0]
-                    totals['credit'] = numbers[1]
-                elif len(numbers) == 1:
-                    # Single number might be closing balance
-                    totals['closing_balance'] = numbers[0]
-                
-                break
+            self.prescreen_stats['pages_skipped'] += 1
+            if not self.verify_prescreen:
+                yield ''
+                continue
+            
+            # Verification: the full path must not find totals on a skipped page
+            page_text = document.page_text(page)
+            if self._parse_totals(page_text):
+                self.prescreen_stats['pages_missed'] += 1
+                self.prescreen_misses.append({'filename': filename, 'page': page_num + 1})
+            yield page_text
+    
+    def _page_started(self, page_num: int, num_pages: int, filename: str):
+        """Tell the page callback (e.g. the watchdog's heartbeat) that a page is starting"""
+        if self.page_callback is not None:
+            self.page_callback(page_num + 1, num_pages, filename)
+    
+    def _locate_totals(self, document, pdf_path: str) -> Optional[Dict]:
+        """Extract only the pages the page locator expects totals on
+        
+        Returns None when every page has to be scanned: no locator, too little
+        history for the file's schedule/annexure number, or totals on the likely
+        pages that fail the locator's checks.
+        """
+        if self.page_locator is None:
+            return None
+        
+        from page_locator import document_key
+        
+        filename = os.path.basename(pdf_path)
+        classification = classify_filename(filename)
+        key = document_key(classification.kind, classification.number)
+        num_pages = document.page_count
+        pages = self.page_locator.likely_pages(key, num_pages)
+        if pages is None:
+            return None
+        
+        page_totals = []
+        for done, page_num in enumerate(pages, 1):
+            self._check_cancelled()
+            self._page_started(page_num, num_pages, filename)
+            page_text = document.page_text(document.page(page_num))
+            page_totals.extend(self._page_total(page_num + 1, totals)
+                               for totals in self._parse_totals(page_text))
+            self._report_progress('page', done, len(pages), filename)
+        # Stable sort: rows of one page stay in text order
+        page_totals.sort(key=lambda page_total: page_total['page'])
+        
+        if not self.page_locator.plausible(key, page_totals) or \
+                self._skipped_page_has_totals(document, set(pages)):
+            self.locator_stats['files_rescanned'] += 1
+            return None
+        self.locator_stats['files_located'] += 1
+        self.locator_stats['pages_skipped'] += num_pages - len(pages)
+        return {'filename': filename, 'total_pages': num_pages, 'page_totals': page_totals}
+    
+    @staticmethod
+    def _skipped_page_has_totals(document, extracted: set) -> bool:
+        """Whether the content-stream screen sees TOTAL text on a page the locator skipped
         
-        return totals
+        Pages the screen cannot read are trusted to the locator's checks.
+        """
+        if not document.supports_prescreen:
+            return False
+        
+        from page_prescreen import page_has_total_text
+        
+        return any(page_has_total_text(document.page(page_num))
+                   for page_num in range(document.page_count) if page_num not in extracted)
+    
+    def _build_result(self, pdf_path: str, num_pages: int, page_texts: Iterable[str], start: int = 0) -> Dict:
+        """Parse the text of each page (the first one being page start) and build the per-file result"""
+        filename = os.path.basename(pdf_path)
+        return {
+            'filename': filename,
+            'total_pages': num_pages,
+            'page_totals': list(self._iter_totals(filename, num_pages, page_texts, start))
+        }
+    
+    def _iter_totals(self, filename: str, num_pages: int, page_texts: Iterable[str],
+                     start: int = 0) -> Iterator[Dict]:
+        """Parse the text of each page and yield every total row found"""
+        for page_num, page_text in enumerate(page_texts, start):
+            self._check_cancelled()
+            # One entry per total row; a page can have e.g. a Total and a Grand Total
+            for totals in self._parse_totals(page_text):
+                yield self._page_total(page_num + 1, totals)
+            self._report_progress('page', page_num + 1, num_pages, filename)
     
-    def process_all_files(self):
+    @staticmethod
+    def _page_total(page: int, totals: Dict[str, str]) -> Dict:
+        """Page totals entry of one parsed total row"""
+        return {
+            'page': page,
+            'label': totals['label'],
+            'opening_balance': totals.get('opening_balance', 'N/A'),
+            'debit': totals.get('debit', 'N/A'),
+            'credit': totals.get('credit', 'N/A'),
+            'closing_balance': totals.get('closing_balance', 'N/A')
+        }
+    
+    @staticmethod
+    def _error_result(pdf_path: str, error: Exception) -> Dict:
+        """Build the result recorded for a file that could not be processed"""
+        return {
+            'filename': os.path.basename(pdf_path),
+            'total_pages': 'Error',
+            'page_totals': [],
+            'error': str(error)
+        }
+    
+    def _parse_totals(self, text: str) -> List[Dict[str, str]]:
+        """Parse every Grand Total / Total row (not subtotals) of a page in one pass
+        
+        Each row has a 'label' ('Grand Total' or 'Total') and the amounts on its
+        line: four amounts are opening balance, debit, credit and closing balance,
+        three are debit, credit and closing balance, two are debit and credit and
+        a single one is the closing balance. Lines without amounts are skipped.
+        """
+        # Lines are cut from the upper-cased text (amounts are unaffected), and each
+        # search continues after the previous total line, so the text is read once
+        text = text.upper()
+        rows = []
+        position = text.find('TOTAL')
+        while position != -1:
+            start = text.rfind('\n', 0, position) + 1
+            end = text.find('\n', position)
+            if end == -1:
+                end = len(text)
+            line = text[start:end]
+            position = text.find('TOTAL', end)
+            
+            grand = 'GRAND TOTAL' in line
+            if not grand and 'SUBTOTAL' in line:
+                continue
+            
+            amounts = _AMOUNT.findall(line)
+            if not amounts:
+                continue
+            row = {'label': 'Grand Total' if grand else 'Total'}
+            for field, amount in zip(_AMOUNT_COLUMNS[min(len(amounts), 4)], amounts):
+                row[field] = amount.replace(',', '')
+            rows.append(row)
+        return rows
+    
+    @_timed_stage
+    def process_all_files(self, workers: Optional[int] = None):
         """Process all extracted PDF files (omitting Schedule 1, 22 and Annexure 1)"""
+        from totals_store import TotalsStore
+        
         self.file_data = []
+        self.totals_store = TotalsStore()
+        
+        # Skip files that should be omitted
+        pdf_paths = [pdf_path for pdf_path in self.extracted_files
+                     if not self.classify_file(pdf_path).omitted]
+        
+        if workers is None:
+            workers = self.workers
+        if workers == 0:
+            workers = os.cpu_count() or 1
+        
+        # Process in filename order so results can be handed on as they finish
+        pdf_paths.sort(key=os.path.basename)
+        
+        # Delta re-run: reuse results of members whose size and CRC did not change
+        reused = {}
+        previous = self._load_manifest()
+        if previous is not None:
+            pdf_paths, reused = self._reuse_unchanged(pdf_paths, previous)
+        
+        # Identical PDFs in the same archive are only processed once
+        duplicates = {}
+        self.prescreen_stats = {key: 0 for key in self.prescreen_stats}
+        self.prescreen_misses = []
+        self.locator_stats = {key: 0 for key in self.locator_stats}
+        self.page_observations = []
+        if self.cache is not None:
+            self.cache.reset_counters()
+            pdf_paths, duplicates = self._group_duplicates(pdf_paths)
+        
+        # Sort by filename (duplicates follow the unique files with the same name)
+        duplicate_paths = [d for pdf_path in pdf_paths for d in duplicates.get(pdf_path, [])]
+        report_order = sorted(pdf_paths + duplicate_paths + list(reused), key=os.path.basename)
+        finished = dict(reused)
+        
+        # An interrupted run of the same archive and settings resumes from its journal
+        self.journal = None
+        self.journal_stats = {key: 0 for key in self.journal_stats}
+        resumed = {}
+        if self.journal_path:
+            pdf_paths, resumed = self._open_journal(pdf_paths)
+        
+        # Long files are split into page ranges (shards) when there are workers to share them
+        self.shard_stats = {key: 0 for key in self.shard_stats}
+        shards, digests = {}, {}
+        if self.shard_pages and workers > 1:
+            shards, digests = self._plan_shards(pdf_paths, workers)
+        done_ranges = self._resumed_ranges(shards)
+        # One task per file or page range: (pdf_path, None) or (pdf_path, (start, stop))
+        tasks = [(pdf_path, pages) for pdf_path in pdf_paths for pages in shards.get(pdf_path, [None])
+                 if pages not in done_ranges.get(pdf_path, {})]
+        
+        workers = min(workers, len(tasks))
+        if self.file_timeout or self.page_timeout or self.memory_limit_mb:
+            # Limits need worker processes that can be killed, even for a single worker
+            results = self._process_files_watched(tasks, workers)
+        elif self.pipeline and self.archive_path is not None:
+            # Even one worker is a separate process, so parsing overlaps report writing
+            results = self._process_files_pipelined(tasks, max(1, workers))
+        elif workers > 1:
+            results = self._process_files_parallel(tasks, workers)
+        else:
+            results = self._process_files_sequential(tasks)
         
-        for pdf_path in self.extracted_files:
-            filename = os.path.basename(pdf_path)
+        self._release_finished(report_order, finished)
+        for pdf_path, data in itertools.chain(resumed.items(),
+                                              self._merge_shards(results, shards, digests, done_ranges)):
+            finished[pdf_path] = data
+            for duplicate_path in duplicates.get(pdf_path, []):
+                duplicate = copy.deepcopy(data)
+                duplicate['filename'] = os.path.basename(duplicate_path)
+                finished[duplicate_path] = duplicate
+            self._release_finished(report_order, finished)
+        
+        if previous is not None:
+            self.changes = self._compute_changes(previous, report_order)
+        if self.manifest_path:
+            self._save_manifest(report_order)
+        self.page_stats_error = None
+        if self.page_locator is not None:
+            self.page_locator.learn(self.page_observations)
+            try:
+                self.page_locator.save()
+            except OSError as e:
+                self.page_stats_error = f"Could not save the page statistics to {self.page_stats_path}: {e}"
+        self.mismatches = self.totals_store.reconcile()
+    
+    def reconcile_totals(self) -> List[Dict]:
+        """Check balances, carry-forwards and schedule sums of all processed pages"""
+        from totals_store import TotalsStore
+        
+        self.totals_store = TotalsStore.from_file_data(self.file_data)
+        self.mismatches = self.totals_store.reconcile()
+        return self.mismatches
+    
+    def _release_finished(self, report_order: List[str], finished: Dict[str, Dict]):
+        """Move every result whose predecessors in report order are done into file_data"""
+        while len(self.file_data) < len(report_order) and \
+                report_order[len(self.file_data)] in finished:
+            data = finished.pop(report_order[len(self.file_data)])
+            self.file_data.append(data)
+            self.totals_store.add_file(data)
+            if self._exports is not None:
+                self._exports.write_file(data)
+            if self.result_callback is not None:
+                self.result_callback(data)
+    
+    def _load_manifest(self) -> Optional[Dict]:
+        """Load the manifest of the previous run, if there is a usable one"""
+        self.changes = []
+        self.previous_run = None
+        if not self.manifest_path or not os.path.exists(self.manifest_path):
+            return None
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return None
+        
+        # Results of an older parser cannot be reused
+        if manifest.get('parser_version') != PARSER_VERSION or \
+                manifest.get('backend', 'PyPDF2') != self.extraction_backend().name:
+            return None
+        self.previous_run = manifest.get('run_at')
+        return manifest
+    
+    def _reuse_unchanged(self, pdf_paths: List[str], previous: Dict) -> Tuple[List[str], Dict[str, Dict]]:
+        """Split files into ones to process and reused results of unchanged members"""
+        to_process = []
+        reused = {}
+        for pdf_path in pdf_paths:
+            member = self._member_name(pdf_path)
+            old = previous['members'].get(member)
+            info = self.member_info.get(member)
+            if old is not None and info is not None and 'error' not in old['result'] and \
+                    old['size'] == info['size'] and old['crc'] == info['crc']:
+                result = copy.deepcopy(old['result'])
+                result['filename'] = os.path.basename(pdf_path)
+                reused[pdf_path] = result
+            else:
+                to_process.append(pdf_path)
+        return to_process, reused
+    
+    def _save_manifest(self, report_order: List[str]):
+        """Write the members and results of this run for the next delta re-run"""
+        members = {}
+        for pdf_path, data in zip(report_order, self.file_data):
+            member = self._member_name(pdf_path)
+            info = self.member_info.get(member, {'size': None, 'crc': None})
+            members[member] = {'size': info['size'], 'crc': info['crc'], 'result': data}
+        
+        manifest = {
+            'parser_version': PARSER_VERSION,
+            'backend': self.extraction_backend().name,
+            'archive': os.path.basename(self.zip_path or ''),
+            'run_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'members': members
+        }
+        directory = os.path.dirname(os.path.abspath(self.manifest_path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(manifest, file)
+        os.replace(temp_path, self.manifest_path)
+    
+    def _compute_changes(self, previous: Dict, report_order: List[str]) -> List[Dict]:
+        """List files, pages and totals that differ from the previous run"""
+        changes = []
+        current_members = {}
+        for pdf_path, data in zip(report_order, self.file_data):
+            current_members[self._member_name(pdf_path)] = data
+        
+        for member, data in current_members.items():
+            old = previous['members'].get(member)
+            if old is None:
+                changes.append({'filename': data['filename'], 'change': 'added', 'pages': []})
+                continue
+            pages = _page_changes(old['result'], data)
+            if pages:
+                changes.append({'filename': data['filename'], 'change': 'modified', 'pages': pages})
+        
+        for member, old in previous['members'].items():
+            if member not in current_members:
+                changes.append({'filename': old['result']['filename'], 'change': 'removed', 'pages': []})
+        
+        changes.sort(key=lambda change: change['filename'])
+        return changes
+    
+    def _process_files_sequential(self, tasks: List[Tuple]) -> Iterator[Tuple[Tuple, Dict]]:
+        """Extract totals from PDF files (or page ranges) one after another"""
+        for index, (pdf_path, pages) in enumerate(tasks):
+            self._check_cancelled()
+            data = self.extract_totals_from_pdf(pdf_path, pages)
+            self._report_progress('file', index + 1, len(tasks), data['filename'])
+            yield (pdf_path, pages), data
+    
+    def _plan_shards(self, pdf_paths: List[str],
+                     workers: int) -> Tuple[Dict[str, List[Tuple[int, int]]], Dict[str, str]]:
+        """Page ranges of the files with more than shard_pages pages
+        
+        Ranges are equal and at most shard_pages long, but every range opens the
+        PDF again (PyPDF2 reads the whole page tree), so a file gets no more ranges
+        than there are workers. Files that are not worth splitting keep a single
+        task: files whose result is cached, files the page locator only reads a
+        few pages of and the file chosen by profile_file. Also returns the content
+        hash of each sharded file when the cache is used, so the merged result
+        can be cached.
+        """
+        shards, digests = {}, {}
+        with self.diagnostics.stage('plan_shards'):
+            for pdf_path in pdf_paths:
+                size = self.member_info.get(self._member_name(pdf_path), {}).get('size')
+                if size is not None and size < self.shard_pages * MIN_PAGE_BYTES:
+                    # Too small to have that many pages; not worth opening
+                    continue
+                if os.path.basename(pdf_path) == self.profile_file:
+                    continue
+                try:
+                    with self._open_pdf(pdf_path) as file:
+                        with self.extraction_backend().open(file) as document:
+                            num_pages = document.page_count
+                        if num_pages <= self.shard_pages or self._locator_predicts(pdf_path, num_pages):
+                            continue
+                        if self.cache is not None:
+                            file.seek(0)
+                            digest = hash_stream(file)
+                            if self.cache.has_result(digest, PARSER_VERSION, self.extraction_backend().name,
+                                                     self._cache_mode()):
+                                continue
+                            digests[pdf_path] = digest
+                except Exception:
+                    # Unreadable files are left to the extraction, which records the error
+                    continue
+                count = min(workers, -(-num_pages // self.shard_pages))
+                bounds = [num_pages * index // count for index in range(count + 1)]
+                shards[pdf_path] = list(zip(bounds, bounds[1:]))
+        return shards, digests
+    
+    def _locator_predicts(self, pdf_path: str, num_pages: int) -> bool:
+        """Whether the page locator would only extract the likely pages of this file"""
+        if self.page_locator is None:
+            return False
+        
+        from page_locator import document_key
+        
+        classification = self.classify_file(pdf_path)
+        key = document_key(classification.kind, classification.number)
+        return self.page_locator.likely_pages(key, num_pages) is not None
+    
+    def _merge_shards(self, results: Iterable[Tuple[Tuple, Dict]], shards: Dict[str, List[Tuple[int, int]]],
+                      digests: Dict[str, str],
+                      done_ranges: Dict[str, Dict[Tuple[int, int], Dict]]) -> Iterator[Tuple[str, Dict]]:
+        """Yield (pdf_path, result) per file, combining the page ranges of sharded files in page order
+        
+        A sharded file is yielded once its last range is done; done_ranges are the
+        ranges resumed from the journal. Every file and range is checkpointed in
+        the journal as it arrives.
+        """
+        parts = {pdf_path: dict(ranges) for pdf_path, ranges in done_ranges.items()}
+        # Files whose ranges were all done when the run was interrupted
+        for pdf_path in [pdf_path for pdf_path, ranges in parts.items() if len(ranges) == len(shards[pdf_path])]:
+            yield pdf_path, self._merge_ranges(pdf_path, shards, parts, digests)
+        
+        for (pdf_path, pages), data in results:
+            self._checkpoint(pdf_path, pages, data)
+            if pages is None:
+                yield pdf_path, data
+                continue
             
-            # Skip files that should be omitted
-            if self._should_omit_file(filename):
+            parts.setdefault(pdf_path, {})[pages] = data
+            if len(parts[pdf_path]) == len(shards[pdf_path]):
+                yield pdf_path, self._merge_ranges(pdf_path, shards, parts, digests)
+    
+    def _merge_ranges(self, pdf_path: str, shards: Dict[str, List[Tuple[int, int]]],
+                      parts: Dict[str, Dict[Tuple[int, int], Dict]], digests: Dict[str, str]) -> Dict:
+        """Combine the results of all page ranges of one file
+        
+        If any range failed the file gets that range's error, like a file that
+        failed as a whole.
+        """
+        by_range = parts.pop(pdf_path)
+        ranges = [by_range[pages] for pages in shards[pdf_path]]
+        failed = [data for data in ranges if 'error' in data]
+        if failed:
+            return failed[0]
+        
+        data = {
+            'filename': ranges[0]['filename'],
+            'total_pages': ranges[0]['total_pages'],
+            'page_totals': [page_total for data in ranges for page_total in data['page_totals']]
+        }
+        self.shard_stats['files_sharded'] += 1
+        self.shard_stats['shards'] += len(ranges)
+        self._observe_pages(data)
+        # The pre-screen misses of verified ranges are not kept with the ranges, so a
+        # verified file is only cached when it is extracted whole
+        if pdf_path in digests and self._cache_mode() != 'verify':
+            self.cache.put_result(digests[pdf_path], PARSER_VERSION, data, self.extraction_backend().name,
+                                  self._cache_mode())
+        self._checkpoint(pdf_path, None, data)
+        return data
+    
+    def _open_journal(self, pdf_paths: List[str]) -> Tuple[List[str], Dict[str, Dict]]:
+        """Open the checkpoint journal and split files into ones to process and resumed results"""
+        from run_journal import RunJournal
+        
+        self.journal = RunJournal(self.journal_path, self._journal_key())
+        if not self.journal.open():
+            return pdf_paths, {}
+        
+        to_process = []
+        resumed = {}
+        for pdf_path in pdf_paths:
+            result = self.journal.files.get(self._member_name(pdf_path))
+            if result is None:
+                to_process.append(pdf_path)
+                continue
+            result['filename'] = os.path.basename(pdf_path)
+            resumed[pdf_path] = result
+        self.journal_stats['files_resumed'] = len(resumed)
+        return to_process, resumed
+    
+    def _journal_key(self) -> Dict:
+        """What the results of a run depend on: archive members, parser and result-changing settings"""
+        members = json.dumps(sorted([name, info['size'], info['crc']] for name, info in self.member_info.items()))
+        return {
+            'parser_version': PARSER_VERSION,
+            'backend': self.extraction_backend().name,
+            'prescreen': self.prescreen,
+            'page_stats': self.page_stats_path is not None,
+            'members': hashlib.sha256(members.encode('utf-8')).hexdigest()
+        }
+    
+    def _resumed_ranges(self, shards: Dict[str, List[Tuple[int, int]]]) -> Dict[str, Dict[Tuple[int, int], Dict]]:
+        """Journaled results of the page ranges planned for this run (other splits are redone)"""
+        if self.journal is None:
+            return {}
+        done_ranges = {}
+        for pdf_path, ranges in shards.items():
+            journaled = self.journal.ranges.get(self._member_name(pdf_path), {})
+            done = {pages: journaled[pages] for pages in ranges if pages in journaled}
+            if done:
+                done_ranges[pdf_path] = done
+                self.journal_stats['ranges_resumed'] += len(done)
+        return done_ranges
+    
+    def _checkpoint(self, pdf_path: str, pages: Optional[Tuple[int, int]], data: Dict):
+        """Write a finished file or page range to the journal (failures are tried again on resume)"""
+        if self.journal is None or 'error' in data:
+            return
+        if pages is None:
+            self.journal.record_file(self._member_name(pdf_path), data)
+        else:
+            self.journal.record_range(self._member_name(pdf_path), pages, data)
+    
+    def remove_journal(self):
+        """Delete the checkpoint journal; call once the report of the run is complete"""
+        if self.journal is not None:
+            self.journal.remove()
+            self.journal = None
+    
+    @contextmanager
+    def _read_members(self, tasks: List[Tuple]) -> Iterator[Iterator[Tuple[Tuple, Optional[bytes]]]]:
+        """(task, member bytes) per task; with pipeline set a thread reads up to pipeline_depth ahead
+        
+        The bytes are None when the worker should read the file itself: without
+        pipeline, for members above the spool threshold (not worth sending through
+        a pipe) and for members that could not be read (the worker records the error).
+        """
+        if not self.pipeline or self.archive_path is None:
+            yield ((task, None) for task in tasks)
+            return
+        
+        from pipeline_stages import read_ahead
+        
+        # Only the reader thread uses this ZipFile
+        archive = zipfile.ZipFile(self.archive_path, 'r')
+        # The page ranges of a sharded file follow each other, so its member is read once
+        last_read = (None, None)
+        
+        def read(task: Tuple) -> Optional[bytes]:
+            nonlocal last_read
+            pdf_path = task[0]
+            if archive.getinfo(pdf_path).file_size > self.spool_threshold:
+                return None
+            if last_read[0] != pdf_path:
+                with self.diagnostics.stage('read_ahead'):
+                    last_read = (pdf_path, archive.read(pdf_path))
+            return last_read[1]
+        
+        members = read_ahead(tasks, read, self.pipeline_depth)
+        try:
+            yield ((task, data) for task, data, _ in members)
+        finally:
+            members.close()
+            archive.close()
+    
+    def _process_files_pipelined(self, tasks: List[Tuple], workers: int) -> Iterator[Tuple[Tuple, Dict]]:
+        """Parse PDF files on worker processes fed by a thread that decompresses the next members
+        
+        At most workers + pipeline_depth files are submitted ahead of the oldest
+        unfinished one and results are yielded in submission order, so this
+        process writes report rows and exports while the workers parse.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        
+        settings = self._worker_settings()
+        in_flight = collections.deque()
+        done = 0
+        with self._read_members(tasks) as members, ProcessPoolExecutor(max_workers=workers) as executor:
+            for task, data in members:
+                in_flight.append((task, executor.submit(_extract_totals_worker, *task,
+                                                        self.archive_path, settings, data)))
+                while len(in_flight) >= workers + self.pipeline_depth or \
+                        (in_flight and in_flight[0][1].done()):
+                    done += 1
+                    yield self._pool_result(*in_flight.popleft(), done, len(tasks), in_flight)
+            while in_flight:
+                done += 1
+                yield self._pool_result(*in_flight.popleft(), done, len(tasks), in_flight)
+    
+    def _pool_result(self, task: Tuple, future, done: int, total: int, pending) -> Tuple[Tuple, Dict]:
+        """Wait for a worker's result, merge its counters and report progress"""
+        if self.cancel_event.is_set():
+            # Drop queued files; files already running are allowed to finish
+            for _, other in pending:
+                other.cancel()
+            self._check_cancelled()
+        try:
+            result, counters = future.result()
+            self._merge_worker_counters(counters)
+        except Exception as e:
+            # Worker crashed or the result could not be returned
+            result = self._error_result(task[0], e)
+        self._report_progress('file', done, total, result['filename'])
+        return task, result
+    
+    def _group_duplicates(self, pdf_paths: List[str]) -> Tuple[List[str], Dict[str, List[str]]]:
+        """Split PDF files into unique files and the duplicates of each one by content hash"""
+        unique = []
+        duplicates = {}
+        first_by_digest = {}
+        for pdf_path in pdf_paths:
+            try:
+                with self._open_pdf(pdf_path) as file:
+                    digest = hash_stream(file)
+            except Exception:
+                # Let extract_totals_from_pdf record the error
+                unique.append(pdf_path)
                 continue
             
-            data = self.extract_totals_from_pdf(pdf_path)
-            self.file_data.append(data)
+            if digest in first_by_digest:
+                duplicates[first_by_digest[digest]].append(pdf_path)
+            else:
+                first_by_digest[digest] = pdf_path
+                duplicates[pdf_path] = []
+                unique.append(pdf_path)
+        return unique, duplicates
+    
+    def _worker_settings(self) -> Dict:
+        """Constructor arguments for the FileProcessor used inside worker processes"""
+        return {
+            'spool_threshold': self.spool_threshold,
+            'use_mmap': self.use_mmap,
+            'backend': self.extraction_backend().name,
+            'cache_dir': self.cache_dir,
+            'cache_max_bytes': self.cache_max_bytes,
+            'prescreen': self.prescreen,
+            'verify_prescreen': self.verify_prescreen,
+            'profile_file': self.profile_file,
+            'memory_limit_mb': self.memory_limit_mb,
+            'page_stats_path': self.page_stats_path
+        }
+    
+    def _worker_counters(self) -> Dict:
+        """Counters collected while a worker process handled one file"""
+        return {
+            'cache': self.cache.counters() if self.cache is not None else None,
+            'prescreen': dict(self.prescreen_stats),
+            'prescreen_misses': list(self.prescreen_misses),
+            'locator': dict(self.locator_stats),
+            'page_observations': list(self.page_observations),
+            'diagnostics': self.diagnostics.worker_data()
+        }
+    
+    def _merge_worker_counters(self, counters: Dict):
+        """Add the counters returned by a worker process to this instance"""
+        if counters['cache'] and self.cache is not None:
+            self.cache.add_counters(counters['cache'])
+        for key, value in counters['prescreen'].items():
+            self.prescreen_stats[key] += value
+        self.prescreen_misses.extend(counters['prescreen_misses'])
+        for key, value in counters['locator'].items():
+            self.locator_stats[key] += value
+        self.page_observations.extend(counters['page_observations'])
+        self.diagnostics.merge(counters['diagnostics'])
+    
+    def _process_files_parallel(self, tasks: List[Tuple], workers: int) -> Iterator[Tuple[Tuple, Dict]]:
+        """Extract totals from PDF files (or page ranges) on a process pool, yielding results in submission order"""
+        from concurrent.futures import ProcessPoolExecutor
         
-        # Sort by filename
-        self.file_data.sort(key=lambda x: x['filename'])
+        settings = self._worker_settings()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            submitted = [(task, executor.submit(_extract_totals_worker, *task, self.archive_path, settings))
+                         for task in tasks]
+            for index, (task, future) in enumerate(submitted):
+                yield self._pool_result(task, future, index + 1, len(tasks), submitted)
     
-    def generate_excel_report(self, output_path: str, society_name: str = "", society_number: str = ""):
+    def _process_files_watched(self, tasks: List[Tuple], workers: int) -> Iterator[Tuple[Tuple, Dict]]:
+        """Extract totals in worker processes that are killed when a file (or page range) exceeds a limit"""
+        from worker_watchdog import WatchdogPool
+        
+        def on_page(task, progress):
+            page, num_pages, filename = progress
+            self._report_progress('page', page - 1, num_pages, filename)
+        
+        pool = WatchdogPool(workers, _extract_totals_worker, task_timeout=self.file_timeout,
+                            heartbeat_timeout=self.page_timeout, memory_limit_mb=self.memory_limit_mb,
+                            progress_callback=on_page)
+        settings = self._worker_settings()
+        with self._read_members(tasks) as members:
+            # The pool takes the next task when a worker is free, so members are read just ahead of it
+            pool_tasks = ((task, (*task, self.archive_path, settings, data)) for task, data in members)
+            for done, (task, value, failure) in enumerate(pool.run(pool_tasks, self.cancel_event), 1):
+                if failure is None:
+                    result, counters = value
+                    self._merge_worker_counters(counters)
+                else:
+                    result = self._error_result(task[0], failure)
+                    if failure.progress is not None:
+                        result['error'] += f" (page {failure.progress[0]} of {failure.progress[1]})"
+                self._report_progress('file', done, len(tasks), result['filename'])
+                yield task, result
+        self._check_cancelled()
+    
+    def start_streaming_report(self, output_path: str, society_name: str = "", society_number: str = ""):
+        """Open a write-only report that receives each file's rows while process_all_files runs
+        
+        Call after verify_schedules_annexures and call finish_streaming_report() once
+        process_all_files has finished.
+        """
+        from excel_report import StreamingExcelReport
+        
+        report = StreamingExcelReport(output_path, society_name, self.missing_files)
+        self.result_callback = report.write_file
+        self._streaming_report = report
+        return report
+    
+    @_timed_stage
+    def finish_streaming_report(self):
+        """Add the changes since the last run (delta re-runs) and save the streaming report"""
+        report = self._streaming_report
+        self._streaming_report = None
+        self.result_callback = None
+        self._write_summary_sheets(report.wb)
+        report.close()
+    
+    def start_exports(self, base_path: str, society_name: str = "", society_number: str = "",
+                      formats: Optional[List[str]] = None) -> List[str]:
+        """Open machine-readable exports (see totals_export.py) that receive each file's records
+        
+        Writes <base_path>.csv, .jsonl and .parquet (default: every format available).
+        Call after verify_schedules_annexures and call finish_exports() once
+        process_all_files has finished. Returns the export paths.
+        """
+        from totals_export import TotalsExport
+        
+        exports = TotalsExport(base_path, formats, society_name, society_number)
+        exports.write_missing(self.missing_files)
+        self._exports = exports
+        return exports.paths
+    
+    def finish_exports(self):
+        """Close the exports opened with start_exports()"""
+        exports = self._exports
+        self._exports = None
+        if exports is not None:
+            exports.close()
+    
+    def export_totals(self, base_path: str, society_name: str = "", society_number: str = "",
+                      formats: Optional[List[str]] = None) -> List[str]:
+        """Write the exports of the files processed so far in one go"""
+        paths = self.start_exports(base_path, society_name, society_number, formats)
+        try:
+            for file_info in self.file_data:
+                self._exports.write_file(file_info)
+        finally:
+            self.finish_exports()
+        return paths
+    
+    def store_results(self, database_path: str, society_name: str = "", society_number: str = "",
+                      report_path: str = "") -> int:
+        """Record this run in the SQLite results database (see results_db.py) and return the run id"""
+        from results_db import ResultsDatabase
+        
+        database = ResultsDatabase(database_path)
+        try:
+            return database.record_run(self.file_data, self.missing_files, society_name, society_number,
+                                       os.path.basename(self.zip_path or ""), os.path.basename(report_path),
+                                       len(self.mismatches))
+        finally:
+            database.close()
+    
+    def _write_summary_sheets(self, wb):
+        """Add the reconciliation, changes (delta re-runs) and diagnostics sheets"""
+        if self.totals_store is not None:
+            from excel_report import write_reconciliation_sheet
+            write_reconciliation_sheet(wb, self.mismatches)
+        if self.manifest_path and self.previous_run is not None:
+            from excel_report import write_changes_sheet
+            write_changes_sheet(wb, self.changes, self.previous_run)
+        if self.diagnostics_sheet:
+            from excel_report import write_diagnostics_sheet
+            # Written while the report stage is still running, which is only recorded once it ends
+            write_diagnostics_sheet(wb, self.diagnostics.to_dict(),
+                                    "Report writing is still running when this sheet is written, so it is "
+                                    "not listed (the diagnostics JSON export includes it)")
+    
+    @_timed_stage
+    def generate_excel_report(self, output_path: str, society_name: str = "", society_number: str = "",
+                              streaming: bool = False):
         """Generate Excel report with findings including page-by-page totals"""
+        if streaming:
+            # Same layout, written with openpyxl's write-only mode and shared named styles
+            from excel_report import StreamingExcelReport
+            
+            report = StreamingExcelReport(output_path, society_name, self.missing_files)
+            for file_info in self.file_data:
+                report.write_file(file_info)
+            self._write_summary_sheets(report.wb)
+            report.close()
+            return
+        
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+        
         wb = Workbook()
         ws = wb.active
         ws.title = "Audit Index"
@@ -274,7 +1441,7 @@ class FileProcessor:
         
         # Top Heading - Society Name
         if society_name:
-            ws.merge_cells(f'A{current_row}:E{current_row}')
+            ws.merge_cells(f'A{current_row}:F{current_row}')
             cell = ws[f'A{current_row}']
             cell.value = society_name.upper()
             cell.font = header_font
@@ -282,7 +1449,7 @@ class FileProcessor:
             current_row += 2
         
         # Title and Date
-        ws.merge_cells(f'A{current_row}:E{current_row}')
+        ws.merge_cells(f'A{current_row}:F{current_row}')
         cell = ws[f'A{current_row}']
         cell.value = f"File Processing Report - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
         cell.font = title_font
@@ -291,7 +1458,7 @@ class FileProcessor:
         
         # Missing Files Section
         if self.missing_files:
-            ws.merge_cells(f'A{current_row}:E{current_row}')
+            ws.merge_cells(f'A{current_row}:F{current_row}')
             cell = ws[f'A{current_row}']
             cell.value = "Missing Files"
             cell.font = title_font
@@ -300,7 +1467,7 @@ class FileProcessor:
             current_row += 1
             
             for missing in self.missing_files:
-                ws.merge_cells(f'A{current_row}:E{current_row}')
+                ws.merge_cells(f'A{current_row}:F{current_row}')
                 cell = ws[f'A{current_row}']
                 cell.value = missing
                 cell.font = normal_font
@@ -310,7 +1477,7 @@ class FileProcessor:
             
             current_row += 1
         else:
-            ws.merge_cells(f'A{current_row}:E{current_row}')
+            ws.merge_cells(f'A{current_row}:F{current_row}')
             cell = ws[f'A{current_row}']
             cell.value = "✓ All required files are present"
             cell.font = title_font
@@ -318,7 +1485,7 @@ class FileProcessor:
             current_row += 2
         
         # File Details Section
-        ws.merge_cells(f'A{current_row}:E{current_row}')
+        ws.merge_cells(f'A{current_row}:F{current_row}')
         cell = ws[f'A{current_row}']
         cell.value = "File Details with Page-by-Page Totals"
         cell.font = title_font
@@ -329,16 +1496,16 @@ class FileProcessor:
         for file_info in self.file_data:
             if file_info.get('page_totals') and len(file_info['page_totals']) > 0:
                 # File header
-                ws.merge_cells(f'A{current_row}:E{current_row}')
+                ws.merge_cells(f'A{current_row}:F{current_row}')
                 cell = ws[f'A{current_row}']
-                pages_with_totals = len(file_info['page_totals'])
+                pages_with_totals = len({page_total['page'] for page_total in file_info['page_totals']})
                 cell.value = f"File: {file_info['filename']} | Total Pages: {file_info['total_pages']} | Pages with Totals: {pages_with_totals}"
                 cell.font = Font(name='Arial', size=10, bold=True)
                 cell.alignment = left_align
                 current_row += 1
                 
                 # Table headers
-                headers = ['Page', 'Opening Balance', 'Debit', 'Credit', 'Closing Balance']
+                headers = ['Page', 'Total Row', 'Opening Balance', 'Debit', 'Credit', 'Closing Balance']
                 for col_num, header in enumerate(headers, 1):
                     cell = ws.cell(row=current_row, column=col_num)
                     cell.value = header
@@ -352,6 +1519,7 @@ class FileProcessor:
                 for idx, page_total in enumerate(file_info['page_totals']):
                     row_data = [
                         page_total['page'],
+                        page_total.get('label', 'Total'),
                         page_total['opening_balance'],
                         page_total['debit'],
                         page_total['credit'],
@@ -375,268 +1543,59 @@ class FileProcessor:
         
         # Adjust column widths
         ws.column_dimensions['A'].width = 10
-        ws.column_dimensions['B'].width = 18
-        ws.column_dimensions['C'].width = 15
+        ws.column_dimensions['B'].width = 14
+        ws.column_dimensions['C'].width = 18
         ws.column_dimensions['D'].width = 15
-        ws.column_dimensions['E'].width = 18
+        ws.column_dimensions['E'].width = 15
+        ws.column_dimensions['F'].width = 18
+        
+        # Reconciliation and changes since the previous run (delta re-runs only)
+        self._write_summary_sheets(wb)
         
         # Save workbook
         wb.save(output_path)
     
     def cleanup(self):
         """Clean up temporary directory"""
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+        self.archive_path = None
+        
         if self.temp_dir and os.path.exists(self.temp_dir):
             shutil.rmtree(self.temp_dir)
+        self.temp_dir = None
 
 
-class FileProcessorGUI:
-    """GUI for the file processor application"""
-    
-    def __init__(self, root):
-        self.root = root
-        self.root.title("File Processor - Schedule & Annexure Verifier")
-        self.root.geometry("850x650")
-        self.root.resizable(True, True)
-        
-        self.processor = FileProcessor()
-        self.zip_path = None
-        self.society_name = ""
-        self.society_number = ""
-        
-        self.setup_ui()
-    
-    def setup_ui(self):
-        """Setup the user interface"""
-        # Main frame
-        main_frame = ttk.Frame(self.root, padding="10")
-        main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        
-        # Configure grid weights
-        self.root.columnconfigure(0, weight=1)
-        self.root.rowconfigure(0, weight=1)
-        main_frame.columnconfigure(0, weight=1)
-        main_frame.rowconfigure(3, weight=1)
-        
-        # Title
-        title_label = ttk.Label(main_frame, text="Schedule & Annexure File Processor", 
-                               font=('Arial', 16, 'bold'))
-        title_label.grid(row=0, column=0, pady=10)
-        
-        # Society Information section
-        society_frame = ttk.LabelFrame(main_frame, text="Step 1: Society Information", padding="10")
-        society_frame.grid(row=1, column=0, sticky=(tk.W, tk.E), pady=10)
-        society_frame.columnconfigure(1, weight=1)
-        
-        ttk.Label(society_frame, text="Society Name:").grid(row=0, column=0, sticky=tk.W, padx=5, pady=5)
-        self.society_name_entry = ttk.Entry(society_frame, width=50)
-        self.society_name_entry.grid(row=0, column=1, sticky=(tk.W, tk.E), padx=5, pady=5)
-        
-        ttk.Label(society_frame, text="Society Number:").grid(row=1, column=0, sticky=tk.W, padx=5, pady=5)
-        self.society_number_entry = ttk.Entry(society_frame, width=50)
-        self.society_number_entry.grid(row=1, column=1, sticky=(tk.W, tk.E), padx=5, pady=5)
-        
-        # Upload section
-        upload_frame = ttk.LabelFrame(main_frame, text="Step 2: Upload ZIP File", padding="10")
-        upload_frame.grid(row=2, column=0, sticky=(tk.W, tk.E), pady=10)
-        upload_frame.columnconfigure(1, weight=1)
-        
-        self.file_label = ttk.Label(upload_frame, text="No file selected")
-        self.file_label.grid(row=0, column=0, columnspan=2, pady=5)
-        
-        upload_btn = ttk.Button(upload_frame, text="Select ZIP File", command=self.select_zip_file)
-        upload_btn.grid(row=1, column=0, padx=5, pady=5)
-        
-        process_btn = ttk.Button(upload_frame, text="Process Files", command=self.process_files)
-        process_btn.grid(row=1, column=1, padx=5, pady=5)
-        
-        # Output section
-        output_frame = ttk.LabelFrame(main_frame, text="Processing Log", padding="10")
-        output_frame.grid(row=3, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=10)
-        output_frame.columnconfigure(0, weight=1)
-        output_frame.rowconfigure(0, weight=1)
-        
-        # Text widget with scrollbar
-        self.output_text = tk.Text(output_frame, wrap=tk.WORD, height=20)
-        scrollbar = ttk.Scrollbar(output_frame, orient=tk.VERTICAL, command=self.output_text.yview)
-        self.output_text.configure(yscrollcommand=scrollbar.set)
-        
-        self.output_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
-        
-        # Download section
-        download_frame = ttk.Frame(main_frame)
-        download_frame.grid(row=4, column=0, pady=10)
-        
-        self.download_btn = ttk.Button(download_frame, text="Download Excel Report", 
-                                       command=self.download_report, state=tk.DISABLED)
-        self.download_btn.pack()
-        
-        self.report_path = None
-    
-    def select_zip_file(self):
-        """Open file dialog to select ZIP file"""
-        file_path = filedialog.askopenfilename(
-            title="Select ZIP File",
-            filetypes=[("ZIP files", "*.zip"), ("All files", "*.*")]
-        )
-        
-        if file_path:
-            self.zip_path = file_path
-            self.file_label.config(text=f"Selected: {os.path.basename(file_path)}")
-            self.log_message(f"ZIP file selected: {file_path}\n")
+def _extract_totals_worker(pdf_path: str, pages: Optional[Tuple[int, int]], archive_path: Optional[str],
+                           settings: Dict, data: Optional[bytes] = None, heartbeat=None) -> Tuple[Dict, Dict]:
+    """Process pool entry point for extracting totals from a single PDF or one of its page ranges
     
-    def process_files(self):
-        """Process the selected ZIP file"""
-        if not self.zip_path:
-            messagebox.showerror("Error", "Please select a ZIP file first!")
-            return
-        
-        # Get society information
-        self.society_name = self.society_name_entry.get().strip()
-        self.society_number = self.society_number_entry.get().strip()
-        
-        self.output_text.delete(1.0, tk.END)
-        self.log_message("Starting file processing...\n\n")
-        
-        # Log society information
-        if self.society_name:
-            self.log_message(f"Society Name: {self.society_name}\n")
-        if self.society_number:
-            self.log_message(f"Society Number: {self.society_number}\n")
-        if self.society_name or self.society_number:
-            self.log_message("\n")
-        
-        try:
-            # Step 1: Validate ZIP file
-            self.log_message("Step 1: Validating ZIP file...\n")
-            self.processor.upload_zip_file(self.zip_path)
-            self.log_message("✓ ZIP file is valid\n\n")
-            
-            # Step 2: Extract ZIP file
-            self.log_message("Step 2: Extracting ZIP file...\n")
-            temp_dir = self.processor.extract_zip(self.zip_path)
-            self.log_message(f"✓ Files extracted to: {temp_dir}\n\n")
-            
-            # Step 3: Identify filenames
-            self.log_message("Step 3: Identifying PDF files...\n")
-            filenames = self.processor.identify_filenames()
-            self.log_message(f"✓ Found {len(filenames)} PDF files\n")
-            
-            # Separate omitted files from processable files
-            omitted = []
-            processable = []
-            for filename in filenames:
-                if self.processor._should_omit_file(filename):
-                    omitted.append(filename)
-                else:
-                    processable.append(filename)
-            
-            if processable:
-                self.log_message(f"\nFiles to process: {len(processable)}\n")
-                for filename in processable:
-                    self.log_message(f"  - {filename}\n")
-            
-            if omitted:
-                self.log_message(f"\n⚠ Omitted files (Schedule 1, 22, Annexure 1): {len(omitted)}\n", "warning")
-                for filename in omitted:
-                    self.log_message(f"  - {filename}\n", "warning")
-            
-            self.log_message("\n")
-            
-            # Step 4: Verify schedules and annexures
-            self.log_message("Step 4: Verifying schedules and annexures...\n")
-            missing_schedules, missing_annexures = self.processor.verify_schedules_annexures()
-            
-            if missing_schedules or missing_annexures:
-                self.log_message("⚠ Missing files detected:\n", "warning")
-                if missing_schedules:
-                    self.log_message(f"  Missing Schedules: {', '.join(missing_schedules)}\n", "warning")
-                if missing_annexures:
-                    self.log_message(f"  Missing Annexures: {', '.join(missing_annexures)}\n", "warning")
-            else:
-                self.log_message("✓ All required schedules and annexures are present\n")
-            self.log_message("\n")
-            
-            # Step 5: Process all files and extract totals from each page
-            self.log_message("Step 5: Extracting totals from each page of PDF files...\n")
-            self.processor.process_all_files()
-            
-            # Log summary of extracted data
-            total_pages_with_totals = sum(len(f.get('page_totals', [])) for f in self.processor.file_data)
-            self.log_message(f"✓ Processed {len(self.processor.file_data)} files\n")
-            self.log_message(f"✓ Found totals on {total_pages_with_totals} pages\n\n")
-            
-            # Step 6: Generate Excel report
-            self.log_message("Step 6: Generating Excel report...\n")
-            self.report_path = os.path.join(tempfile.gettempdir(), 
-                                           f"Audit_Index_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
-            self.processor.generate_excel_report(self.report_path, self.society_name, self.society_number)
-            self.log_message(f"✓ Report generated: {self.report_path}\n\n")
-            
-            self.log_message("=" * 50 + "\n")
-            self.log_message("Processing completed successfully!\n", "success")
-            self.log_message("Click 'Download Excel Report' to save the report.\n", "success")
-            
-            self.download_btn.config(state=tk.NORMAL)
-            
-        except Exception as e:
-            self.log_message(f"\n✗ Error: {str(e)}\n", "error")
-            messagebox.showerror("Processing Error", f"An error occurred:\n{str(e)}")
-    
-    def download_report(self):
-        """Save the generated report to user-selected location"""
-        if not self.report_path:
-            messagebox.showerror("Error", "No report available to download!")
-            return
-        
-        save_path = filedialog.asksaveasfilename(
-            title="Save Audit Index Report",
-            defaultextension=".xlsx",
-            filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
-            initialfile=f"Audit_Index_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        )
-        
-        if save_path:
-            try:
-                shutil.copy(self.report_path, save_path)
-                messagebox.showinfo("Success", f"Report saved successfully to:\n{save_path}")
-                self.log_message(f"\n✓ Report downloaded to: {save_path}\n", "success")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to save report:\n{str(e)}")
-    
-    def log_message(self, message, tag=None):
-        """Add message to output text widget"""
-        self.output_text.insert(tk.END, message)
-        if tag == "error":
-            # Color the last inserted text red
-            start_idx = self.output_text.index(f"end-{len(message)}c")
-            self.output_text.tag_add("error", start_idx, tk.END)
-            self.output_text.tag_config("error", foreground="red")
-        elif tag == "success":
-            start_idx = self.output_text.index(f"end-{len(message)}c")
-            self.output_text.tag_add("success", start_idx, tk.END)
-            self.output_text.tag_config("success", foreground="green")
-        elif tag == "warning":
-            start_idx = self.output_text.index(f"end-{len(message)}c")
-            self.output_text.tag_add("warning", start_idx, tk.END)
-            self.output_text.tag_config("warning", foreground="orange")
-        
-        self.output_text.see(tk.END)
-        self.root.update()
-    
-    def on_closing(self):
-        """Handle window closing"""
-        self.processor.cleanup()
-        self.root.destroy()
+    Under the watchdog, heartbeat((page, total, filename)) is called before each page.
+    The pipeline passes the member's bytes as data when it has read them ahead.
+    """
+    processor = FileProcessor(**settings)
+    processor.archive_path = archive_path
+    if data is not None:
+        processor._prefetched[pdf_path] = io.BytesIO(data)
+    if heartbeat is not None:
+        processor.page_callback = lambda *progress: heartbeat(progress)
+    try:
+        result = processor.extract_totals_from_pdf(pdf_path, pages)
+        return result, processor._worker_counters()
+    finally:
+        processor.cleanup()
+        if processor.cache is not None:
+            processor.cache.close()
 
 
 def main():
     """Main entry point"""
-    root = tk.Tk()
-    app = FileProcessorGUI(root)
-    root.protocol("WM_DELETE_WINDOW", app.on_closing)
-    root.mainloop()
+    from file_processor_gui import main as gui_main
+    gui_main()
 
 
 if __name__ == "__main__":
+    # Required for process pool workers in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,437 @@
+import os
+import sys
+import json
+import tempfile
+import shutil
+import queue
+import re
+import threading
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk
+from datetime import datetime
+from typing import List, Optional
+from file_processor import FileProcessor, ProcessingCancelled
+
+# How often the Tk side applies queued log lines and progress updates
+QUEUE_POLL_MS = 100
+
+
+class FileProcessorGUI:
+    """GUI for the file processor application"""
+    
+    def __init__(self, root):
+        self.root = root
+        self.root.title("File Processor - Schedule & Annexure Verifier")
+        self.root.geometry("850x650")
+        self.root.resizable(True, True)
+        
+        app_dir = os.path.join(os.path.expanduser("~"), ".audit_index_processor")
+        # A PDF that hangs or takes too long is stopped and reported instead of blocking the run
+        self.processor = FileProcessor(in_archive=True, cache_dir=os.path.join(app_dir, "cache"),
+                                       prescreen=True, use_mmap=True, file_timeout=600, page_timeout=120)
+        # One manifest per society (or ZIP name) so re-runs only reprocess changed files
+        self.manifest_dir = os.path.join(app_dir, "manifests")
+        # Checkpoints of the running archive, so a run that was cancelled or crashed resumes
+        self.journal_dir = os.path.join(app_dir, "journals")
+        # Every run is recorded here for queries across audits (see results_db.py)
+        self.results_db = os.path.join(app_dir, "results.sqlite3")
+        self.zip_path = None
+        self.society_name = ""
+        self.society_number = ""
+        
+        # Processing runs on a worker thread that reports back through this queue
+        self.messages = queue.Queue()
+        self.worker = None
+        self.processor.progress_callback = self.on_progress
+        
+        self.setup_ui()
+        self.root.after(QUEUE_POLL_MS, self.poll_messages)
+    
+    def setup_ui(self):
+        """Setup the user interface"""
+        # Main frame
+        main_frame = ttk.Frame(self.root, padding="10")
+        main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        # Configure grid weights
+        self.root.columnconfigure(0, weight=1)
+        self.root.rowconfigure(0, weight=1)
+        main_frame.columnconfigure(0, weight=1)
+        main_frame.rowconfigure(3, weight=1)
+        
+        # Title
+        title_label = ttk.Label(main_frame, text="Schedule & Annexure File Processor", 
+                               font=('Arial', 16, 'bold'))
+        title_label.grid(row=0, column=0, pady=10)
+        
+        # Society Information section
+        society_frame = ttk.LabelFrame(main_frame, text="Step 1: Society Information", padding="10")
+        society_frame.grid(row=1, column=0, sticky=(tk.W, tk.E), pady=10)
+        society_frame.columnconfigure(1, weight=1)
+        
+        ttk.Label(society_frame, text="Society Name:").grid(row=0, column=0, sticky=tk.W, padx=5, pady=5)
+        self.society_name_entry = ttk.Entry(society_frame, width=50)
+        self.society_name_entry.grid(row=0, column=1, sticky=(tk.W, tk.E), padx=5, pady=5)
+        
+        ttk.Label(society_frame, text="Society Number:").grid(row=1, column=0, sticky=tk.W, padx=5, pady=5)
+        self.society_number_entry = ttk.Entry(society_frame, width=50)
+        self.society_number_entry.grid(row=1, column=1, sticky=(tk.W, tk.E), padx=5, pady=5)
+        
+        # Upload section
+        upload_frame = ttk.LabelFrame(main_frame, text="Step 2: Upload ZIP File", padding="10")
+        upload_frame.grid(row=2, column=0, sticky=(tk.W, tk.E), pady=10)
+        upload_frame.columnconfigure(1, weight=1)
+        
+        self.file_label = ttk.Label(upload_frame, text="No file selected")
+        self.file_label.grid(row=0, column=0, columnspan=2, pady=5)
+        
+        upload_btn = ttk.Button(upload_frame, text="Select ZIP File", command=self.select_zip_file)
+        upload_btn.grid(row=1, column=0, padx=5, pady=5)
+        
+        self.process_btn = ttk.Button(upload_frame, text="Process Files", command=self.process_files)
+        self.process_btn.grid(row=1, column=1, padx=5, pady=5)
+        
+        self.cancel_btn = ttk.Button(upload_frame, text="Cancel", command=self.cancel_processing,
+                                     state=tk.DISABLED)
+        self.cancel_btn.grid(row=1, column=2, padx=5, pady=5)
+        
+        # Progress bars for files in the archive and pages in the current file
+        self.file_progress_label = ttk.Label(upload_frame, text="Files:")
+        self.file_progress_label.grid(row=2, column=0, sticky=tk.W, padx=5)
+        self.file_progress = ttk.Progressbar(upload_frame, mode='determinate')
+        self.file_progress.grid(row=2, column=1, columnspan=2, sticky=(tk.W, tk.E), padx=5, pady=2)
+        
+        self.page_progress_label = ttk.Label(upload_frame, text="Pages:")
+        self.page_progress_label.grid(row=3, column=0, sticky=tk.W, padx=5)
+        self.page_progress = ttk.Progressbar(upload_frame, mode='determinate')
+        self.page_progress.grid(row=3, column=1, columnspan=2, sticky=(tk.W, tk.E), padx=5, pady=2)
+        
+        # Output section
+        output_frame = ttk.LabelFrame(main_frame, text="Processing Log", padding="10")
+        output_frame.grid(row=3, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=10)
+        output_frame.columnconfigure(0, weight=1)
+        output_frame.rowconfigure(0, weight=1)
+        
+        # Text widget with scrollbar
+        self.output_text = tk.Text(output_frame, wrap=tk.WORD, height=20)
+        scrollbar = ttk.Scrollbar(output_frame, orient=tk.VERTICAL, command=self.output_text.yview)
+        self.output_text.configure(yscrollcommand=scrollbar.set)
+        
+        self.output_text.tag_config("error", foreground="red")
+        self.output_text.tag_config("success", foreground="green")
+        self.output_text.tag_config("warning", foreground="orange")
+        
+        self.output_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        
+        # Download section
+        download_frame = ttk.Frame(main_frame)
+        download_frame.grid(row=4, column=0, pady=10)
+        
+        self.download_btn = ttk.Button(download_frame, text="Download Excel Report", 
+                                       command=self.download_report, state=tk.DISABLED)
+        self.download_btn.pack()
+        
+        self.report_path = None
+    
+    def select_zip_file(self):
+        """Open file dialog to select ZIP file"""
+        file_path = filedialog.askopenfilename(
+            title="Select ZIP File",
+            filetypes=[("ZIP files", "*.zip"), ("All files", "*.*")]
+        )
+        
+        if file_path:
+            self.zip_path = file_path
+            self.file_label.config(text=f"Selected: {os.path.basename(file_path)}")
+            self.log_message(f"ZIP file selected: {file_path}\n")
+    
+    def process_files(self):
+        """Process the selected ZIP file on a worker thread"""
+        if not self.zip_path:
+            messagebox.showerror("Error", "Please select a ZIP file first!")
+            return
+        if self.worker is not None and self.worker.is_alive():
+            return
+        
+        # Get society information
+        self.society_name = self.society_name_entry.get().strip()
+        self.society_number = self.society_number_entry.get().strip()
+        
+        self.output_text.delete(1.0, tk.END)
+        self.file_progress.config(value=0, maximum=1)
+        self.page_progress.config(value=0, maximum=1)
+        self.process_btn.config(state=tk.DISABLED)
+        self.cancel_btn.config(state=tk.NORMAL)
+        self.download_btn.config(state=tk.DISABLED)
+        
+        self.processor.cancel_event.clear()
+        self.worker = threading.Thread(target=self.run_processing, daemon=True)
+        self.worker.start()
+    
+    def cancel_processing(self):
+        """Stop processing after the file or page currently being read"""
+        self.processor.cancel()
+        self.cancel_btn.config(state=tk.DISABLED)
+        self.log_message("\nCancelling...\n", "warning")
+    
+    def run_processing(self):
+        """Run the processing steps (worker thread; talks to Tk only through the queue)"""
+        self.log_message("Starting file processing...\n\n")
+        
+        # Log society information
+        if self.society_name:
+            self.log_message(f"Society Name: {self.society_name}\n")
+        if self.society_number:
+            self.log_message(f"Society Number: {self.society_number}\n")
+        if self.society_name or self.society_number:
+            self.log_message("\n")
+        
+        try:
+            # Step 1: Validate ZIP file
+            self.log_message("Step 1: Validating ZIP file...\n")
+            self.processor.upload_zip_file(self.zip_path)
+            self.log_message("✓ ZIP file is valid\n\n")
+            
+            # Step 2: Extract ZIP file
+            self.log_message("Step 2: Extracting ZIP file...\n")
+            source = self.processor.extract_zip(self.zip_path)
+            if self.processor.in_archive:
+                self.log_message(f"✓ Files read directly from: {source}\n\n")
+            else:
+                self.log_message(f"✓ Files extracted to: {source}\n\n")
+            
+            # Step 3: Identify filenames
+            self.log_message("Step 3: Identifying PDF files...\n")
+            records = self.processor.classified_files()
+            self.log_message(f"✓ Found {len(records)} PDF files\n")
+            
+            # Separate omitted files from processable files
+            omitted = [record.filename for record in records if record.omitted]
+            processable = [record.filename for record in records if not record.omitted]
+            ambiguous = [record.filename for record in records if record.ambiguous]
+            
+            if processable:
+                self.log_message(f"\nFiles to process: {len(processable)}\n")
+                for filename in processable:
+                    self.log_message(f"  - {filename}\n")
+            
+            if omitted:
+                self.log_message(f"\n⚠ Omitted files (Schedule 1, 22, Annexure 1): {len(omitted)}\n", "warning")
+                for filename in omitted:
+                    self.log_message(f"  - {filename}\n", "warning")
+            
+            if ambiguous:
+                self.log_message(f"\n⚠ Files naming both a schedule and an annexure: {len(ambiguous)}\n", "warning")
+                for filename in ambiguous:
+                    self.log_message(f"  - {filename}\n", "warning")
+            
+            self.log_message("\n")
+            
+            # Step 4: Verify schedules and annexures
+            self.log_message("Step 4: Verifying schedules and annexures...\n")
+            missing_schedules, missing_annexures = self.processor.verify_schedules_annexures()
+            
+            if missing_schedules or missing_annexures:
+                self.log_message("⚠ Missing files detected:\n", "warning")
+                if missing_schedules:
+                    self.log_message(f"  Missing Schedules: {', '.join(missing_schedules)}\n", "warning")
+                if missing_annexures:
+                    self.log_message(f"  Missing Annexures: {', '.join(missing_annexures)}\n", "warning")
+            else:
+                self.log_message("✓ All required schedules and annexures are present\n")
+            self.log_message("\n")
+            
+            # Step 5: Process all files and extract totals from each page
+            self.log_message("Step 5: Extracting totals from each page of PDF files...\n")
+            self.log_message(f"PDF backend: {self.processor.extraction_backend().name}\n")
+            self.processor.manifest_path = self.manifest_path()
+            self.processor.journal_path = self.journal_path()
+            self.processor.process_all_files()
+            
+            # Log summary of extracted data
+            total_pages_with_totals = sum(len({p['page'] for p in f.get('page_totals', [])})
+                                          for f in self.processor.file_data)
+            self.log_message(f"✓ Processed {len(self.processor.file_data)} files\n")
+            if self.processor.journal_stats['files_resumed']:
+                self.log_message(f"✓ Resumed {self.processor.journal_stats['files_resumed']} files "
+                                 f"from the interrupted run\n")
+            self.log_message(f"✓ Found totals on {total_pages_with_totals} pages\n")
+            if self.processor.cache is not None:
+                cache = self.processor.cache
+                self.log_message(f"✓ Cache: {cache.hits} hits, {cache.misses} misses\n")
+            if self.processor.prescreen:
+                stats = self.processor.prescreen_stats
+                self.log_message(f"✓ Pre-screen skipped {stats['pages_skipped']} of "
+                                 f"{stats['pages_screened']} pages without totals\n")
+            if self.processor.mismatches:
+                self.log_message(f"⚠ {len(self.processor.mismatches)} totals do not reconcile "
+                                 f"(see the Reconciliation sheet)\n", "warning")
+            else:
+                self.log_message("✓ All balances reconcile\n")
+            if self.processor.previous_run is not None:
+                self.log_message(f"✓ {len(self.processor.changes)} files changed since the run of "
+                                 f"{self.processor.previous_run}\n")
+            self.log_message("\n")
+            
+            # Step 6: Generate Excel report
+            self.log_message("Step 6: Generating Excel report...\n")
+            self.report_path = os.path.join(tempfile.gettempdir(), 
+                                           f"Audit_Index_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
+            self.processor.generate_excel_report(self.report_path, self.society_name, self.society_number,
+                                                 streaming=True)
+            self.log_message(f"✓ Report generated: {self.report_path}\n")
+            self.processor.remove_journal()
+            try:
+                self.processor.store_results(self.results_db, self.society_name, self.society_number,
+                                             self.report_path)
+                self.log_message(f"✓ Results recorded in {self.results_db}\n\n")
+            except Exception as e:
+                # The report is what matters; a locked or damaged database must not fail the run
+                self.log_message(f"⚠ Could not record results: {e}\n\n", "warning")
+            
+            # Where the time went
+            self.log_message("Diagnostics:\n")
+            for line in self.processor.diagnostics.summary_lines():
+                self.log_message(f"  {line}\n")
+            self.log_message("\n")
+            
+            self.log_message("=" * 50 + "\n")
+            self.log_message("Processing completed successfully!\n", "success")
+            self.log_message("Click 'Download Excel Report' to save the report.\n", "success")
+            
+            self.messages.put(('finished', None))
+            
+        except ProcessingCancelled:
+            self.log_message("\n⚠ Processing cancelled, no report was generated; finished files are "
+                             "kept and the next run of this archive resumes from them\n", "warning")
+            self.messages.put(('cancelled', None))
+        except Exception as e:
+            self.log_message(f"\n✗ Error: {str(e)}\n", "error")
+            self.messages.put(('failed', str(e)))
+    
+    def society_label(self):
+        """File name label of the current society (its number, else the ZIP name)"""
+        label = self.society_number or os.path.splitext(os.path.basename(self.zip_path))[0]
+        return re.sub(r'[^\w\-]+', '_', label).strip('_') or "default"
+    
+    def manifest_path(self):
+        """Manifest file of the delta re-run for the current society"""
+        return os.path.join(self.manifest_dir, f"{self.society_label()}.json")
+    
+    def journal_path(self):
+        """Checkpoint journal of the current society's run"""
+        return os.path.join(self.journal_dir, f"{self.society_label()}.journal.jsonl")
+    
+    def download_report(self):
+        """Save the generated report to user-selected location"""
+        if not self.report_path:
+            messagebox.showerror("Error", "No report available to download!")
+            return
+        
+        save_path = filedialog.asksaveasfilename(
+            title="Save Audit Index Report",
+            defaultextension=".xlsx",
+            filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
+            initialfile=f"Audit_Index_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        )
+        
+        if save_path:
+            try:
+                shutil.copy(self.report_path, save_path)
+                messagebox.showinfo("Success", f"Report saved successfully to:\n{save_path}")
+                self.log_message(f"\n✓ Report downloaded to: {save_path}\n", "success")
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to save report:\n{str(e)}")
+    
+    def log_message(self, message, tag=None):
+        """Queue a message for the output text widget (safe from any thread)"""
+        self.messages.put(('log', (message, tag)))
+    
+    def on_progress(self, kind, done, total, filename):
+        """Progress callback from FileProcessor (called on the worker thread)"""
+        self.messages.put(('progress', (kind, done, total, filename)))
+    
+    def poll_messages(self):
+        """Apply queued log lines and progress updates in one batch"""
+        # Consecutive lines with the same tag are inserted with a single call
+        chunks = []
+        progress = {}
+        outcome = None
+        try:
+            while True:
+                kind, payload = self.messages.get_nowait()
+                if kind == 'log':
+                    message, tag = payload
+                    if chunks and chunks[-1][1] == tag:
+                        chunks[-1][0].append(message)
+                    else:
+                        chunks.append(([message], tag))
+                elif kind == 'progress':
+                    # Only the latest value of each bar matters
+                    progress[payload[0]] = payload
+                else:
+                    outcome = (kind, payload)
+        except queue.Empty:
+            pass
+        
+        if chunks:
+            for messages, tag in chunks:
+                self.output_text.insert(tk.END, "".join(messages), tag or ())
+            self.output_text.see(tk.END)
+        
+        if 'file' in progress:
+            _, done, total, filename = progress['file']
+            self.file_progress.config(value=done, maximum=max(total, 1))
+            self.file_progress_label.config(text=f"Files: {done}/{total}")
+        if 'page' in progress:
+            _, done, total, filename = progress['page']
+            self.page_progress.config(value=done, maximum=max(total, 1))
+            self.page_progress_label.config(text=f"Pages: {done}/{total}")
+        
+        if outcome is not None:
+            self.on_processing_done(*outcome)
+        
+        self.root.after(QUEUE_POLL_MS, self.poll_messages)
+    
+    def on_processing_done(self, outcome, error):
+        """Restore the buttons once the worker thread has finished"""
+        self.process_btn.config(state=tk.NORMAL)
+        self.cancel_btn.config(state=tk.DISABLED)
+        if outcome == 'finished':
+            self.download_btn.config(state=tk.NORMAL)
+        elif outcome == 'failed':
+            messagebox.showerror("Processing Error", f"An error occurred:\n{error}")
+    
+    def on_closing(self):
+        """Handle window closing"""
+        if self.worker is not None and self.worker.is_alive():
+            self.processor.cancel()
+            self.worker.join(timeout=5)
+        self.processor.cleanup()
+        self.root.destroy()
+
+
+def main(argv: Optional[List[str]] = None):
+    """Main entry point"""
+    if argv is None:
+        argv = sys.argv[1:]
+    
+    root = tk.Tk()
+    app = FileProcessorGUI(root)
+    root.protocol("WM_DELETE_WINDOW", app.on_closing)
+    
+    if "--startup-check" in argv:
+        # Draw the window once, report which heavy libraries were loaded and exit
+        # (used by benchmarks/startup_time.py)
+        root.update()
+        heavy_modules = [name for name in ("PyPDF2", "openpyxl") if name in sys.modules]
+        print(json.dumps({"window_shown": True, "heavy_modules_loaded": heavy_modules}))
+        app.on_closing()
+        return
+    
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
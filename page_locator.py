@@ -0,0 +1,202 @@
+"""Learned locations of totals pages per schedule and annexure number
+
+Each Schedule or Annexure type tends to keep its totals in the same places:
+the last page, a summary page near the start or the end, or every page. The
+PageLocator keeps, per document type and number (e.g. "schedule:5"), how many
+full scans it has seen, their page counts and how often each position from
+the start and from the end of the file held a total row.
+
+For a new file with enough history, likely_pages() returns the pages worth
+extracting, most likely first, and plausible() checks the totals found there:
+
+    - at least one total row
+    - a Grand Total, if most earlier files of the type had one
+    - the carry-forward between the pages found: a page's opening balance
+      must equal the previous found page's closing balance, otherwise a page
+      with totals was skipped in between
+
+The locator gives up (and the caller scans every page) when the type has too
+little history, the page count is outside the range seen before, or totals
+are spread over too many pages for skipping to pay off. Only full scans are
+learned from, so the statistics never depend on a speculative result, and
+only when they are made: results served from the result cache are not counted
+again when the same archive is submitted twice.
+"""
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from totals_store import TOLERANCE, parse_amount
+
+# Full scans of a document type needed before its pages are predicted
+MIN_FILES = 3
+# A position is extracted when at least this share of earlier files had totals there
+MIN_SHARE = 0.1
+# Types whose files have totals on more than this share of pages are always scanned fully
+MAX_DENSITY = 0.5
+# Positions further than this from the start or end of a file are not tracked
+POSITION_WINDOW = 25
+
+
+def document_key(kind: Optional[str], number: Optional[int]) -> Optional[str]:
+    """Statistics key of a classified file, None for files that are no schedule or annexure"""
+    return f"{kind}:{number}" if kind and number is not None else None
+
+
+def observation(key: str, result: Dict) -> Dict:
+    """What a fully scanned file tells the locator (sent back from worker processes)"""
+    return {
+        'key': key,
+        'total_pages': result['total_pages'],
+        'pages': sorted({page_total['page'] for page_total in result['page_totals']}),
+        'grand_total': any(page_total.get('label') == 'Grand Total' for page_total in result['page_totals'])
+    }
+
+
+@contextmanager
+def _locked(path: str) -> Iterator[None]:
+    """Hold an exclusive advisory lock on path + '.lock' (fcntl, or msvcrt on Windows)"""
+    with open(path + '.lock', 'a+b') as lock_file:
+        if os.name == 'nt':
+            import msvcrt
+
+            # Retries for about 10 seconds, then raises OSError
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+class PageLocator:
+    """Per-type statistics of totals pages, kept in a JSON file between runs"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.types = self._load()
+        # Observations not yet saved
+        self._unsaved: List[Dict] = []
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            return self._read()
+        except (OSError, ValueError):
+            # A damaged file only costs full scans until it is rewritten
+            return {}
+
+    def _read(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, encoding='utf-8') as file:
+            return json.load(file).get('types', {})
+
+    def learn(self, observations: List[Dict]):
+        """Add the pages with totals of fully scanned files"""
+        self._apply(observations)
+        self._unsaved.extend(observations)
+
+    def _apply(self, observations: List[Dict]):
+        for seen in observations:
+            pages = seen['total_pages']
+            stats = self.types.setdefault(seen['key'], {
+                'files': 0, 'min_pages': pages, 'max_pages': pages, 'total_pages': 0,
+                'pages_with_totals': 0, 'grand_totals': 0, 'from_start': {}, 'from_end': {}
+            })
+            stats['files'] += 1
+            stats['min_pages'] = min(stats['min_pages'], pages)
+            stats['max_pages'] = max(stats['max_pages'], pages)
+            stats['total_pages'] += pages
+            stats['pages_with_totals'] += len(seen['pages'])
+            stats['grand_totals'] += seen['grand_total']
+            for page in seen['pages']:
+                # JSON object keys are strings
+                if page - 1 < POSITION_WINDOW:
+                    position = str(page - 1)
+                    stats['from_start'][position] = stats['from_start'].get(position, 0) + 1
+                if pages - page < POSITION_WINDOW:
+                    position = str(pages - page)
+                    stats['from_end'][position] = stats['from_end'].get(position, 0) + 1
+
+    def likely_pages(self, key: Optional[str], num_pages: int) -> Optional[List[int]]:
+        """0-based pages to extract, most likely first, or None if every page should be scanned"""
+        stats = self.types.get(key) if key else None
+        if stats is None or stats['files'] < MIN_FILES:
+            return None
+        if not stats['min_pages'] <= num_pages <= stats['max_pages']:
+            return None
+        if stats['pages_with_totals'] > MAX_DENSITY * stats['total_pages']:
+            return None
+
+        counts = {}
+        for position, count in stats['from_start'].items():
+            counts[int(position)] = max(counts.get(int(position), 0), count)
+        for position, count in stats['from_end'].items():
+            page = num_pages - 1 - int(position)
+            counts[page] = max(counts.get(page, 0), count)
+        pages = [page for page, count in counts.items()
+                 if 0 <= page < num_pages and count >= MIN_SHARE * stats['files']]
+        if not pages or len(pages) > MAX_DENSITY * num_pages:
+            return None
+        return sorted(pages, key=lambda page: (-counts[page], page))
+
+    def plausible(self, key: str, page_totals: List[Dict]) -> bool:
+        """Whether totals found on the predicted pages can stand for a full scan"""
+        if not page_totals:
+            return False
+        stats = self.types[key]
+        if stats['grand_totals'] * 2 > stats['files'] and \
+                not any(page_total.get('label') == 'Grand Total' for page_total in page_totals):
+            return False
+
+        previous = None
+        for page_total in page_totals:
+            if previous is not None and page_total['page'] == previous['page']:
+                # Only the first row of a page carries forward
+                continue
+            if previous is not None:
+                closing = parse_amount(previous.get('closing_balance'))
+                opening = parse_amount(page_total.get('opening_balance'))
+                if closing is not None and opening is not None and abs(opening - closing) > TOLERANCE:
+                    return False
+            previous = page_total
+        return True
+
+    def save(self):
+        """Write the statistics (atomically) for the next run
+
+        Under a lock the file is read again first, so runs sharing it (e.g.
+        parallel batch jobs) add to each other's statistics instead of replacing
+        them. If it cannot be parsed, the statistics loaded by this run (with
+        its observations) are written instead of starting from nothing.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with _locked(self.path):
+            try:
+                self.types = self._read()
+            except ValueError:
+                # self.types still holds this run's observations
+                pass
+            else:
+                self._apply(self._unsaved)
+            self._unsaved = []
+            file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(file_descriptor, 'w', encoding='utf-8') as file:
+                    json.dump({'types': self.types}, file)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
@@ -0,0 +1,173 @@
+"""Cheap check of a PDF page's content stream for TOTAL / GRAND TOTAL text
+
+page_may_have_totals() reads the decoded content stream and joins the bytes of
+every string operand without running PyPDF2's layout pass. A page is only
+reported as having no totals when that answer is certain, i.e. all of its fonts
+are simple fonts whose codes map letters to themselves. Anything the screen
+cannot read (composite or Type 3 fonts, /ToUnicode maps, /Differences
+encodings, form XObjects, inline images) is reported as "may have totals" so the
+full extraction still runs.
+"""
+import re
+from typing import List, Optional
+
+
+# Outside strings we only care about string starts and comments
+_OUTSIDE = re.compile(rb'[(<%]')
+# Inside a literal string: escapes and (possibly nested) parentheses
+_INSIDE = re.compile(rb'[()\\]')
+_WHITESPACE = re.compile(rb'\s+')
+_INLINE_IMAGE = re.compile(rb'(?:^|\s)BI\s')
+_ESCAPES = {
+    ord('n'): b'\n', ord('r'): b'\r', ord('t'): b'\t', ord('b'): b'\b', ord('f'): b'\f',
+    ord('('): b'(', ord(')'): b')', ord('\\'): b'\\'
+}
+_OCTAL = re.compile(rb'[0-7]{1,3}')
+
+
+def content_stream_text(data: bytes) -> Optional[bytes]:
+    """Concatenate the bytes of all string operands in a content stream
+
+    Returns None when the stream cannot be scanned reliably.
+    """
+    if _INLINE_IMAGE.search(data):
+        # Inline image data is binary and may contain anything
+        return None
+
+    pieces: List[bytes] = []
+    pos = 0
+    length = len(data)
+    while True:
+        match = _OUTSIDE.search(data, pos)
+        if match is None:
+            break
+        start = match.start()
+        char = data[start]
+
+        if char == 0x25:  # % comment up to the end of the line
+            end = data.find(b'\n', start)
+            pos = length if end == -1 else end + 1
+        elif char == 0x3C:  # < hex string or << dictionary
+            if data[start + 1:start + 2] == b'<':
+                pos = start + 2
+                continue
+            end = data.find(b'>', start)
+            if end == -1:
+                return None
+            digits = _WHITESPACE.sub(b'', data[start + 1:end])
+            if len(digits) % 2:
+                digits += b'0'
+            try:
+                pieces.append(bytes.fromhex(digits.decode('ascii')))
+            except ValueError:
+                return None
+            pos = end + 1
+        else:  # ( literal string
+            pos = _read_literal(data, start + 1, pieces)
+            if pos < 0:
+                return None
+
+    return b''.join(pieces)
+
+
+def _read_literal(data: bytes, pos: int, pieces: List[bytes]) -> int:
+    """Append the decoded literal string starting after '(' and return the position after ')'"""
+    depth = 1
+    segment = pos
+    while True:
+        match = _INSIDE.search(data, pos)
+        if match is None:
+            return -1
+        index = match.start()
+        char = data[index]
+
+        if char == 0x5C:  # backslash escape
+            pieces.append(data[segment:index])
+            following = data[index + 1:index + 2]
+            if not following:
+                return -1
+            if following in b'\r\n':
+                # Line continuation
+                pos = index + 2
+                if data[index + 1:index + 3] == b'\r\n':
+                    pos += 1
+            else:
+                octal = _OCTAL.match(data, index + 1)
+                if octal:
+                    pieces.append(bytes([int(octal.group(), 8) & 0xFF]))
+                    pos = octal.end()
+                else:
+                    pieces.append(_ESCAPES.get(following[0], following))
+                    pos = index + 2
+            segment = pos
+        elif char == 0x28:  # nested (
+            depth += 1
+            pos = index + 1
+        else:  # )
+            depth -= 1
+            if depth == 0:
+                pieces.append(data[segment:index])
+                return index + 1
+            pos = index + 1
+
+
+def _fonts_are_screenable(resources) -> bool:
+    """True when every font maps letter codes to the same ASCII letters"""
+    fonts = resources.get('/Font')
+    if fonts is None:
+        return True
+    for font in fonts.get_object().values():
+        font = font.get_object()
+        if font.get('/Subtype') not in ('/Type1', '/TrueType', '/MMType1'):
+            return False
+        if '/ToUnicode' in font:
+            return False
+        encoding = font.get('/Encoding')
+        if encoding is not None and not isinstance(encoding.get_object(), str):
+            # Encoding dictionary (/Differences can remap letters)
+            return False
+    return True
+
+
+def _has_form_xobjects(resources) -> bool:
+    """True when the page draws form XObjects, which may contain text"""
+    xobjects = resources.get('/XObject')
+    if xobjects is None:
+        return False
+    for xobject in xobjects.get_object().values():
+        if xobject.get_object().get('/Subtype') == '/Form':
+            return True
+    return False
+
+
+def page_has_total_text(page) -> Optional[bool]:
+    """True if the page's content stream certainly contains TOTAL text, False if it
+    certainly does not and None if the screen cannot tell"""
+    try:
+        resources = page.get('/Resources')
+        resources = resources.get_object() if resources is not None else {}
+        if not _fonts_are_screenable(resources) or _has_form_xobjects(resources):
+            return None
+
+        contents = page.get_contents()
+        if contents is None:
+            return False
+        contents = contents.get_object()
+        if isinstance(contents, list):
+            data = b'\n'.join(part.get_object().get_data() for part in contents)
+        else:
+            data = contents.get_data()
+
+        text = content_stream_text(data)
+        if text is None:
+            return None
+        # Layout extraction only adds whitespace between runs, so compare without it
+        return b'TOTAL' in _WHITESPACE.sub(b'', text).upper()
+    except Exception:
+        # Let the full extraction path deal with anything unusual
+        return None
+
+
+def page_may_have_totals(page) -> bool:
+    """Fast first stage: False only if the page certainly contains no TOTAL text"""
+    return page_has_total_text(page) is not False
@@ -0,0 +1,336 @@
+"""Interchangeable PDF text-extraction backends
+
+Each backend wraps one library behind the same small interface: open() a
+binary stream and get a document with page_count, pages() and page_text().
+pages(start, stop) walks a range of pages only, so several processes can each
+open the same PDF and extract a part of it.
+Backends whose page objects are PyPDF2-style dictionaries also support the
+content-stream pre-screen (page_prescreen.py).
+
+    pypdfium2    bindings to the PDFium C++ library, fastest
+    PyPDF2       pure Python, the original extractor (requirements.txt)
+    pypdf        pure Python successor of PyPDF2; its text extraction does more
+                 layout work and is several times slower on ledger PDFs
+    pdfminer     pdfminer.six, pure Python layout analysis, slowest
+
+select_backend('auto') returns the fastest installed backend in the order of
+FASTEST_FIRST. The line layout differs between libraries, so
+compare_backends() runs two backends over the same archive and reports their
+speed and every difference in the parsed totals.
+
+Usage:
+    python pdf_backends.py --list
+    python pdf_backends.py --compare ARCHIVE.zip [--backends PyPDF2 pypdf]
+"""
+import argparse
+import importlib.util
+import io
+import json
+import sys
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, IO, Iterator, List, Optional
+
+
+class PdfDocument(ABC):
+    """An open PDF whose pages can be walked once in order"""
+
+    # True when pages are PyPDF2-style dictionaries the pre-screen can read
+    supports_prescreen = False
+
+    @property
+    @abstractmethod
+    def page_count(self) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def pages(self, start: int = 0, stop: Optional[int] = None) -> Iterator:
+        """Yield a handle for each page in order, from page start up to (not including) stop"""
+        raise NotImplementedError
+
+    def _page_range(self, start: int, stop: Optional[int]) -> range:
+        """0-based page numbers from start up to stop (default: the last page)"""
+        return range(start, self.page_count if stop is None else min(stop, self.page_count))
+
+    @abstractmethod
+    def page(self, index: int):
+        """Handle of one page (0-based), for reading a few pages out of order"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def page_text(self, page) -> str:
+        """Text of one page, one line per text line"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class ExtractionBackend(ABC):
+    """One PDF library; module is the importable name that must be installed"""
+
+    name = ''
+    module = ''
+    # False when the library cannot read from an mmap object
+    accepts_mmap = True
+
+    def available(self) -> bool:
+        return importlib.util.find_spec(self.module) is not None
+
+    @contextmanager
+    def open(self, stream: IO[bytes]) -> Iterator[PdfDocument]:
+        document = self._open(stream)
+        try:
+            yield document
+        finally:
+            document.close()
+
+    @abstractmethod
+    def _open(self, stream: IO[bytes]) -> PdfDocument:
+        raise NotImplementedError
+
+
+class _PdfReaderDocument(PdfDocument):
+    """PyPDF2 / pypdf PdfReader"""
+
+    supports_prescreen = True
+
+    def __init__(self, reader):
+        self.reader = reader
+
+    @property
+    def page_count(self) -> int:
+        return len(self.reader.pages)
+
+    def pages(self, start: int = 0, stop: Optional[int] = None) -> Iterator:
+        """Yield each page and drop its parsed content stream from the reader afterwards"""
+        for page_num in self._page_range(start, stop):
+            page = self.reader.pages[page_num]
+            yield page
+
+            # The reader keeps every resolved object (including the decoded content
+            # stream) for its whole life; content streams are not shared between
+            # pages, so they can be parsed again if ever needed
+            contents = page.raw_get('/Contents') if '/Contents' in page else None
+            references = [contents]
+            if contents is not None and isinstance(contents.get_object(), list):
+                # Array of content streams (possibly itself an indirect object)
+                references.extend(contents.get_object())
+            for reference in references:
+                if hasattr(reference, 'idnum'):
+                    self.reader.resolved_objects.pop((reference.generation, reference.idnum), None)
+
+    def page(self, index: int):
+        return self.reader.pages[index]
+
+    def page_text(self, page) -> str:
+        return page.extract_text()
+
+
+class PyPDF2Backend(ExtractionBackend):
+    name = 'PyPDF2'
+    module = 'PyPDF2'
+
+    def _open(self, stream: IO[bytes]) -> PdfDocument:
+        import PyPDF2
+        return _PdfReaderDocument(PyPDF2.PdfReader(stream))
+
+
+class PypdfBackend(ExtractionBackend):
+    name = 'pypdf'
+    module = 'pypdf'
+
+    def _open(self, stream: IO[bytes]) -> PdfDocument:
+        import pypdf
+        return _PdfReaderDocument(pypdf.PdfReader(stream))
+
+
+class _PdfminerDocument(PdfDocument):
+    """pdfminer.six document with one text converter reused for every page"""
+
+    def __init__(self, stream: IO[bytes]):
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfdocument import PDFDocument
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+        from pdfminer.pdfpage import PDFPage
+        from pdfminer.pdfparser import PDFParser
+
+        self._output = io.StringIO()
+        resources = PDFResourceManager()
+        self._device = TextConverter(resources, self._output, laparams=LAParams())
+        self._interpreter = PDFPageInterpreter(resources, self._device)
+        # Page objects only reference their content until they are interpreted
+        self._pages = list(PDFPage.create_pages(PDFDocument(PDFParser(stream))))
+
+    @property
+    def page_count(self) -> int:
+        return len(self._pages)
+
+    def pages(self, start: int = 0, stop: Optional[int] = None) -> Iterator:
+        for page_num in self._page_range(start, stop):
+            yield self._pages[page_num]
+            self._pages[page_num] = None
+
+    def page(self, index: int):
+        return self._pages[index]
+
+    def page_text(self, page) -> str:
+        self._output.seek(0)
+        self._output.truncate()
+        self._interpreter.process_page(page)
+        # The converter ends every page with a form feed
+        return self._output.getvalue().rstrip('\f')
+
+    def close(self):
+        self._device.close()
+
+
+class PdfminerBackend(ExtractionBackend):
+    name = 'pdfminer'
+    module = 'pdfminer'
+
+    def _open(self, stream: IO[bytes]) -> PdfDocument:
+        return _PdfminerDocument(stream)
+
+
+class _PdfiumDocument(PdfDocument):
+    """pypdfium2 document; every page and text page is closed after use"""
+
+    def __init__(self, stream: IO[bytes]):
+        import pypdfium2
+        self._pdf = pypdfium2.PdfDocument(stream)
+
+    @property
+    def page_count(self) -> int:
+        return len(self._pdf)
+
+    def pages(self, start: int = 0, stop: Optional[int] = None) -> Iterator:
+        for page_num in self._page_range(start, stop):
+            page = self._pdf[page_num]
+            try:
+                yield page
+            finally:
+                page.close()
+
+    def page(self, index: int):
+        # Closed with the document
+        return self._pdf[index]
+
+    def page_text(self, page) -> str:
+        text_page = page.get_textpage()
+        try:
+            text = text_page.get_text_range()
+        finally:
+            text_page.close()
+        return text.replace('\r\n', '\n').replace('\r', '\n')
+
+    def close(self):
+        self._pdf.close()
+
+
+class Pypdfium2Backend(ExtractionBackend):
+    name = 'pypdfium2'
+    module = 'pypdfium2'
+    # PDFium reads through its own buffered file callbacks
+    accepts_mmap = False
+
+    def _open(self, stream: IO[bytes]) -> PdfDocument:
+        return _PdfiumDocument(stream)
+
+
+BACKENDS = {backend.name: backend for backend in
+            (PyPDF2Backend(), PypdfBackend(), PdfminerBackend(), Pypdfium2Backend())}
+# Measured text extraction speed on ledger-style PDFs (benchmarks/synthetic_archive.py)
+FASTEST_FIRST = ['pypdfium2', 'PyPDF2', 'pypdf', 'pdfminer']
+
+
+def available_backends() -> List[str]:
+    """Names of the installed backends, fastest first"""
+    return [name for name in FASTEST_FIRST if BACKENDS[name].available()]
+
+
+def select_backend(name: str = 'auto') -> ExtractionBackend:
+    """Return the named backend, or the fastest installed one for 'auto'"""
+    if name == 'auto':
+        installed = available_backends()
+        if not installed:
+            raise RuntimeError("No PDF library is installed (install PyPDF2)")
+        return BACKENDS[installed[0]]
+
+    backend = BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Unknown PDF backend {name!r} (choose from {', '.join(BACKENDS)} or auto)")
+    if not backend.available():
+        raise RuntimeError(f"PDF backend {name!r} is not installed")
+    return backend
+
+
+def compare_backends(zip_path: str, first: str, second: str, **settings) -> Dict:
+    """Process an archive with two backends and report speed and differences in the totals"""
+    from file_processor import FileProcessor, _page_changes
+
+    runs = {}
+    for name in (first, second):
+        processor = FileProcessor(backend=name, **settings)
+        try:
+            processor.extract_zip(zip_path)
+            start = time.perf_counter()
+            processor.process_all_files()
+            seconds = time.perf_counter() - start
+            runs[name] = {
+                'seconds': seconds,
+                'pages': sum(f['total_pages'] for f in processor.file_data
+                             if isinstance(f['total_pages'], int)),
+                'results': {f['filename']: f for f in processor.file_data}
+            }
+        finally:
+            processor.cleanup()
+
+    differences = []
+    first_results, second_results = runs[first]['results'], runs[second]['results']
+    for filename in sorted(set(first_results) | set(second_results)):
+        old = first_results.get(filename, {})
+        new = second_results.get(filename, {})
+        pages = _page_changes(old, new)
+        if old.get('error') != new.get('error'):
+            pages.insert(0, {'page': None, 'field': 'Error',
+                             'previous': old.get('error'), 'current': new.get('error')})
+        if pages:
+            differences.append({'filename': filename, 'pages': pages})
+
+    return {
+        'archive': zip_path,
+        'backends': {name: {'seconds': run['seconds'], 'pages': run['pages'],
+                            'pages_per_second': run['pages'] / run['seconds'] if run['seconds'] else None}
+                     for name, run in runs.items()},
+        'differences': differences
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="List or compare PDF text-extraction backends")
+    parser.add_argument('--list', action='store_true', help="List the installed backends, fastest first")
+    parser.add_argument('--compare', metavar='ZIP', help="Process ZIP with two backends and compare")
+    parser.add_argument('--backends', nargs=2, metavar=('FIRST', 'SECOND'),
+                        help="Backends to compare (default: the two fastest installed)")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        names = args.backends or available_backends()[:2]
+        if len(names) < 2:
+            print("Comparing needs two installed backends", file=sys.stderr)
+            return 1
+        report = compare_backends(args.compare, names[0], names[1], in_archive=True)
+        print(json.dumps(report, indent=2))
+        return 1 if report['differences'] else 0
+
+    for name in FASTEST_FIRST:
+        print(f"{name:10} {'installed' if BACKENDS[name].available() else 'not installed'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
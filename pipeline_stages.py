@@ -0,0 +1,65 @@
+"""Reading ahead of the parse stage for FileProcessor(pipeline=True)
+
+The pipelined mode overlaps three stages of an archive:
+
+    read     a reader thread decompresses the next ZIP members (read_ahead)
+    parse    worker processes extract the totals, at most workers +
+             pipeline_depth files ahead of the oldest unfinished one
+    write    the calling process releases results in filename order and
+             writes report rows and exports while the workers parse
+
+Every stage is bounded: the reader blocks once `depth` members wait to be
+submitted and no more files are submitted while the window is full
+(backpressure), so memory stays flat however large the archive is. Parsing
+runs in separate processes because it is pure Python: threads would only take
+turns holding the GIL with report writing.
+"""
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+# How often a blocked reader checks whether the consumer stopped
+POLL_SECONDS = 0.1
+
+
+def read_ahead(items: Iterable[Any], read: Callable[[Any], Any],
+               depth: int = 2) -> Iterator[Tuple[Any, Any, Optional[Exception]]]:
+    """Yield (item, read(item), None) or (item, None, error) in order while a thread reads ahead
+
+    At most depth values are read before they are consumed. Closing the
+    generator stops the thread.
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=max(1, depth))
+    stopped = threading.Event()
+    done = object()
+
+    def put(entry) -> bool:
+        while not stopped.is_set():
+            try:
+                buffer.put(entry, timeout=POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def reader():
+        for item in items:
+            try:
+                entry = (item, read(item), None)
+            except Exception as e:
+                entry = (item, None, e)
+            if not put(entry):
+                return
+        put(done)
+
+    thread = threading.Thread(target=reader, name='read-ahead', daemon=True)
+    thread.start()
+    try:
+        while True:
+            entry = buffer.get()
+            if entry is done:
+                return
+            yield entry
+    finally:
+        stopped.set()
+        thread.join()
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+from typing import Dict, IO, List, Optional
+
+
+def hash_stream(stream: IO[bytes], chunk_size: int = 1024 * 1024) -> str:
+    """Return the SHA-256 hex digest of a binary stream and rewind it"""
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def _key_prefix(backend: str, mode: str = '') -> str:
+    """Key prefix separating cache entries of different PDF backends and pre-screen modes"""
+    prefix = '' if backend == 'PyPDF2' else f"{backend}:"
+    return prefix + (f"{mode}:" if mode else '')
+
+
+class ResultCache:
+    """Content-addressed SQLite cache of PDF extraction results and page text
+
+    Entries are keyed by the SHA-256 of the PDF bytes:
+      - level 1: extract_totals_from_pdf result for a given parser version
+      - level 2: raw per-page text, so a parser change can reparse without
+        running PDF text extraction again
+    Entries made with another PDF backend than PyPDF2 carry the backend name in
+    their key (PyPDF2 entries keep the original keys), and entries made with the
+    page pre-screen carry its mode ('prescreen' or 'verify'), since skipped pages
+    have no text and totals. The least recently used entries are evicted once
+    the stored size exceeds max_bytes.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        # Counters for this instance (level 1 results and level 2 page text)
+        self.hits = 0
+        self.misses = 0
+        self.page_text_hits = 0
+        self.page_text_misses = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " data BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)"
+        )
+        self._conn.commit()
+
+    def get_result(self, digest: str, parser_version: int, backend: str = 'PyPDF2',
+                   mode: str = '') -> Optional[Dict]:
+        """Look up a cached extract_totals_from_pdf result"""
+        data = self._get(f"result:{parser_version}:{_key_prefix(backend, mode)}{digest}")
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(data)
+
+    def has_result(self, digest: str, parser_version: int, backend: str = 'PyPDF2', mode: str = '') -> bool:
+        """Whether a result is cached, without counting a hit or miss"""
+        key = f"result:{parser_version}:{_key_prefix(backend, mode)}{digest}"
+        return self._conn.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+
+    def put_result(self, digest: str, parser_version: int, result: Dict, backend: str = 'PyPDF2',
+                   mode: str = ''):
+        """Store an extract_totals_from_pdf result"""
+        self._put(f"result:{parser_version}:{_key_prefix(backend, mode)}{digest}",
+                  json.dumps(result).encode('utf-8'))
+
+    def get_page_text(self, digest: str, backend: str = 'PyPDF2', mode: str = '') -> Optional[List[str]]:
+        """Look up the cached raw text of every page"""
+        data = self._get(f"text:{_key_prefix(backend, mode)}{digest}")
+        if data is None:
+            self.page_text_misses += 1
+            return None
+        self.page_text_hits += 1
+        return json.loads(data)
+
+    def put_page_text(self, digest: str, page_texts: List[str], backend: str = 'PyPDF2', mode: str = ''):
+        """Store the raw text of every page"""
+        self._put(f"text:{_key_prefix(backend, mode)}{digest}", json.dumps(page_texts).encode('utf-8'))
+
+    def counters(self) -> Dict[str, int]:
+        """Return hit/miss counters for this instance"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'page_text_hits': self.page_text_hits,
+            'page_text_misses': self.page_text_misses
+        }
+
+    def reset_counters(self):
+        """Zero the hit/miss counters"""
+        self.hits = 0
+        self.misses = 0
+        self.page_text_hits = 0
+        self.page_text_misses = 0
+
+    def add_counters(self, counters: Dict[str, int]):
+        """Add counters collected by another instance (e.g. a worker process)"""
+        self.hits += counters.get('hits', 0)
+        self.misses += counters.get('misses', 0)
+        self.page_text_hits += counters.get('page_text_hits', 0)
+        self.page_text_misses += counters.get('page_text_misses', 0)
+
+    def size(self) -> int:
+        """Total stored size in bytes"""
+        row = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return row[0]
+
+    def clear(self):
+        """Remove all entries"""
+        self._conn.execute("DELETE FROM entries")
+        self._conn.commit()
+
+    def close(self):
+        """Close the database connection"""
+        self._conn.close()
+
+    def _get(self, key: str) -> Optional[bytes]:
+        row = self._conn.execute("SELECT data FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        return zlib.decompress(row[0])
+
+    def _put(self, key: str, data: bytes):
+        blob = zlib.compress(data)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO entries (key, data, size, last_access) VALUES (?, ?, ?, ?)",
+            (key, blob, len(blob), time.time())
+        )
+        self._evict()
+        self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        excess = self.size() - self.max_bytes
+        if excess <= 0:
+            return
+
+        keys = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+            keys.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", keys)
@@ -0,0 +1,325 @@
+"""SQLite store of audit results for queries across many runs and societies
+
+Each FileProcessor run can be recorded (FileProcessor.store_results, batch and
+watch mode --results-db, the GUI by default) in five tables:
+
+    societies     society number and name
+    runs          one row per processed archive: society, run date (ISO local
+                  time), ZIP and report name, file and mismatch counts
+    files         one row per PDF: schedule/annexure type and number, pages,
+                  error, and the file's opening balance (first total row) and
+                  closing balance (last Grand Total row, else last total row)
+    page_totals   one row per total row with numeric amounts
+    missing       the schedules and annexures missing from a run
+
+Indexes on society number, run date and document type/number keep lookups
+such as these to a few milliseconds over thousands of audits:
+
+    python results_db.py results.sqlite3 missing "Annexure 7" --year 2026
+    python results_db.py results.sqlite3 balances "Schedule 5" --society 123 --since 2023-01-01
+    python results_db.py results.sqlite3 totals "Schedule 5" --society 123 --year 2025
+    python results_db.py results.sqlite3 runs --society 123
+
+Dates are compared as ISO strings: --since is inclusive, --until exclusive, and
+a prefix such as 2026 or 2026-03 works for both.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from file_processor import classify_filename
+from totals_store import FIELDS, parse_amount
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS societies (
+    id INTEGER PRIMARY KEY,
+    society_number TEXT NOT NULL,
+    society_name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS societies_number ON societies (society_number);
+
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    society_id INTEGER NOT NULL REFERENCES societies (id),
+    run_date TEXT NOT NULL,
+    zip_name TEXT NOT NULL,
+    report TEXT NOT NULL,
+    files INTEGER NOT NULL,
+    mismatches INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_society_date ON runs (society_id, run_date);
+CREATE INDEX IF NOT EXISTS runs_date ON runs (run_date);
+
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    filename TEXT NOT NULL,
+    document_type TEXT,
+    document_number INTEGER,
+    total_pages INTEGER,
+    pages_with_totals INTEGER NOT NULL,
+    opening_balance REAL,
+    closing_balance REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS files_document ON files (document_type, document_number);
+CREATE INDEX IF NOT EXISTS files_run ON files (run_id);
+
+CREATE TABLE IF NOT EXISTS page_totals (
+    file_id INTEGER NOT NULL REFERENCES files (id),
+    page INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    opening_balance REAL,
+    debit REAL,
+    credit REAL,
+    closing_balance REAL
+);
+CREATE INDEX IF NOT EXISTS page_totals_file ON page_totals (file_id);
+
+CREATE TABLE IF NOT EXISTS missing (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    document_type TEXT NOT NULL,
+    document_number INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS missing_document ON missing (document_type, document_number);
+CREATE INDEX IF NOT EXISTS missing_run ON missing (run_id);
+"""
+
+
+def parse_document(document: str) -> Tuple[str, int]:
+    """('schedule', 5) for 'Schedule 5', 'Sch-5', ...; ValueError if it names no schedule or annexure"""
+    classification = classify_filename(document)
+    if classification.kind is None or classification.number is None:
+        raise ValueError(f"Not a schedule or annexure: {document!r}")
+    return classification.kind, classification.number
+
+
+def _file_balances(page_totals: List[Dict]) -> Tuple[Optional[float], Optional[float]]:
+    """Opening balance of the first total row and closing balance of the last Grand Total
+    (or, without one, the last total row)"""
+    if not page_totals:
+        return None, None
+    grand_totals = [page_total for page_total in page_totals if page_total.get('label') == 'Grand Total']
+    last = grand_totals[-1] if grand_totals else page_totals[-1]
+    return parse_amount(page_totals[0].get('opening_balance')), parse_amount(last.get('closing_balance'))
+
+
+def _date_range(since: Optional[str], until: Optional[str], column: str = 'r.run_date') -> Tuple[str, List]:
+    """SQL condition and parameters for since <= column < until"""
+    conditions, params = [], []
+    if since:
+        conditions.append(f"{column} >= ?")
+        params.append(since)
+    if until:
+        conditions.append(f"{column} < ?")
+        params.append(until)
+    return ' AND '.join(conditions) or '1', params
+
+
+class ResultsDatabase:
+    """Recorded FileProcessor runs in an indexed SQLite database"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Parallel batch jobs record their runs into the same file
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.commit()
+
+    def close(self):
+        """Close the database connection"""
+        self._conn.close()
+
+    def record_run(self, file_data: Iterable[Dict], missing_files: Iterable[str], society_name: str = "",
+                   society_number: str = "", zip_name: str = "", report: str = "", mismatches: int = 0,
+                   run_date: Optional[str] = None) -> int:
+        """Store one run (FileProcessor.file_data and missing_files) and return its id"""
+        file_data = list(file_data)
+        run_date = run_date or datetime.now().isoformat(timespec='seconds')
+        with self._conn:
+            society_id = self._society_id(society_name, society_number)
+            run_id = self._conn.execute(
+                "INSERT INTO runs (society_id, run_date, zip_name, report, files, mismatches)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (society_id, run_date, zip_name, report, len(file_data), mismatches)
+            ).lastrowid
+
+            for file_info in file_data:
+                classification = classify_filename(file_info['filename'])
+                page_totals = file_info.get('page_totals', [])
+                opening, closing = _file_balances(page_totals)
+                total_pages = file_info['total_pages'] if isinstance(file_info['total_pages'], int) else None
+                file_id = self._conn.execute(
+                    "INSERT INTO files (run_id, filename, document_type, document_number, total_pages,"
+                    " pages_with_totals, opening_balance, closing_balance, error)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (run_id, file_info['filename'], classification.kind, classification.number, total_pages,
+                     len({page_total['page'] for page_total in page_totals}), opening, closing,
+                     file_info.get('error'))
+                ).lastrowid
+                self._conn.executemany(
+                    "INSERT INTO page_totals (file_id, page, label, opening_balance, debit, credit,"
+                    " closing_balance) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(file_id, page_total['page'], page_total.get('label', 'Total'),
+                      *(parse_amount(page_total.get(field)) for field in FIELDS))
+                     for page_total in page_totals]
+                )
+
+            self._conn.executemany(
+                "INSERT INTO missing (run_id, document_type, document_number) VALUES (?, ?, ?)",
+                [(run_id, *parse_document(name)) for name in missing_files]
+            )
+        return run_id
+
+    def _society_id(self, society_name: str, society_number: str) -> int:
+        """Id of the society with this number (or, without a number, this name), added if new"""
+        if society_number:
+            row = self._conn.execute("SELECT id, society_name FROM societies WHERE society_number = ?",
+                                     (society_number,)).fetchone()
+        else:
+            row = self._conn.execute("SELECT id, society_name FROM societies"
+                                     " WHERE society_number = '' AND society_name = ?",
+                                     (society_name,)).fetchone()
+        if row is None:
+            return self._conn.execute("INSERT INTO societies (society_number, society_name) VALUES (?, ?)",
+                                      (society_number, society_name)).lastrowid
+        if society_name and row['society_name'] != society_name:
+            # Keep the name of the latest run
+            self._conn.execute("UPDATE societies SET society_name = ? WHERE id = ?", (society_name, row['id']))
+        return row['id']
+
+    def runs(self, society_number: Optional[str] = None, since: Optional[str] = None,
+             until: Optional[str] = None) -> List[Dict]:
+        """Recorded runs, newest first"""
+        condition, params = _date_range(since, until)
+        if society_number is not None:
+            condition += " AND s.society_number = ?"
+            params.append(society_number)
+        return self._query(
+            "SELECT r.id AS run_id, r.run_date, s.society_number, s.society_name, r.zip_name, r.report,"
+            " r.files, r.mismatches,"
+            " (SELECT COUNT(*) FROM missing m WHERE m.run_id = r.id) AS missing"
+            " FROM runs r JOIN societies s ON s.id = r.society_id"
+            f" WHERE {condition} ORDER BY r.run_date DESC, r.id DESC", params)
+
+    def missing(self, document: str, since: Optional[str] = None, until: Optional[str] = None) -> List[Dict]:
+        """Societies whose latest run in the period lacks the document (e.g. 'Annexure 7')"""
+        kind, number = parse_document(document)
+        condition, params = _date_range(since, until, 'latest.run_date')
+        return self._query(
+            "SELECT s.society_number, s.society_name, r.run_date, r.zip_name, r.report"
+            " FROM runs r JOIN societies s ON s.id = r.society_id"
+            " WHERE r.id = (SELECT latest.id FROM runs latest WHERE latest.society_id = r.society_id"
+            f"  AND {condition} ORDER BY latest.run_date DESC, latest.id DESC LIMIT 1)"
+            " AND EXISTS (SELECT 1 FROM missing m WHERE m.run_id = r.id"
+            "  AND m.document_type = ? AND m.document_number = ?)"
+            " ORDER BY s.society_number, s.society_name", [*params, kind, number])
+
+    def balances(self, document: str, society_number: Optional[str] = None, since: Optional[str] = None,
+                 until: Optional[str] = None) -> List[Dict]:
+        """Opening and closing balance of the document in every run, oldest first"""
+        kind, number = parse_document(document)
+        condition, params = _date_range(since, until)
+        if society_number is not None:
+            condition += " AND s.society_number = ?"
+            params.append(society_number)
+        return self._query(
+            "SELECT r.run_date, s.society_number, s.society_name, f.filename, f.total_pages,"
+            " f.pages_with_totals, f.opening_balance, f.closing_balance, f.error"
+            " FROM files f JOIN runs r ON r.id = f.run_id JOIN societies s ON s.id = r.society_id"
+            f" WHERE f.document_type = ? AND f.document_number = ? AND {condition}"
+            " ORDER BY s.society_number, r.run_date, f.filename", [kind, number, *params])
+
+    def page_totals(self, document: str, society_number: Optional[str] = None, since: Optional[str] = None,
+                    until: Optional[str] = None) -> List[Dict]:
+        """Every total row of the document, per run in date order"""
+        kind, number = parse_document(document)
+        condition, params = _date_range(since, until)
+        if society_number is not None:
+            condition += " AND s.society_number = ?"
+            params.append(society_number)
+        return self._query(
+            "SELECT r.run_date, s.society_number, f.filename, p.page, p.label, p.opening_balance, p.debit,"
+            " p.credit, p.closing_balance"
+            " FROM page_totals p JOIN files f ON f.id = p.file_id JOIN runs r ON r.id = f.run_id"
+            " JOIN societies s ON s.id = r.society_id"
+            f" WHERE f.document_type = ? AND f.document_number = ? AND {condition}"
+            " ORDER BY s.society_number, r.run_date, f.filename, p.rowid", [kind, number, *params])
+
+    def _query(self, sql: str, params: List) -> List[Dict]:
+        return [dict(row) for row in self._conn.execute(sql, params)]
+
+
+def _print_table(rows: List[Dict]):
+    """Print rows as aligned columns"""
+    if not rows:
+        print("(no results)")
+        return
+    columns = list(rows[0])
+    cells = [["" if row[column] is None else str(row[column]) for column in columns] for row in rows]
+    widths = [max(len(column), *(len(line[index]) for line in cells)) for index, column in enumerate(columns)]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)).rstrip())
+    for line in cells:
+        print("  ".join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Query audit results recorded in a results database")
+    parser.add_argument('database', help="SQLite results database (e.g. from audit_batch.py --results-db)")
+    parser.add_argument('query', choices=['runs', 'missing', 'balances', 'totals'],
+                        help="runs: recorded runs; missing: societies lacking DOCUMENT in their latest run; "
+                             "balances: opening/closing balance of DOCUMENT per run; totals: its total rows")
+    parser.add_argument('document', nargs='?', help="Schedule or annexure, e.g. \"Schedule 5\" or \"Annexure 7\"")
+    parser.add_argument('--society', help="Only this society number")
+    parser.add_argument('--since', help="Runs on or after this date (ISO, e.g. 2023-01-01)")
+    parser.add_argument('--until', help="Runs before this date (ISO)")
+    parser.add_argument('--year', help="Runs in this year (sets --since and --until)")
+    parser.add_argument('--json', action='store_true', help="Print JSON instead of a table")
+    args = parser.parse_args(argv)
+
+    if args.query != 'runs' and not args.document:
+        parser.error(f"{args.query} needs a DOCUMENT")
+    if not os.path.exists(args.database):
+        print(f"No results database at {args.database}", file=sys.stderr)
+        return 1
+    since, until = args.since, args.until
+    if args.year:
+        since, until = args.year, str(int(args.year) + 1)
+
+    database = ResultsDatabase(args.database)
+    try:
+        if args.query == 'runs':
+            rows = database.runs(args.society, since, until)
+        elif args.query == 'missing':
+            rows = database.missing(args.document, since, until)
+        elif args.query == 'balances':
+            rows = database.balances(args.document, args.society, since, until)
+        else:
+            rows = database.page_totals(args.document, args.society, since, until)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        database.close()
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        _print_table(rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
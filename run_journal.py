@@ -0,0 +1,105 @@
+"""Checkpoint journal of a run, so an interrupted run can resume where it stopped
+
+FileProcessor(journal_path=...) appends one JSON line per finished file, and
+per finished page range of a sharded file (see shard_pages), and forces it to
+disk before going on. After a crash, power loss or a killed process every line
+is complete except possibly a torn last one, which is dropped when the journal
+is read. The first line records what the results depend on:
+
+    - every archive member's name, size and CRC-32 (central directory)
+    - PARSER_VERSION, the extraction backend and the settings that can change
+      a result (pre-screen, page locator)
+
+A run of the same archive with the same settings takes the journaled results
+instead of extracting those files (or page ranges) again; they are released
+in the usual report order, so the report is the same as that of an
+uninterrupted run. A journal written for anything else is started afresh.
+Failed files are not journaled and are tried again.
+
+    {"type": "run", "key": {...}}
+    {"type": "range", "member": "Schedule 9.pdf", "pages": [0, 750], "result": {...}}
+    {"type": "file", "member": "Schedule 9.pdf", "result": {...}}
+"""
+import json
+import os
+from typing import Dict, List, Tuple
+
+
+class RunJournal:
+    """Append-only JSON Lines journal of finished files and page ranges"""
+
+    def __init__(self, path: str, key: Dict):
+        self.path = path
+        self.key = key
+        # Results of the interrupted run: member -> result, member -> {(start, stop): result}
+        self.files: Dict[str, Dict] = {}
+        self.ranges: Dict[str, Dict[Tuple[int, int], Dict]] = {}
+
+    def open(self) -> bool:
+        """Load a journal of the same archive and settings, or start a new one
+
+        Returns True when there are results to resume from. The journal is
+        rewritten either way, so a torn last line is not followed by new entries.
+        """
+        entries = self._load()
+        for entry in entries:
+            if entry['type'] == 'file':
+                self.files[entry['member']] = entry['result']
+            else:
+                self.ranges.setdefault(entry['member'], {})[tuple(entry['pages'])] = entry['result']
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            for entry in [{'type': 'run', 'key': self.key}, *entries]:
+                file.write(json.dumps(entry) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+        return bool(entries)
+
+    def _load(self) -> List[Dict]:
+        """Complete entries of an existing journal for the same key"""
+        if not os.path.exists(self.path):
+            return []
+        entries = []
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                for number, line in enumerate(file):
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Torn write of the last entry
+                        break
+                    if number == 0:
+                        if entry.get('type') != 'run' or entry.get('key') != self.key:
+                            return []
+                        continue
+                    entries.append(entry)
+        except OSError:
+            return []
+        return entries
+
+    def record_file(self, member: str, result: Dict):
+        """Checkpoint the result of a whole file"""
+        self._append({'type': 'file', 'member': member, 'result': result})
+
+    def record_range(self, member: str, pages: Tuple[int, int], result: Dict):
+        """Checkpoint the result of one page range of a sharded file"""
+        self._append({'type': 'range', 'member': member, 'pages': list(pages), 'result': result})
+
+    def _append(self, entry: Dict):
+        # Opened per entry: nothing is left open when the run stops half-way
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(entry) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+
+    def remove(self):
+        """Delete the journal once the run's report is complete"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
@@ -0,0 +1,180 @@
+"""Machine-readable exports of the extracted totals (CSV, JSON Lines, Parquet)
+
+Each export holds one flat record per total row, plus one record per
+processed file without totals, per file that could not be read and per missing
+schedule or annexure, so a warehouse can load it without reading the formatted
+Excel report:
+
+    society_name, society_number
+    record_type      'page', 'no_totals', 'error' or 'missing'
+    filename         PDF file name ('Schedule 5' for missing files)
+    document_type    'schedule', 'annexure' or empty
+    document_number  schedule or annexure number
+    total_pages      pages in the PDF
+    page             page number (page records only)
+    label            'Total' or 'Grand Total' (page records only)
+    opening_balance, debit, credit, closing_balance   numbers, empty when not found
+    error            why the file could not be read
+
+Records are written as each file result arrives (FileProcessor.start_exports),
+so exporting adds little to a run. Parquet needs pyarrow; rows are buffered and
+written in row groups of PARQUET_ROW_GROUP rows.
+"""
+import csv
+import importlib.util
+import json
+import os
+from typing import Dict, Iterator, List, Optional
+
+from file_processor import classify_filename
+from totals_store import FIELDS, parse_amount
+
+EXPORT_FIELDS = ['society_name', 'society_number', 'record_type', 'filename', 'document_type',
+                 'document_number', 'total_pages', 'page', 'label', *FIELDS, 'error']
+FORMATS = ['csv', 'jsonl', 'parquet']
+PARQUET_ROW_GROUP = 50000
+
+
+def available_formats() -> List[str]:
+    """Export formats that can be written here (Parquet only with pyarrow installed)"""
+    return [name for name in FORMATS if name != 'parquet' or importlib.util.find_spec('pyarrow')]
+
+
+def _base_record(society_name: str, society_number: str, record_type: str, filename: str) -> Dict:
+    classification = classify_filename(filename)
+    record = dict.fromkeys(EXPORT_FIELDS)
+    record.update(society_name=society_name, society_number=society_number, record_type=record_type,
+                  filename=filename, document_type=classification.kind,
+                  document_number=classification.number)
+    return record
+
+
+def file_records(file_info: Dict, society_name: str = "", society_number: str = "") -> Iterator[Dict]:
+    """Export records of one FileProcessor.file_data entry"""
+    filename = file_info['filename']
+    total_pages = file_info['total_pages'] if isinstance(file_info['total_pages'], int) else None
+    if 'error' in file_info:
+        record = _base_record(society_name, society_number, 'error', filename)
+        record['error'] = file_info['error']
+        yield record
+        return
+
+    page_totals = file_info.get('page_totals', [])
+    if not page_totals:
+        record = _base_record(society_name, society_number, 'no_totals', filename)
+        record['total_pages'] = total_pages
+        yield record
+        return
+
+    base = _base_record(society_name, society_number, 'page', filename)
+    base['total_pages'] = total_pages
+    for page_total in page_totals:
+        record = dict(base, page=page_total['page'], label=page_total.get('label', 'Total'))
+        for field in FIELDS:
+            record[field] = parse_amount(page_total.get(field))
+        yield record
+
+
+def missing_records(missing_files: List[str], society_name: str = "",
+                    society_number: str = "") -> Iterator[Dict]:
+    """Export records of the missing schedules and annexures"""
+    for missing in missing_files:
+        yield _base_record(society_name, society_number, 'missing', missing)
+
+
+class _CsvWriter:
+    def __init__(self, path: str):
+        self._file = open(path, 'w', encoding='utf-8', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=EXPORT_FIELDS)
+        self._writer.writeheader()
+
+    def write(self, records: List[Dict]):
+        self._writer.writerows(records)
+
+    def close(self):
+        self._file.close()
+
+
+class _JsonLinesWriter:
+    def __init__(self, path: str):
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, records: List[Dict]):
+        self._file.writelines(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = {'document_number': pa.int32(), 'total_pages': pa.int32(), 'page': pa.int32(),
+                 **{field: pa.float64() for field in FIELDS}}
+        self._pa = pa
+        self._schema = pa.schema([(name, types.get(name, pa.string())) for name in EXPORT_FIELDS])
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self._rows: List[Dict] = []
+
+    def write(self, records: List[Dict]):
+        self._rows.extend(records)
+        if len(self._rows) >= PARQUET_ROW_GROUP:
+            self._flush()
+
+    def _flush(self):
+        if self._rows:
+            self._writer.write_table(self._pa.Table.from_pylist(self._rows, schema=self._schema))
+            self._rows = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+_WRITERS = {'csv': _CsvWriter, 'jsonl': _JsonLinesWriter, 'parquet': _ParquetWriter}
+
+
+class TotalsExport:
+    """Export files <base_path>.<format> that receive the records of each file result"""
+
+    def __init__(self, base_path: str, formats: Optional[List[str]] = None,
+                 society_name: str = "", society_number: str = ""):
+        formats = available_formats() if not formats else formats
+        for name in formats:
+            if name not in _WRITERS:
+                raise ValueError(f"Unknown export format {name!r} (choose from {', '.join(FORMATS)})")
+            if name not in available_formats():
+                raise RuntimeError(f"The {name} export needs pyarrow")
+
+        self.society_name = society_name
+        self.society_number = society_number
+        self.paths = [f"{base_path}.{name}" for name in formats]
+        directory = os.path.dirname(os.path.abspath(base_path))
+        os.makedirs(directory, exist_ok=True)
+        self._writers = []
+        try:
+            for name, path in zip(formats, self.paths):
+                self._writers.append(_WRITERS[name](path))
+        except Exception:
+            self.close()
+            raise
+
+    def _write(self, records: List[Dict]):
+        for writer in self._writers:
+            writer.write(records)
+
+    def write_missing(self, missing_files: List[str]):
+        """Write one record per missing schedule or annexure"""
+        self._write(list(missing_records(missing_files, self.society_name, self.society_number)))
+
+    def write_file(self, file_info: Dict):
+        """Write the records of one file result"""
+        self._write(list(file_records(file_info, self.society_name, self.society_number)))
+
+    def close(self):
+        """Flush and close every export file"""
+        for writer in self._writers:
+            writer.close()
+        self._writers = []
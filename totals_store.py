@@ -0,0 +1,232 @@
+"""Columnar store of per-page totals and balance reconciliation
+
+Page results in FileProcessor.file_data are dicts of strings ('N/A' when a value
+is missing). TotalsStore keeps the same totals as typed columns instead: one
+array per field plus a null mask, with a file id, page number and label per
+row. At about 47 bytes per total row it stays small for hundreds of thousands of
+pages, and reconcile() checks the whole audit a column at a time:
+
+  - balance:        opening + debit - credit = closing on each total row
+  - carry-forward:  each page's opening equals the previous page's closing
+  - schedule:       first opening + sum of debits - sum of credits = last closing
+
+A page can have several total rows (e.g. a Total and a Grand Total). The
+carry-forward and schedule checks use the first row of each page, the balance
+check covers every row.
+
+With NumPy installed (optional), the balance and carry-forward checks are
+vectorized over zero-copy views of the arrays; without it they are loops over
+the arrays. Rows are appended file by file, so the rows of a file are one
+slice, and the per-file sums add up slices of the columns.
+"""
+import importlib.util
+import operator
+from array import array
+from bisect import bisect_left
+from itertools import compress
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+FIELDS = ('opening_balance', 'debit', 'credit', 'closing_balance')
+# Row labels, stored as their index
+LABELS = ('Total', 'Grand Total')
+# Amounts are printed with two decimals; anything below half a paisa is rounding
+TOLERANCE = 0.005
+
+
+def parse_amount(value) -> Optional[float]:
+    """Convert a parsed total ('1234.50', 'N/A', ...) to a float, or None if it is missing"""
+    if value is None:
+        return None
+    try:
+        return float(str(value).replace(',', ''))
+    except ValueError:
+        return None
+
+
+def _numpy():
+    """The numpy module, or None when it is not installed"""
+    if importlib.util.find_spec('numpy') is None:
+        return None
+    import numpy
+    return numpy
+
+
+class TotalsStore:
+    """Per-page totals of all files of an audit held in typed columns"""
+
+    def __init__(self):
+        self.filenames: List[str] = []
+        self.file_ids = array('i')
+        self.pages = array('i')
+        self.labels = bytearray()
+        # 1 for the first total row of each page
+        self.page_first = bytearray()
+        # Missing values are stored as 0.0 with a 0 in the field's mask
+        self.values = {field: array('d') for field in FIELDS}
+        self.masks = {field: bytearray() for field in FIELDS}
+
+    @classmethod
+    def from_file_data(cls, file_data: Iterable[Dict]) -> 'TotalsStore':
+        """Build a store from FileProcessor.file_data"""
+        store = cls()
+        for file_info in file_data:
+            store.add_file(file_info)
+        return store
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def add_file(self, file_info: Dict):
+        """Append the page totals of one file result"""
+        self.add_pages(file_info['filename'], file_info.get('page_totals', []))
+
+    def add_pages(self, filename: str, page_totals: Iterable[Dict]):
+        """Append one file's page totals from any iterable, e.g. FileProcessor.iter_page_totals"""
+        file_id = len(self.filenames)
+        self.filenames.append(filename)
+        previous_page = None
+        for page_total in page_totals:
+            self.file_ids.append(file_id)
+            self.pages.append(page_total['page'])
+            self.labels.append(LABELS.index(page_total.get('label', 'Total')))
+            self.page_first.append(page_total['page'] != previous_page)
+            previous_page = page_total['page']
+            for field in FIELDS:
+                amount = parse_amount(page_total.get(field))
+                self.values[field].append(0.0 if amount is None else amount)
+                self.masks[field].append(0 if amount is None else 1)
+
+    def column(self, field: str) -> List[Optional[float]]:
+        """Values of one field with None where the value is missing"""
+        return [value if present else None
+                for value, present in zip(self.values[field], self.masks[field])]
+
+    def file_rows(self, file_id: int) -> Tuple[int, int]:
+        """Rows [start, stop) of one file (file ids only grow, so the column can be bisected)"""
+        return bisect_left(self.file_ids, file_id), bisect_left(self.file_ids, file_id + 1)
+
+    def file_sums(self) -> List[Dict]:
+        """Per-file page count, sums of the debit and credit columns and pages missing either
+
+        Only the first total row of each page is counted.
+        """
+        sums = []
+        for file_id, filename in enumerate(self.filenames):
+            start, stop = self.file_rows(file_id)
+            first = self.page_first[start:stop]
+            complete = map(operator.and_, self.masks['debit'][start:stop], self.masks['credit'][start:stop])
+            pages = first.count(1)
+            sums.append({
+                'filename': filename,
+                'pages': pages,
+                # Missing values are stored as 0.0, so they add nothing
+                'debit': sum(compress(self.values['debit'][start:stop], first)),
+                'credit': sum(compress(self.values['credit'][start:stop], first)),
+                'incomplete': pages - sum(compress(complete, first))
+            })
+        return sums
+
+    def reconcile(self, tolerance: float = TOLERANCE) -> List[Dict]:
+        """Run all checks and return the mismatches in file and page order"""
+        numpy = _numpy()
+        if numpy is not None:
+            mismatches = self._check_balances_numpy(numpy, tolerance) + \
+                self._check_carry_forward_numpy(numpy, tolerance)
+        else:
+            mismatches = self._check_balances(tolerance) + self._check_carry_forward(tolerance)
+        mismatches += self._check_schedules(tolerance)
+        # Schedule-level mismatches (no page) follow the file's page mismatches
+        mismatches.sort(key=lambda m: (m['file_id'], m['page'] is None, m['page'] or 0))
+        for mismatch in mismatches:
+            mismatch['filename'] = self.filenames[mismatch.pop('file_id')]
+        return mismatches
+
+    def _check_balances(self, tolerance: float) -> List[Dict]:
+        """opening + debit - credit = closing on rows where all four values are present"""
+        opening, debit, credit, closing = (self.values[field] for field in FIELDS)
+        complete = [all(flags) for flags in zip(*(self.masks[field] for field in FIELDS))]
+        mismatches = []
+        for row, (ok, o, d, c, cl) in enumerate(zip(complete, opening, debit, credit, closing)):
+            expected = o + d - c
+            if ok and abs(expected - cl) > tolerance:
+                mismatches.append(self._mismatch(row, 'Balance', expected, cl))
+        return mismatches
+
+    def _check_balances_numpy(self, numpy, tolerance: float) -> List[Dict]:
+        """_check_balances on NumPy views of the columns"""
+        opening, debit, credit, closing = (numpy.frombuffer(self.values[field], dtype=numpy.float64)
+                                           for field in FIELDS)
+        complete = numpy.logical_and.reduce([numpy.frombuffer(self.masks[field], dtype=numpy.uint8)
+                                             for field in FIELDS])
+        expected = opening + debit - credit
+        rows = numpy.flatnonzero(complete & (numpy.abs(expected - closing) > tolerance))
+        return [self._mismatch(row, 'Balance', float(expected[row]), self.values['closing_balance'][row])
+                for row in rows.tolist()]
+
+    def _check_carry_forward(self, tolerance: float) -> List[Dict]:
+        """Each page's opening balance equals the closing balance of the file's previous page"""
+        opening = self.values['opening_balance']
+        closing = self.values['closing_balance']
+        has_opening = self.masks['opening_balance']
+        has_closing = self.masks['closing_balance']
+        mismatches = []
+        previous = None
+        for row, first in enumerate(self.page_first):
+            if not first:
+                continue
+            if previous is not None and self.file_ids[row] == self.file_ids[previous] and \
+                    has_opening[row] and has_closing[previous] and \
+                    abs(opening[row] - closing[previous]) > tolerance:
+                mismatches.append(self._mismatch(row, 'Carry-forward', closing[previous], opening[row]))
+            previous = row
+        return mismatches
+
+    def _check_carry_forward_numpy(self, numpy, tolerance: float) -> List[Dict]:
+        """_check_carry_forward on NumPy views of the columns"""
+        rows = numpy.flatnonzero(numpy.frombuffer(self.page_first, dtype=numpy.uint8))
+        # The first row of each page against the first row of the page before it
+        current, previous = rows[1:], rows[:-1]
+        file_ids = numpy.frombuffer(self.file_ids, dtype=numpy.intc)
+        opening = numpy.frombuffer(self.values['opening_balance'], dtype=numpy.float64)
+        closing = numpy.frombuffer(self.values['closing_balance'], dtype=numpy.float64)
+        has_opening = numpy.frombuffer(self.masks['opening_balance'], dtype=numpy.uint8)
+        has_closing = numpy.frombuffer(self.masks['closing_balance'], dtype=numpy.uint8)
+        off = (file_ids[current] == file_ids[previous]) & (has_opening[current] & has_closing[previous] == 1) & \
+            (numpy.abs(opening[current] - closing[previous]) > tolerance)
+        pairs = zip(current[off].tolist(), previous[off].tolist())
+        return [self._mismatch(row, 'Carry-forward', self.values['closing_balance'][before],
+                               self.values['opening_balance'][row]) for row, before in pairs]
+
+    def _check_schedules(self, tolerance: float) -> List[Dict]:
+        """First opening + sum of debits - sum of credits = last closing, per file"""
+        mismatches = []
+        for file_id, sums in enumerate(self.file_sums()):
+            if sums['pages'] < 2 or sums['incomplete']:
+                # A single page is already covered by the balance check, and a sum
+                # with missing values cannot be checked
+                continue
+            # The first row of the file's first and last page
+            rows_start, rows_stop = self.file_rows(file_id)
+            start = self.page_first.find(1, rows_start, rows_stop)
+            end = self.page_first.rfind(1, rows_start, rows_stop)
+            if not (self.masks['opening_balance'][start] and self.masks['closing_balance'][end]):
+                continue
+            expected = self.values['opening_balance'][start] + sums['debit'] - sums['credit']
+            actual = self.values['closing_balance'][end]
+            if abs(expected - actual) > tolerance:
+                mismatch = self._mismatch(end, 'Schedule total', expected, actual)
+                mismatch['page'] = None
+                mismatches.append(mismatch)
+        return mismatches
+
+    def _mismatch(self, row: int, check: str, expected: float, actual: float) -> Dict:
+        return {
+            'file_id': self.file_ids[row],
+            'page': self.pages[row],
+            'label': LABELS[self.labels[row]],
+            'check': check,
+            'expected': round(expected, 2),
+            'actual': round(actual, 2),
+            'difference': round(actual - expected, 2)
+        }
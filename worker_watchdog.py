@@ -0,0 +1,229 @@
+"""Worker processes with time and memory limits per task
+
+WatchdogPool runs tasks in worker processes that it supervises itself, so a
+task that hangs or runs away with memory can be stopped without losing the
+rest of the run (concurrent.futures cannot stop a running task):
+
+    task_timeout        wall-clock seconds one task may take
+    heartbeat_timeout   seconds a task may run without calling its heartbeat;
+                        FileProcessor calls it before each page, which makes
+                        this a per-page limit
+    memory_limit_mb     address-space limit of each worker, set with
+                        resource.setrlimit (POSIX only); allocations beyond it
+                        raise MemoryError inside the task
+
+A worker that exceeds a time limit is killed and replaced by a fresh one; its
+task is reported with a TaskFailed error and the remaining tasks carry on.
+"""
+import collections.abc
+import multiprocessing
+import time
+from multiprocessing.connection import wait
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+# How often the pool wakes up to check deadlines and cancellation
+POLL_SECONDS = 0.1
+
+
+class TaskFailed(Exception):
+    """A task was stopped by the watchdog, raised an error or lost its worker
+
+    progress is the last value the task passed to its heartbeat, if any.
+    """
+
+    def __init__(self, message: str, progress: Any = None):
+        super().__init__(message)
+        self.progress = progress
+
+
+def _limit_memory(memory_limit_mb: int):
+    """Cap the address space of this process; not available on Windows"""
+    try:
+        import resource
+    except ImportError:
+        return
+
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = memory_limit_mb * 1024 * 1024
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _worker_main(connection, target: Callable, memory_limit_mb: Optional[int]):
+    """Worker process loop: run target(*args, heartbeat=...) for each task received"""
+    if memory_limit_mb:
+        _limit_memory(memory_limit_mb)
+    connection.send(('ready', None))
+
+    while True:
+        task = connection.recv()
+        if task is None:
+            break
+
+        def heartbeat(progress=None):
+            connection.send(('beat', progress))
+
+        try:
+            message = ('done', target(*task, heartbeat=heartbeat))
+        except Exception as e:
+            message = ('failed', f"{type(e).__name__}: {e}")
+        connection.send(message)
+
+
+class _Worker:
+    """One worker process, the pipe to it and the task it is running"""
+
+    def __init__(self, context, target: Callable, memory_limit_mb: Optional[int]):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child, target, memory_limit_mb),
+                                       daemon=True)
+        self.process.start()
+        # Only the worker keeps its end open, so the pipe reports EOF when the worker dies
+        child.close()
+        self.ready = False
+        self.key = None
+        self.started = 0.0
+        self.last_beat = 0.0
+        self.progress = None
+
+    def assign(self, key: Any, args: Tuple):
+        self.connection.send(args)
+        self.key = key
+        self.started = self.last_beat = time.monotonic()
+        self.progress = None
+
+    def finish(self) -> Any:
+        """Mark the worker idle and return the key of the task it ran"""
+        key, self.key = self.key, None
+        return key
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+    def stop(self):
+        """Let an idle worker exit, killing it if it does not"""
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.connection.close()
+
+
+class WatchdogPool:
+    """Run tasks on worker processes that are killed and replaced when they exceed a limit"""
+
+    def __init__(self, workers: int, target: Callable, task_timeout: Optional[float] = None,
+                 heartbeat_timeout: Optional[float] = None, memory_limit_mb: Optional[int] = None,
+                 progress_callback: Optional[Callable[[Any, Any], None]] = None):
+        # target must be a module-level function so it can be sent to spawned workers
+        self.workers = max(1, workers)
+        self.target = target
+        self.task_timeout = task_timeout
+        self.heartbeat_timeout = heartbeat_timeout
+        self.memory_limit_mb = memory_limit_mb
+        # Optional callback(key, progress) for every heartbeat
+        self.progress_callback = progress_callback
+        self._context = multiprocessing.get_context()
+
+    def run(self, tasks: Iterable[Tuple[Any, Tuple]], cancel_event=None
+            ) -> Iterator[Tuple[Any, Any, Optional[TaskFailed]]]:
+        """Run (key, args) tasks and yield (key, value, None) or (key, None, TaskFailed)
+
+        Results come in the order tasks finish. tasks can be any iterable; the
+        next task is only taken when a worker is free. When cancel_event is set
+        the workers are killed and the iteration ends early.
+        """
+        count = len(tasks) if isinstance(tasks, collections.abc.Sized) else self.workers
+        tasks = iter(tasks)
+        upcoming = next(tasks, None)
+        running = 0
+        workers = [self._start_worker() for _ in range(min(self.workers, count))]
+        try:
+            while upcoming is not None or running:
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+
+                for worker in workers:
+                    if worker.ready and worker.key is None and upcoming is not None:
+                        worker.assign(*upcoming)
+                        running += 1
+                        upcoming = next(tasks, None)
+
+                outcomes = []
+                connections = {worker.connection: worker for worker in workers}
+                for connection in wait(list(connections), timeout=POLL_SECONDS):
+                    outcome = self._receive(connections[connection])
+                    if outcome is not None:
+                        outcomes.append(outcome)
+
+                now = time.monotonic()
+                for worker in workers:
+                    failure = self._check_limits(worker, now)
+                    if failure is not None:
+                        worker.kill()
+                        outcomes.append((worker.finish(), None, failure))
+
+                # Replace dead workers while tasks are waiting, otherwise drop them
+                workers = [worker if worker.process.exitcode is None else self._start_worker()
+                           for worker in workers if worker.process.exitcode is None or upcoming is not None]
+                for outcome in outcomes:
+                    running -= 1
+                    yield outcome
+        finally:
+            for worker in workers:
+                if worker.key is None and worker.process.exitcode is None:
+                    worker.stop()
+                else:
+                    worker.kill()
+
+    def _start_worker(self) -> _Worker:
+        return _Worker(self._context, self.target, self.memory_limit_mb)
+
+    def _receive(self, worker: _Worker) -> Optional[Tuple[Any, Any, Optional[TaskFailed]]]:
+        """Handle one message from a worker; return an outcome when its task ended"""
+        try:
+            kind, value = worker.connection.recv()
+        except (EOFError, OSError):
+            worker.kill()
+            if worker.key is None:
+                return None
+            return worker.finish(), None, TaskFailed(self._exit_message(worker.process.exitcode),
+                                                     worker.progress)
+
+        if kind == 'ready':
+            worker.ready = True
+            return None
+        if kind == 'beat':
+            worker.last_beat = time.monotonic()
+            worker.progress = value
+            if self.progress_callback is not None:
+                self.progress_callback(worker.key, value)
+            return None
+        if kind == 'failed':
+            return worker.finish(), None, TaskFailed(value, worker.progress)
+        return worker.finish(), value, None
+
+    def _check_limits(self, worker: _Worker, now: float) -> Optional[TaskFailed]:
+        """A TaskFailed if the worker's task has run out of time"""
+        if worker.key is None or not worker.process.is_alive():
+            return None
+        if self.task_timeout and now - worker.started > self.task_timeout:
+            return TaskFailed(f"Stopped after exceeding the time limit of {self.task_timeout:g}s",
+                              worker.progress)
+        if self.heartbeat_timeout and now - worker.last_beat > self.heartbeat_timeout:
+            return TaskFailed(f"Stopped after {self.heartbeat_timeout:g}s without progress",
+                              worker.progress)
+        return None
+
+    def _exit_message(self, exitcode: Optional[int]) -> str:
+        message = f"Worker process stopped unexpectedly (exit code {exitcode})"
+        if self.memory_limit_mb:
+            message += f"; it may have exceeded the memory limit of {self.memory_limit_mb} MB"
+        return message